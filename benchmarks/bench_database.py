@@ -0,0 +1,117 @@
+"""
+Benchmarks of database inserts and selects against a disposable database, created on the server
+configured by the usual env variables (DB, DBUSER, DBPASSWD, DBHOST, DBPORT) and dropped afterwards.
+"""
+import contextlib
+import dataclasses
+import itertools
+import os
+import time
+import typing
+
+import database
+import ingest
+import model
+import rid_parser
+import schema
+
+import fixtures
+
+# matches stored before the select benchmarks run
+_STORED_MATCHES = 50
+
+
+@contextlib.contextmanager
+def disposable_database():
+    """
+    Creates an empty database with the current schema and yields a connection to it, the database
+    is dropped on exit.
+    :return:
+    """
+    name = f'bench_{os.getpid()}_{int(time.time())}'
+    admin = database.get_connection()
+    admin.autocommit = True
+    admin.cursor().execute(f'CREATE DATABASE {name}')
+    try:
+        conn = database.get_connection(database=name)
+        try:
+            schema.migrate(conn)
+            yield conn
+        finally:
+            conn.close()
+    finally:
+        admin.cursor().execute(f'DROP DATABASE IF EXISTS {name}')
+        admin.close()
+
+
+def _fill(conn):
+    for game_id in range(1, _STORED_MATCHES + 1):
+        match_dto, timeline_dto = fixtures.game(game_id)
+        ingest.ingest_match(conn, match_dto, timeline_dto)
+        for identity in match_dto.participant_identities:
+            database.insert_summoner_match(
+                conn,
+                model.SummonerMatch(account_id=identity.player.account_id, game_id=match_dto.game_id),
+                on_conflict='ignore',
+            )
+    # the duo pair of the fixtures
+    for index in (0, 1):
+        database.insert_summoner(conn, rid_parser.parse_summoner(fixtures.GENERATOR.summoner_dto(index)))
+
+
+def benchmarks(conn) -> typing.List[typing.Tuple[str, typing.Callable[[], typing.Any], dict]]:
+    """
+    Fills the database behind conn and returns (name, function, harness.measure arguments) of every
+    benchmark. Insert benchmarks write fresh rows on every call.
+    :param conn:
+    :return:
+    """
+    _fill(conn)
+    game_ids = itertools.count(10 ** 6)
+    template, timeline_dto = fixtures.game(1)
+    rows = {}
+
+    def parse_timeline():
+        # fresh participant ids, so every insert writes new frames
+        game_id = next(game_ids)
+        participant_ids = {participant_id: f'{game_id}-{participant_id}' for participant_id in range(1, 11)}
+        rows['frames'], rows['events'] = rid_parser.parse_match_timeline_frames(timeline_dto, participant_ids)
+
+    parse_timeline()
+    frame_count, event_count = len(rows['frames']), len(rows['events'])
+    name = fixtures.GENERATOR.summoner_name(0)
+    s1 = database.select_summoner(conn, name)
+    s2 = database.select_summoner(conn, fixtures.GENERATOR.summoner_name(1))
+
+    def insert_match():
+        database.insert_match(conn, dataclasses.replace(rid_parser.parse_match(template), game_id=next(game_ids)))
+
+    def insert_stats_bulk():
+        game_id = next(game_ids)
+        stats = [rid_parser.parse_stats(stat=participant.stats, game_id=game_id, platform_id='EUW1')
+                 for participant in template.participants]
+        database.insert_stats_bulk(conn, stats)
+
+    def ingest_match():
+        template.game_id = next(game_ids)
+        ingest.ingest_match(conn, template, timeline_dto)
+
+    return [
+        ('insert_match', insert_match, {'samples': 200}),
+        ('insert_stats_bulk (10 rows)', insert_stats_bulk, {'samples': 200}),
+        (f'insert_participant_frames_bulk ({frame_count} rows)',
+         lambda: database.insert_participant_frames_bulk(conn, rows['frames']),
+         {'samples': 20, 'setup': parse_timeline}),
+        (f'insert_events_bulk ({event_count} rows)',
+         lambda: database.insert_events_bulk(conn, rows['events']),
+         {'samples': 20, 'setup': parse_timeline}),
+        ('ingest_match (with timeline)', ingest_match, {'samples': 20}),
+        ('select_summoner', lambda: database.select_summoner(conn, name), {'samples': 500}),
+        ('select_match_by_gameid', lambda: database.select_match_by_gameid(conn, 25), {'samples': 500}),
+        ('select_all_kill_timeline', lambda: database.select_all_kill_timeline(conn, 25), {'samples': 200}),
+        ('select_game_frames', lambda: database.select_game_frames(conn, 25), {'samples': 100}),
+        ('select_game_bundle', lambda: database.select_game_bundle(conn, 25), {'samples': 50}),
+        ('select_common_game_stats', lambda: database.select_common_game_stats(conn, s1, s2), {'samples': 200}),
+        ('select_duo_games', lambda: database.select_duo_games(conn, s1, s2), {'samples': 200}),
+    ]
+
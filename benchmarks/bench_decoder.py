@@ -0,0 +1,138 @@
+"""
+Measures decoding of a real-sized match timeline (riot api json) into MatchTimelineDto, once with
+the compiled decoder and once with a generic recursive camelCase -> snake_case conversion.
+
+    python benchmarks/bench_decoder.py [--frames 35] [--events-per-frame 45] [--repeat 20]
+"""
+import argparse
+import dataclasses
+import json
+import os
+import random
+import re
+import sys
+import time
+import typing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+import decoder
+from dtos import match_timeline
+
+
+def _timeline_json(frames: int, events_per_frame: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    event_types = ('ITEM_PURCHASED', 'SKILL_LEVEL_UP', 'WARD_PLACED', 'CHAMPION_KILL', 'ITEM_DESTROYED',
+                   'WARD_KILL', 'BUILDING_KILL', 'ELITE_MONSTER_KILL')
+    payload = {'frameInterval': 60000, 'frames': []}
+    for frame in range(frames):
+        timestamp = frame * 60000
+        participant_frames = {
+            str(participant): {
+                'participantId': participant,
+                'position': {'x': rng.randint(0, 15000), 'y': rng.randint(0, 15000)},
+                'currentGold': rng.randint(0, 3000),
+                'totalGold': 500 + frame * 400 + rng.randint(0, 300),
+                'level': min(18, 1 + frame // 2),
+                'xp': frame * 450,
+                'minionsKilled': frame * 7,
+                'jungleMinionsKilled': rng.randint(0, 5) * frame,
+                'dominionScore': 0,
+                'teamScore': 0,
+            }
+            for participant in range(1, 11)
+        }
+        events = []
+        for _ in range(events_per_frame if frame else 10):
+            event_type = rng.choice(event_types)
+            event = {'type': event_type, 'timestamp': timestamp + rng.randint(0, 59999)}
+            if event_type == 'CHAMPION_KILL':
+                event.update({
+                    'killerId': rng.randint(1, 10),
+                    'victimId': rng.randint(1, 10),
+                    'assistingParticipantIds': rng.sample(range(1, 11), 2),
+                    'position': {'x': rng.randint(0, 15000), 'y': rng.randint(0, 15000)},
+                })
+            elif event_type == 'WARD_PLACED':
+                event.update({'wardType': 'YELLOW_TRINKET', 'creatorId': rng.randint(1, 10)})
+            elif event_type == 'SKILL_LEVEL_UP':
+                event.update({'participantId': rng.randint(1, 10), 'skillSlot': rng.randint(1, 4),
+                              'levelUpType': 'NORMAL'})
+            else:
+                event.update({'participantId': rng.randint(1, 10), 'itemId': rng.randint(1000, 4000)})
+            events.append(event)
+        payload['frames'].append({'timestamp': timestamp, 'participantFrames': participant_frames,
+                                  'events': events})
+    return json.dumps(payload).encode()
+
+
+_CAMEL = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+def _snake_case(data):
+    if isinstance(data, dict):
+        return {_CAMEL.sub('_', key).lower(): _snake_case(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_snake_case(value) for value in data]
+    return data
+
+
+_hints = {}
+
+
+def _type_hints(cls) -> dict:
+    hints = _hints.get(cls)
+    if hints is None:
+        hints = _hints[cls] = typing.get_type_hints(cls)
+    return hints
+
+
+def _generic(cls, data):
+    # the usual hand written conversion: snake_case all keys, then build dataclasses recursively,
+    # type hints are resolved once per class like any real generic decoder caches them
+    origin = typing.get_origin(cls)
+    if data is None:
+        return [] if origin is list else None
+    if dataclasses.is_dataclass(cls):
+        hints = _type_hints(cls)
+        return cls(**{field.name: _generic(hints[field.name], data.get(field.name))
+                      for field in dataclasses.fields(cls)})
+    if origin is list:
+        return [_generic(typing.get_args(cls)[0], item) for item in data]
+    if origin is not None and typing.get_args(cls) and dataclasses.is_dataclass(typing.get_args(cls)[-1]):
+        return {key: _generic(typing.get_args(cls)[-1], item) for key, item in data.items()}
+    return data
+
+
+def _measure(function, raw: bytes, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(raw)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=35)
+    parser.add_argument('--events-per-frame', type=int, default=45)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    raw = _timeline_json(args.frames, args.events_per_frame)
+    assert decoder.decode_json(match_timeline.MatchTimelineDto, raw) == \
+        _generic(match_timeline.MatchTimelineDto, _snake_case(json.loads(raw)))
+
+    print(f'payload: {len(raw) / 1024:.0f} KiB, {args.frames} frames')
+    print(f'{"variant":<12}{"ms/timeline":>14}{"timelines/s":>14}{"MiB/s":>10}')
+    variants = (
+        ('json only', json.loads),
+        ('generic', lambda data: _generic(match_timeline.MatchTimelineDto, _snake_case(json.loads(data)))),
+        ('decoder', lambda data: decoder.decode_json(match_timeline.MatchTimelineDto, data)),
+    )
+    for name, function in variants:
+        seconds = _measure(function, raw, args.repeat)
+        print(f'{name:<12}{seconds * 1000:>14.2f}{1 / seconds:>14.1f}{len(raw) / seconds / 2 ** 20:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares construction time and memory of the compact (slotted) hot models against plain frozen
+dataclasses with the same fields, i.e. the classes used before.
+
+    python benchmarks/bench_models.py [--instances 100000]
+"""
+import argparse
+import dataclasses
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+import model
+
+
+def _plain(cls):
+    # frozen dataclass with a __dict__, like the models were declared before
+    return dataclasses.make_dataclass(
+        cls.__name__,
+        [(field.name, field.type) for field in dataclasses.fields(cls)],
+        frozen=True,
+    )
+
+
+def _sample_values(cls) -> tuple:
+    values = {
+        int: 1234,
+        str: 'e3b0c442-98fc-1c14-9afb-f4c8996fb924',
+        bool: True,
+        tuple: '1234,5678',
+    }
+    return tuple(values.get(field.type, ['e3b0c442', 'd41d8cd9']) for field in dataclasses.fields(cls))
+
+
+def _construction_time(cls, args: tuple, number: int) -> float:
+    # seconds per instance
+    return timeit.timeit(lambda: cls(*args), number=number) / number
+
+
+def _memory(cls, args: tuple, instances: int) -> float:
+    # bytes per instance, field values are shared between instances and not counted
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [cls(*args) for _ in range(instances)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / instances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--instances', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f'{"model":<18}{"variant":<10}{"ns/instance":>14}{"bytes/instance":>16}')
+    for cls in (model.Stat, model.Event, model.ParticipantFrame):
+        values = _sample_values(cls)
+        for variant, variant_cls in (('plain', _plain(cls)), ('compact', cls)):
+            seconds = _construction_time(variant_cls, values, args.instances)
+            size = _memory(variant_cls, values, args.instances)
+            print(f'{cls.__name__:<18}{variant:<10}{seconds * 1e9:>14.0f}{size:>16.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmarks of the rid_parser hot paths and of turning models into rows.
+"""
+import dataclasses
+import typing
+
+import database
+import rid_parser
+
+import fixtures
+
+
+def benchmarks() -> typing.List[typing.Tuple[str, typing.Callable[[], typing.Any], dict]]:
+    """
+    Returns (name, function, harness.measure arguments) of every benchmark.
+    :return:
+    """
+    match_dto, timeline_dto = fixtures.game(1)
+    participant_ids = {participant_id: f'participant-{participant_id}' for participant_id in range(1, 11)}
+    stats_dto = match_dto.participants[0].stats
+    frame_dto = timeline_dto.frames[10]
+    participant_frame_dto = frame_dto.participant_frames['1']
+    event_dto = next(event for frame in timeline_dto.frames for event in frame.events if event.type == 'CHAMPION_KILL')
+
+    stat = rid_parser.parse_stats(stat=stats_dto, game_id=1, platform_id='EUW1')
+    event = rid_parser.parse_event(event_dto, participant_ids)
+    participant_frame = rid_parser.parse_participant_frame(participant_frame_dto, 'participant-1', 600000)
+    stat_values = database._row_values(type(stat))
+    event_values = database._row_values(type(event))
+
+    return [
+        ('parse_stats', lambda: rid_parser.parse_stats(stat=stats_dto, game_id=1, platform_id='EUW1'),
+         {'batch': 100}),
+        ('parse_event', lambda: rid_parser.parse_event(event_dto, participant_ids), {'batch': 100}),
+        ('parse_participant_frame',
+         lambda: rid_parser.parse_participant_frame(participant_frame_dto, 'participant-1', 600000),
+         {'batch': 100}),
+        ('parse_teams', lambda: rid_parser.parse_teams(match_dto), {'batch': 100}),
+        ('parse_match_timeline_frames', lambda: rid_parser.parse_match_timeline_frames(timeline_dto, participant_ids),
+         {'samples': 50}),
+        ('astuple stat', lambda: dataclasses.astuple(stat), {'batch': 100}),
+        ('astuple event', lambda: dataclasses.astuple(event), {'batch': 100}),
+        ('astuple participant_frame', lambda: dataclasses.astuple(participant_frame), {'batch': 100}),
+        ('row values stat', lambda: stat_values(stat), {'batch': 100}),
+        ('row values event', lambda: event_values(event), {'batch': 100}),
+    ]
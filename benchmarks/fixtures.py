@@ -0,0 +1,24 @@
+"""
+Deterministic dtos of realistic size for the benchmarks, taken from the synthetic generator: game
+ids start at 1 and every fifth game or so contains the duo pair of summoners 0 and 1.
+"""
+import typing
+
+from dtos import match
+from dtos import match_timeline
+
+import synthetic
+
+GENERATOR = synthetic.Generator(seed=0, summoners=1000, duo_pairs=1, duo_share=0.2, first_game_id=1)
+
+
+def game(game_id: int) -> typing.Tuple[match.MatchDto, match_timeline.MatchTimelineDto]:
+    return GENERATOR.game(game_id - GENERATOR.first_game_id)
+
+
+def match_dto(game_id: int) -> match.MatchDto:
+    return game(game_id)[0]
+
+
+def timeline_dto(game_id: int = 1) -> match_timeline.MatchTimelineDto:
+    return game(game_id)[1]
@@ -0,0 +1,161 @@
+"""
+Measurement helpers of the benchmark suite (see run.py): timing with percentiles, peak memory and
+json baselines.
+"""
+import dataclasses
+import datetime
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import typing
+
+
+@dataclasses.dataclass(frozen=True)
+class Result:
+    name: str
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    peak_kib: float  # high-water mark of memory allocated during a single call
+    operations: int
+
+
+def _percentile(sorted_values: typing.Sequence[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(
+        name: str,
+        function: typing.Callable[[], typing.Any],
+        samples: int = 200,
+        batch: int = 1,
+        warmup: int = 10,
+        setup: typing.Callable[[], typing.Any] = None,
+) -> Result:
+    """
+    Calls function batch times per sample and derives the latency of one call from every sample, so
+    fast functions are timed over batches longer than the timer resolution. Peak memory is traced
+    over a separate single call with tracemalloc, which would slow down the timed calls; a peak is
+    not additive, so it is not divided by batch.
+    :param name:
+    :param function: called without arguments
+    :param samples:
+    :param batch: calls per sample
+    :param warmup: untimed calls before sampling
+    :param setup: called before every sample, not timed
+    :return:
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        function()
+
+    latencies = []
+    total = 0.0
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            for _ in range(batch):
+                function()
+            elapsed = time.perf_counter() - started
+            total += elapsed
+            latencies.append(elapsed / batch)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return Result(
+        name=name,
+        ops_per_sec=samples * batch / total if total else float('inf'),
+        p50_us=_percentile(latencies, 0.5) * 1e6,
+        p99_us=_percentile(latencies, 0.99) * 1e6,
+        peak_kib=max(peak, 0) / 1024,
+        operations=samples * batch,
+    )
+
+
+def print_results(results: typing.Sequence[Result], baseline: typing.Dict[str, Result] = None):
+    width = max([40] + [len(result.name) + 2 for result in results])
+    header = f'{"benchmark":<{width}}{"ops/s":>12}{"p50 us":>10}{"p99 us":>10}{"peak KiB":>10}'
+    if baseline is not None:
+        header += f'{"vs base":>10}'
+    print(header)
+    for result in results:
+        line = f'{result.name:<{width}}{result.ops_per_sec:>12.0f}{result.p50_us:>10.1f}{result.p99_us:>10.1f}' \
+               f'{result.peak_kib:>10.1f}'
+        if baseline is not None:
+            base = baseline.get(result.name)
+            line += f'{(result.ops_per_sec / base.ops_per_sec - 1) * 100:>+9.1f}%' if base else f'{"new":>10}'
+        print(line)
+
+
+def save_baseline(results: typing.Sequence[Result], path: str):
+    with open(path, 'w') as f:
+        json.dump({
+            'created': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': [dataclasses.asdict(result) for result in results],
+        }, f, indent=2)
+
+
+def load_baseline(path: str) -> typing.Dict[str, Result]:
+    with open(path) as f:
+        return {result['name']: Result(**result) for result in json.load(f)['results']}
+
+
+def regressions(
+        results: typing.Sequence[Result],
+        baseline: typing.Dict[str, Result],
+        tolerance: float = 0.1,
+) -> typing.List[str]:
+    """
+    Returns a description of every result whose throughput fell or whose median latency rose by
+    more than tolerance (relative) compared to the baseline.
+    :param results:
+    :param baseline:
+    :param tolerance:
+    :return:
+    """
+    found = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if result.ops_per_sec < base.ops_per_sec * (1 - tolerance):
+            found.append(f'{result.name}: {result.ops_per_sec:.0f} ops/s, baseline {base.ops_per_sec:.0f}')
+        elif result.p50_us > base.p50_us * (1 + tolerance):
+            found.append(f'{result.name}: p50 {result.p50_us:.1f} us, baseline {base.p50_us:.1f}')
+    return found
+
+
+def median_of(results: typing.Sequence[Result]) -> Result:
+    # combines repeated runs of the same benchmark, robust against a single noisy run, the peak is
+    # the highest of the runs
+    return Result(
+        name=results[0].name,
+        ops_per_sec=statistics.median(result.ops_per_sec for result in results),
+        p50_us=statistics.median(result.p50_us for result in results),
+        p99_us=statistics.median(result.p99_us for result in results),
+        peak_kib=max(result.peak_kib for result in results),
+        operations=sum(result.operations for result in results),
+    )
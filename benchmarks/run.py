@@ -0,0 +1,75 @@
+"""
+Runs the benchmark suite: parsing (rid_parser, astuple) and database inserts and selects against a
+disposable database on the server configured by the env variables DB, DBUSER, DBPASSWD, DBHOST and
+DBPORT. Suite memory runs the database benchmarks against the in-memory backend (memdb), which
+leaves the cost of parsing and building rows without the database. Results are printed as ops/s,
+p50/p99 latency and the peak memory of a single call, they can be stored as json baseline and
+compared against a previous one.
+
+    python benchmarks/run.py [--suite parse database memory] [--repeat 3]
+                             [--save baseline.json] [--compare baseline.json] [--tolerance 0.1]
+
+Exits with 1 if --compare found a regression.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
+
+import harness
+
+SUITES = ('parse', 'database', 'memory')
+
+
+def _run(benchmarks, repeat: int, only: str = None, prefix: str = ''):
+    results = []
+    for name, function, arguments in benchmarks:
+        name = prefix + name
+        if only is not None and only not in name:
+            continue
+        runs = [harness.measure(name, function, **arguments) for _ in range(repeat)]
+        results.append(harness.median_of(runs))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', nargs='+', choices=SUITES, default=['parse', 'database'])
+    parser.add_argument('--only', default=None, help='only benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the median is reported')
+    parser.add_argument('--save', default=None, help='write the results as baseline to this json file')
+    parser.add_argument('--compare', default=None, help='compare against this baseline json file')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown counted as regression')
+    args = parser.parse_args()
+
+    results = []
+    if 'parse' in args.suite:
+        import bench_parse
+        results += _run(bench_parse.benchmarks(), args.repeat, args.only)
+    if 'database' in args.suite:
+        import bench_database
+        with bench_database.disposable_database() as conn:
+            results += _run(bench_database.benchmarks(conn), args.repeat, args.only)
+    if 'memory' in args.suite:
+        import bench_database
+        import memdb
+        with memdb.backend():
+            conn = memdb.get_connection()
+            results += _run(bench_database.benchmarks(conn), args.repeat, args.only, prefix='memory ')
+            memdb.reset()
+
+    baseline = harness.load_baseline(args.compare) if args.compare else None
+    harness.print_results(results, baseline)
+    if args.save:
+        harness.save_baseline(results, args.save)
+    if baseline is not None:
+        regressions = harness.regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'regression: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
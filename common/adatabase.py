@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import inspect
+import itertools
+import typing
+
+import database
+
+# asyncio counterpart of database: every select_* and insert_* function of database is available
+# here as coroutine function with the same arguments, every iter_* and chunk_* function as async
+# iterator. The blocking calls run on a thread pool (psycopg2 releases the gil while waiting for the
+# server), so independent queries run concurrently. If conn is None a connection is checked out of
+# the pool of database for the duration of the call (or iteration), which is what allows
+# concurrency, e.g.
+#
+#   gold, cs = await asyncio.gather(
+#       adatabase.select_team_gold(None, game_id, team_id),
+#       adatabase.select_team_cs(None, game_id, team_id),
+#   )
+#   async for participant in adatabase.iter_all_participants(None, as_models=True):
+#       ...
+#
+# The functions of database are looked up on every call, so a backend swapped in with
+# memdb.install() is used no matter when this module was imported.
+
+_executor: typing.Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def init(
+        min_size: int = 1,
+        max_size: int = 10,
+        **pool_kwargs,
+):
+    """
+    Creates the connection pool of database and a thread pool with one thread per connection.
+    :param min_size:
+    :param max_size:
+    :param pool_kwargs: see database.init_pool
+    :return:
+    """
+    global _executor
+    database.init_pool(min_size=min_size, max_size=max_size, **pool_kwargs)
+    old, _executor = _executor, concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_size,
+        thread_name_prefix='adatabase',
+    )
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+def close():
+    """
+    Shuts down the thread pool and closes the connection pool of database.
+    :return:
+    """
+    global _executor
+    old, _executor = _executor, None
+    if old is not None:
+        old.shutdown(wait=True)
+    database.close_pool()
+
+
+async def _run(function, *args, **kwargs):
+    # without init() the default executor of the loop is used
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(function, *args, **kwargs))
+
+
+def _call_with_connection(function, args, kwargs):
+    with database.connection() as conn:
+        return function(conn, *args, **kwargs)
+
+
+@contextlib.asynccontextmanager
+async def connection(timeout: float = None):
+    """
+    Async context manager yielding a connection of the pool, see database.connection.
+    :param timeout:
+    :return:
+    """
+    manager = database.connection(timeout=timeout)
+    conn = await _run(manager.__enter__)
+    try:
+        yield conn
+    except BaseException as e:
+        if not await _run(manager.__exit__, type(e), e, e.__traceback__):
+            raise
+    else:
+        await _run(manager.__exit__, None, None, None)
+
+
+def _asynchronous(name: str):
+    # the function is looked up on every call, so a backend installed later (memdb) is used
+    @functools.wraps(getattr(database, name))
+    async def wrapper(conn=None, *args, **kwargs):
+        function = getattr(database, name)
+        if conn is None:
+            return await _run(_call_with_connection, function, args, kwargs)
+        return await _run(function, conn, *args, **kwargs)
+    return wrapper
+
+
+def _take(iterator: typing.Iterator, count: int) -> list:
+    return list(itertools.islice(iterator, count))
+
+
+def _asynchronous_iterator(name: str):
+    # items are taken from the generator of database on the thread pool, for iter_* itersize rows
+    # (one round trip of the server side cursor) per hop to the pool, for chunk_* one chunk
+    @functools.wraps(getattr(database, name))
+    async def wrapper(conn=None, *args, **kwargs):
+        function = getattr(database, name)
+        count = 1
+        if name.startswith('iter_'):
+            # itersize may be passed positionally as well
+            arguments = inspect.signature(function).bind(conn, *args, **kwargs)
+            arguments.apply_defaults()
+            count = arguments.arguments.get('itersize', 2000)
+        manager = None
+        if conn is None:
+            manager = database.connection()
+            conn = await _run(manager.__enter__)
+        iterator = function(conn, *args, **kwargs)
+        try:
+            while True:
+                items = await _run(_take, iterator, count)
+                if not items:
+                    break
+                for item in items:
+                    yield item
+        except BaseException as e:
+            await _run(iterator.close)
+            if manager is not None and not await _run(manager.__exit__, type(e), e, e.__traceback__):
+                raise
+        else:
+            await _run(iterator.close)
+            if manager is not None:
+                await _run(manager.__exit__, None, None, None)
+    return wrapper
+
+
+__all__ = ['init', 'close', 'connection']
+for _name in dir(database):
+    if _name.startswith(('select_', 'insert_')) and callable(getattr(database, _name)):
+        globals()[_name] = _asynchronous(_name)
+        __all__.append(_name)
+    elif _name.startswith(('iter_', 'chunk_')) and callable(getattr(database, _name)):
+        globals()[_name] = _asynchronous_iterator(_name)
+        __all__.append(_name)
+del _name
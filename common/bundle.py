@@ -0,0 +1,152 @@
+import bisect
+import collections
+import typing
+
+import database
+
+OBJECTIVE_TYPES = ('BUILDING_KILL', 'ELITE_MONSTER_KILL')
+
+
+def _group(rows: typing.List[dict], key: str) -> typing.Dict[typing.Any, typing.List[dict]]:
+    groups = collections.defaultdict(list)
+    for row in rows:
+        groups[row[key]].append(row)
+    return dict(groups)
+
+
+class GameBundle:
+    """
+    Everything stored of one game, loaded at once by load_game_bundle. Rows are dicts of column
+    name to value like the DictRows of the single selects (timestamps of matches and stats are iso
+    strings). Frames and events are ordered by timestamp, also within every index.
+    """
+
+    def __init__(self,
+                 game_id: int,
+                 match: typing.Optional[dict],
+                 queue_type: typing.Optional[dict],
+                 teams: typing.List[dict],
+                 participants: typing.List[dict],
+                 stats: typing.List[dict],
+                 frames: typing.List[dict],
+                 events: typing.List[dict],
+                 ):
+        self.game_id = game_id
+        self.match = match
+        self.queue_type = queue_type
+        self.teams = teams
+        self.participants = participants
+        self.stats = stats
+        self.frames = frames
+        self.events = events
+
+        self.teams_by_id = {team['teamid']: team for team in teams}
+        self.participants_by_id = {participant['participantid']: participant for participant in participants}
+        self.participants_by_team = _group(participants, 'teamid')
+        self.stats_by_id = {stat['statid']: stat for stat in stats}
+        self.frames_by_participant = _group(frames, 'participantid')
+        self.events_by_type = _group(events, 'type')
+        self._event_timestamps = [event['timestamp'] for event in events]
+
+    @classmethod
+    def from_row(cls, game_id, row) -> 'GameBundle':
+        """
+        Builds the bundle from the row of database.select_game_bundle.
+        :param game_id:
+        :param row:
+        :return:
+        """
+        return cls(
+            game_id=game_id,
+            match=row['match'],
+            queue_type=row['queue_type'],
+            teams=row['teams'] or [],
+            participants=row['participants'] or [],
+            stats=row['stats'] or [],
+            frames=row['frames'] or [],
+            events=row['events'] or [],
+        )
+
+    @property
+    def general_info(self) -> typing.Optional[dict]:
+        # what select_general_game_info returns, the match joined with its queue type
+        if self.match is None:
+            return None
+        return {**self.match, **(self.queue_type or {})}
+
+    def team(self, team_id: int) -> typing.Optional[dict]:
+        return self.teams_by_id.get(team_id)
+
+    def participant(self, participant_id: str) -> typing.Optional[dict]:
+        return self.participants_by_id.get(participant_id)
+
+    def team_participants(self, team_id: int) -> typing.List[dict]:
+        return self.participants_by_team.get(team_id, [])
+
+    def stat(self, participant_id: str) -> typing.Optional[dict]:
+        """
+        Returns the stats of given participant.
+        :param participant_id:
+        :return:
+        """
+        participant = self.participants_by_id.get(participant_id)
+        if participant is None:
+            return None
+        return self.stats_by_id.get(participant['statid'])
+
+    def participant_frames(self, participant_id: str) -> typing.List[dict]:
+        return self.frames_by_participant.get(participant_id, [])
+
+    def events_of_type(self, *types: str) -> typing.List[dict]:
+        """
+        Returns the events of given types ordered by timestamp.
+        :param types:
+        :return:
+        """
+        if len(types) == 1:
+            return self.events_by_type.get(types[0], [])
+        return [event for event in self.events if event['type'] in types]
+
+    def events_between(self, start: int, end: int, *types: str) -> typing.List[dict]:
+        """
+        Returns the events with start <= timestamp < end, only those of given types if any.
+        :param start:
+        :param end:
+        :param types:
+        :return:
+        """
+        events = self.events[
+            bisect.bisect_left(self._event_timestamps, start):bisect.bisect_left(self._event_timestamps, end)
+        ]
+        if types:
+            events = [event for event in events if event['type'] in types]
+        return events
+
+    def kills(self, team_id: int = None) -> typing.List[dict]:
+        """
+        Returns the champion kills like select_all_kill_timeline, only those of given team's
+        participants (see select_kill_timeline) if a team is given.
+        :param team_id:
+        :return:
+        """
+        kills = self.events_by_type.get('CHAMPION_KILL', [])
+        if team_id is None:
+            return kills
+        return [
+            kill for kill in kills
+            if self.participants_by_id[kill['participantid']]['teamid'] == team_id
+        ]
+
+    def objectives(self) -> typing.List[dict]:
+        return self.events_of_type(*OBJECTIVE_TYPES)
+
+
+def load_game_bundle(conn, game_id: str) -> GameBundle:
+    """
+    Loads match, queue type, teams, participants, stats, frames and events of given game with a
+    single query and returns them indexed as GameBundle.
+    :param conn:
+    :param game_id:
+    :return:
+    """
+    return GameBundle.from_row(game_id, database.select_game_bundle(conn=conn, game_id=game_id))
@@ -0,0 +1,224 @@
+import collections
+import copy
+import dataclasses
+import functools
+import inspect
+import threading
+import time
+import typing
+
+_MISSING = object()
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    negative_hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+
+class ReadThroughCache:
+    """
+    Thread-safe LRU cache of at most maxsize entries. Entries expire after ttl seconds (never if
+    None), cached misses (None results) after negative_ttl seconds. Misses are only cached if
+    cache_misses is set.
+    """
+
+    def __init__(self,
+                 maxsize: int = 1024,
+                 ttl: float = None,
+                 cache_misses: bool = True,
+                 negative_ttl: float = 60.0,
+                 ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_misses = cache_misses
+        self.negative_ttl = negative_ttl
+        self._entries = collections.OrderedDict()  # key -> (value, expires at or None)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key):
+        """
+        Returns the cached value of given key or _MISSING.
+        :param key:
+        :return:
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return _MISSING
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            if value is None:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+            return value
+
+    def put(self, key, value):
+        if value is None and not self.cache_misses:
+            return
+        ttl = self.negative_ttl if value is None else self.ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, key=_MISSING):
+        """
+        Removes given key, all keys if none is given.
+        :param key:
+        :return:
+        """
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                negative_hits=self._negative_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+            )
+
+
+_signatures = {}  # name of cacheable function -> signature
+_caches = {}  # name of cacheable function -> ReadThroughCache, only for enabled functions
+
+# suggested policies: lookups of ingested data never change, summoners do
+DEFAULT_POLICIES = {
+    'select_champion_name_id': {'maxsize': 512},
+    'select_general_game_info': {'maxsize': 4096},
+    'select_match_by_gameid': {'maxsize': 4096},
+    'select_team_from_teamid_and_gameid': {'maxsize': 8192},
+    'select_summoner': {'maxsize': 1024, 'ttl': 300.0},
+}
+
+
+def _normalize(parameter: str, value):
+    # ids are passed as str by callers of selects and as int by inserts, both give the same key
+    if parameter.endswith('_id') and isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+def _key(name: str, args: tuple, kwargs: dict) -> tuple:
+    # arguments without the connection, defaults applied, so positional and keyword calls match
+    bound = _signatures[name].bind(*args, **kwargs)
+    bound.apply_defaults()
+    return tuple(_normalize(parameter, value) for parameter, value in bound.arguments.items())[1:]
+
+
+def cacheable(function):
+    """
+    Decorator for database functions taking the connection as first argument. Calls go straight
+    to the function unless a cache was enabled for it with enable(). Callers get a (shallow) copy of
+    the cached result, so changing a returned row or model does not change the cache.
+    :param function:
+    :return:
+    """
+    name = function.__name__
+    _signatures[name] = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = _caches.get(name)
+        if cache is None:
+            return function(*args, **kwargs)
+        try:
+            key = _key(name, args, kwargs)
+            value = cache.get(key)
+        except TypeError:
+            # unhashable arguments
+            return function(*args, **kwargs)
+        if value is _MISSING:
+            value = function(*args, **kwargs)
+            cache.put(key, copy.copy(value))
+            return value
+        return copy.copy(value)
+
+    return wrapper
+
+
+def enable(name: str,
+           maxsize: int = 1024,
+           ttl: float = None,
+           cache_misses: bool = True,
+           negative_ttl: float = 60.0,
+           ) -> ReadThroughCache:
+    """
+    Enables caching of given cacheable function, an existing cache of it is replaced.
+    :param name: function name, e.g. "select_champion_name_id"
+    :param maxsize:
+    :param ttl: seconds until an entry expires, None to keep entries until evicted
+    :param cache_misses: cache None results
+    :param negative_ttl: seconds until a cached None result expires
+    :return:
+    """
+    if name not in _signatures:
+        raise KeyError(f'{name} is not cacheable, cacheable are {sorted(_signatures)}')
+    cache = ReadThroughCache(maxsize=maxsize, ttl=ttl, cache_misses=cache_misses, negative_ttl=negative_ttl)
+    _caches[name] = cache
+    return cache
+
+
+def enable_defaults():
+    """
+    Enables every function of DEFAULT_POLICIES with its policy.
+    :return:
+    """
+    for name, policy in DEFAULT_POLICIES.items():
+        enable(name, **policy)
+
+
+def disable(name: str):
+    _caches.pop(name, None)
+
+
+def invalidate(name: str, *args, **kwargs):
+    """
+    Removes the entry of given function and arguments (without the connection), all entries of the
+    function if no arguments are given.
+    :param name:
+    :param args:
+    :param kwargs:
+    :return:
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        return
+    if not args and not kwargs:
+        cache.invalidate()
+        return
+    cache.invalidate(_key(name, (None,) + args, kwargs))
+
+
+def stats() -> typing.Dict[str, CacheStats]:
+    """
+    Returns the statistics of every enabled cache.
+    :return:
+    """
+    return {name: cache.stats() for name, cache in list(_caches.items())}
@@ -1,11 +1,26 @@
+import contextlib
 import dataclasses
+import functools
+import io
+import itertools
 import json
+import operator
 import os
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
+import threading
+import time
 import typing
 
+import cache
+import instrumentation
+import mapper
 import model
+import util
+
+_logger = util.Logger(__name__)
 
 
 # database general
@@ -14,15 +29,382 @@ import model
 #####################################################################################################
 
 
+def _connect_kwargs(
+        database=None,
+        user=None,
+        password=None,
+        host=None,
+        port=None,
+) -> dict:
+    """
+    Returns connection arguments, every argument not specified is taken from environment.
+    :param database:
+    :param user:
+    :param password:
+    :param host:
+    :param port:
+    :return:
+    """
+    port = port if port is not None else os.getenv('DBPORT')
+    return {
+        'database': database if database is not None else os.getenv('DB'),
+        'user': user if user is not None else os.getenv('DBUSER'),
+        'password': password if password is not None else os.getenv('DBPASSWD'),
+        'host': host if host is not None else os.getenv('DBHOST'),
+        'port': int(port) if port is not None else None,
+    }
+
+
+class Connection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection running callbacks registered with after_commit once the current transaction
+    is committed, every connection of this module is one. Used to invalidate cached rows only after
+    the write replacing them is visible to other connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_commit = []
+
+    def commit(self):
+        super().commit()
+        callbacks, self.on_commit = self.on_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        super().rollback()
+        self.on_commit = []
+
+
+def after_commit(conn, callback: typing.Callable[[], typing.Any]):
+    """
+    Runs given callback once the current transaction of given connection is committed, right away
+    if the connection is in autocommit mode or does not support callbacks (not a Connection).
+    :param conn:
+    :param callback:
+    :return:
+    """
+    on_commit = getattr(conn, 'on_commit', None)
+    if on_commit is None or conn.autocommit:
+        callback()
+    else:
+        on_commit.append(callback)
+
+
+def _invalidate(conn, committed: bool, name: str, *args):
+    # drops the cached result of a select whose row was written, after the write is committed
+    if committed:
+        cache.invalidate(name, *args)
+    else:
+        after_commit(conn, functools.partial(cache.invalidate, name, *args))
+
+
+@dataclasses.dataclass(frozen=True)
+class PoolMetrics:
+    min_size: int
+    max_size: int
+    in_use: int
+    idle: int
+    checkouts: int
+    waits: int
+    wait_time_total: float
+    wait_time_max: float
+    timeouts: int
+    created: int
+    closed: int
+    health_check_failures: int
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections. At least min_size connections are kept open, at most
+    max_size connections exist at the same time, checkouts beyond that wait until a connection is
+    returned. Connections idle for longer than max_idle seconds are closed (down to min_size),
+    connections idle for longer than health_check_after seconds are probed before being handed out.
+    """
+
+    def __init__(
+            self,
+            min_size: int = 1,
+            max_size: int = 10,
+            max_idle: float = 300.0,
+            health_check_after: float = 30.0,
+            timeout: float = None,
+            **connect_kwargs,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f'invalid pool size min={min_size} max={max_size}')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self._connect_kwargs = _connect_kwargs(**connect_kwargs)
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned at) with the most recently returned last
+        self._in_use = set()
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._closed_count = 0
+        self._health_check_failures = 0
+
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=Connection, **self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _close(self, conn):
+        # only called while holding the lock
+        self._closed_count += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def owns(self, conn) -> bool:
+        """
+        Returns true if given connection is currently checked out from this pool.
+        :param conn:
+        :return:
+        """
+        with self._cond:
+            return conn in self._in_use
+
+    def getconn(self, timeout: float = None):
+        """
+        Checks out a connection, waits at most timeout seconds (pool default if not specified) if
+        the pool is exhausted.
+        :param timeout:
+        :return:
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError('connection pool is closed')
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if len(self._in_use) < self.max_size:
+                    conn, idle_since = None, None
+                    break
+                waited = True
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f'no connection available within {timeout}s')
+                self._cond.wait(remaining)
+            # reserve the slot before leaving the lock so concurrent checkouts respect max_size
+            placeholder = object()
+            self._in_use.add(placeholder)
+
+        try:
+            if conn is not None and not self._healthy(conn, idle_since):
+                with self._cond:
+                    self._health_check_failures += 1
+                    self._close(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._in_use.discard(placeholder)
+                self._cond.notify()
+            raise
+
+        wait_time = time.monotonic() - started
+        with self._cond:
+            self._in_use.discard(placeholder)
+            self._in_use.add(conn)
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool, an open transaction is rolled back. Broken or discarded
+        connections are closed.
+        :param conn:
+        :param discard:
+        :return:
+        """
+        if not discard and not conn.closed \
+                and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            if conn not in self._in_use:
+                raise psycopg2.pool.PoolError('connection is not checked out from this pool')
+            self._in_use.remove(conn)
+            if discard or conn.closed or self._closed:
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._evict_idle()
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def connection(self, timeout: float = None):
+        """
+        Context manager checking out a connection and returning it afterwards.
+        :param timeout:
+        :return:
+        """
+        conn = self.getconn(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def _evict_idle(self):
+        # idle list is ordered by return time, so the least recently used connections come first
+        now = time.monotonic()
+        while len(self._idle) + len(self._in_use) > self.min_size and self._idle \
+                and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.pop(0)
+            self._close(conn)
+
+    def evict_idle(self):
+        """
+        Closes connections idle for longer than max_idle, keeps at least min_size connections.
+        :return:
+        """
+        with self._cond:
+            self._evict_idle()
+
+    def close(self):
+        """
+        Closes all idle connections, checked out connections are closed when returned.
+        :return:
+        """
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+            self._cond.notify_all()
+
+    def metrics(self) -> PoolMetrics:
+        with self._cond:
+            return PoolMetrics(
+                min_size=self.min_size,
+                max_size=self.max_size,
+                in_use=len(self._in_use),
+                idle=len(self._idle),
+                checkouts=self._checkouts,
+                waits=self._waits,
+                wait_time_total=self._wait_time_total,
+                wait_time_max=self._wait_time_max,
+                timeouts=self._timeouts,
+                created=self._created,
+                closed=self._closed_count,
+                health_check_failures=self._health_check_failures,
+            )
+
+
+_pool: typing.Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(
+        min_size: int = 1,
+        max_size: int = 10,
+        max_idle: float = 300.0,
+        health_check_after: float = 30.0,
+        timeout: float = None,
+        **connect_kwargs,
+) -> ConnectionPool:
+    """
+    Creates the module wide connection pool, afterwards get_connection() without arguments checks
+    out pooled connections and kill_connection() returns them. An existing pool is closed.
+    :param min_size:
+    :param max_size:
+    :param max_idle:
+    :param health_check_after:
+    :param timeout:
+    :param connect_kwargs: database, user, password, host, port, taken from environment if missing
+    :return:
+    """
+    global _pool
+    pool = ConnectionPool(
+        min_size=min_size,
+        max_size=max_size,
+        max_idle=max_idle,
+        health_check_after=health_check_after,
+        timeout=timeout,
+        **connect_kwargs,
+    )
+    with _pool_lock:
+        old, _pool = _pool, pool
+    if old is not None:
+        old.close()
+    return pool
+
+
+def close_pool():
+    """
+    Closes the module wide connection pool, get_connection() opens unpooled connections again.
+    :return:
+    """
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, None
+    if old is not None:
+        old.close()
+
+
+def get_pool() -> typing.Optional[ConnectionPool]:
+    return _pool
+
+
 def get_connection(
-        database=os.getenv('DB'),
-        user=os.getenv('DBUSER'),
-        password=os.getenv('DBPASSWD'),
-        host=os.getenv('DBHOST'),
-        port=int(os.getenv('DBPORT')),
+        database=None,
+        user=None,
+        password=None,
+        host=None,
+        port=None,
 ):
     """
-    Returns database connection, if not specified configuration is taken from environment.
+    Returns database connection, if not specified configuration is taken from environment. If a pool
+    is initialized and no configuration is given, a pooled connection is checked out, hand it back
+    with kill_connection().
     :param database:
     :param user:
     :param password:
@@ -30,51 +412,91 @@ def get_connection(
     :param port:
     :return:
     """
-    return psycopg2.connect(
+    pool = _pool
+    if pool is not None and database is None and user is None and password is None \
+            and host is None and port is None:
+        return pool.getconn()
+    return psycopg2.connect(connection_factory=Connection, **_connect_kwargs(
         database=database,
         user=user,
         password=password,
         host=host,
         port=port,
-    )
+    ))
 
 
 def kill_connection(conn):
     """
-    Closes given connection.
+    Closes given connection, pooled connections are returned to their pool instead.
     :param conn:
     :return:
     """
+    pool = _pool
+    if pool is not None and pool.owns(conn):
+        pool.putconn(conn)
+        return
     try:
         conn.close()
     except psycopg2.Error:
         pass
 
 
+@contextlib.contextmanager
+def connection(timeout: float = None):
+    """
+    Context manager yielding a pooled connection if a pool is initialized, a fresh connection
+    otherwise. The connection is returned or closed afterwards.
+    :param timeout:
+    :return:
+    """
+    pool = _pool
+    if pool is not None:
+        with pool.connection(timeout=timeout) as conn:
+            yield conn
+        return
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        kill_connection(conn)
+
+
 def _execute(
     conn,
     statement: str,
     values: tuple,
     print_exception: bool = True,
+    raise_exception: bool = False,
+    cursor_factory=psycopg2.extras.DictCursor,
 ):
     """
     Executes given prepared statement (with given values) on specified connection, therefore a cursor
     is created. In case of failure a rollback is executed and committed. Occurred error are printable,
-    default is true.
+    default is true. If raise_exception is set errors are raised instead and the transaction is left
+    to the caller. Rows are DictRows by default, pass cursor_factory=None for plain tuples. Every
+    execution is recorded by instrumentation.
     :param conn:
     :param statement:
     :param values:
     :param print_exception:
+    :param raise_exception:
+    :param cursor_factory:
     :return:
     """
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    cur = conn.cursor(cursor_factory=cursor_factory)
+    start = time.perf_counter()
     try:
         cur.execute(statement, values)
     except psycopg2.Error as e:
+        instrumentation.record(statement, values, time.perf_counter() - start, error=e)
+        if raise_exception:
+            raise
         if print_exception:
-            print(e)
+            _logger.error('%s', e)
         cur.execute("rollback")
         conn.commit()
+    else:
+        instrumentation.record(statement, values, time.perf_counter() - start, rows=cur.rowcount)
     return cur
 
 
@@ -90,6 +512,190 @@ def _set_timestamp(target):
     return target
 
 
+def _select_model(
+    conn,
+    statement: str,
+    values: tuple,
+    cls,
+):
+    """
+    Executes given select statement and maps the first row to given model, returns None if there
+    is no row.
+    :param conn:
+    :param statement:
+    :param values:
+    :param cls:
+    :return:
+    """
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=values,
+        cursor_factory=None,
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return mapper.get_mapper(statement, cur.description, cls)(row)
+
+
+_stream_names = itertools.count()
+
+
+def _stream(
+    conn,
+    statement: str,
+    values: tuple,
+    itersize: int = 2000,
+    chunk_size: int = None,
+    cursor_factory=psycopg2.extras.DictCursor,
+    row_mapper: typing.Callable[[typing.Sequence], typing.Callable] = None,
+):
+    """
+    Executes given select statement on a named (server side) cursor and yields its rows, the
+    server sends itersize rows per round trip so memory stays constant however large the result.
+    With chunk_size lists of up to chunk_size rows are yielded instead. row_mapper is called with
+    the cursor description once the first rows arrived and returns the function applied to every
+    row. The cursor lives in the transaction of conn, so do not commit on conn while iterating;
+    the transaction is left open afterwards. The time spent in the cursor (not in the consumer) is
+    recorded by instrumentation as one statement once iteration ends.
+    :param conn:
+    :param statement:
+    :param values:
+    :param itersize:
+    :param chunk_size:
+    :param cursor_factory:
+    :param row_mapper:
+    :return:
+    """
+    # looked up now, the generator runs in the frames of whoever iterates it
+    function = instrumentation.caller()
+    return _stream_rows(conn, statement, values, itersize, chunk_size, cursor_factory, row_mapper, function)
+
+
+def _stream_rows(conn, statement, values, itersize, chunk_size, cursor_factory, row_mapper, function):
+    name = f'stream_{next(_stream_names)}'
+    seconds = 0.0
+    count = 0
+    error = None
+    try:
+        with conn.cursor(name=name, cursor_factory=cursor_factory) as cur:
+            cur.itersize = itersize
+            start = time.perf_counter()
+            cur.execute(statement, values)
+            seconds += time.perf_counter() - start
+            convert = None
+            while True:
+                start = time.perf_counter()
+                rows = cur.fetchmany(itersize if chunk_size is None else chunk_size)
+                seconds += time.perf_counter() - start
+                if not rows:
+                    return
+                count += len(rows)
+                if row_mapper is not None:
+                    if convert is None:
+                        convert = row_mapper(cur.description)
+                    rows = [convert(row) for row in rows]
+                if chunk_size is None:
+                    yield from rows
+                else:
+                    yield rows
+    except psycopg2.Error as e:
+        error = e
+        raise
+    finally:
+        instrumentation.record(statement, values, seconds, rows=count, error=error, function=function)
+
+
+@dataclasses.dataclass(frozen=True)
+class InsertResult:
+    inserted: int
+    updated: int
+    skipped: int
+
+
+_TABLE_COLUMNS = {
+    'summoners': mapper.columns(model.Summoner),
+    'matches': mapper.columns(model.Match),
+    'summoner_matches': mapper.columns(model.SummonerMatch),
+    'teams': mapper.columns(model.Team),
+    'champions': mapper.columns(model.Champion),
+    'timelines': mapper.columns(model.Timeline),
+    'stats': mapper.columns(model.Stat),
+    'participants': mapper.columns(model.Participant),
+    'participant_frame': mapper.columns(model.ParticipantFrame),
+    'events': mapper.columns(model.Event),
+    'duo_games': mapper.columns(model.DuoGame),
+}
+
+# unique keys used as conflict target, events have none so they cannot be updated
+_TABLE_KEYS = {
+    'summoners': ('accountid',),
+    'matches': ('gameid',),
+    'summoner_matches': ('accountid', 'gameid'),
+    'teams': ('gameid', 'teamid'),
+    'champions': ('championid',),
+    'timelines': ('timelineid',),
+    'stats': ('statid',),
+    'participants': ('participantid',),
+    'participant_frame': ('participantid', 'timestamp'),
+    'events': (),
+    'duo_games': ('accountid1', 'accountid2', 'gameid'),
+}
+
+ON_CONFLICT = ('error', 'ignore', 'update')
+
+
+def _with_conflict_handling(
+        statement: str,
+        table: str,
+        on_conflict: str,
+) -> str:
+    """
+    Extends given insert statement by the conflict handling of on_conflict: "error" leaves it as is,
+    "ignore" skips conflicting rows, "update" overwrites conflicting rows and wraps the statement so
+    it returns the number of inserted and the number of affected rows.
+    :param statement:
+    :param table:
+    :param on_conflict:
+    :return:
+    """
+    if on_conflict == 'error':
+        return statement
+    if on_conflict == 'ignore':
+        return f'{statement} ON CONFLICT DO NOTHING'
+    if on_conflict != 'update':
+        raise ValueError(f'unknown conflict handling {on_conflict}, expected one of {ON_CONFLICT}')
+
+    keys = _TABLE_KEYS[table]
+    if not keys:
+        raise ValueError(f'rows of {table} have no unique key and cannot be updated')
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in _TABLE_COLUMNS[table] if column not in keys)
+    # xmax is 0 for freshly inserted rows only
+    return f'WITH upsert AS ({statement} ON CONFLICT ({", ".join(keys)}) DO UPDATE SET {updates} ' \
+           f'RETURNING (xmax = 0) AS inserted) ' \
+           f'SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FROM upsert'
+
+
+def _insert_result(cur,
+                   rows: int,
+                   on_conflict: str,
+                   ) -> InsertResult:
+    """
+    Returns the outcome of an insert statement built by _with_conflict_handling, rows is the number
+    of rows passed to it. Failed statements count as skipped.
+    :param cur:
+    :param rows:
+    :param on_conflict:
+    :return:
+    """
+    if on_conflict == 'update':
+        inserted, affected = cur.fetchone() if cur.description else (0, 0)
+        return InsertResult(inserted=inserted, updated=affected - inserted, skipped=rows - affected)
+    inserted = max(cur.rowcount, 0)
+    return InsertResult(inserted=inserted, updated=0, skipped=rows - inserted)
+
+
 # insert statements
 #####################################################################################################
 #####################################################################################################
@@ -98,91 +704,132 @@ def _set_timestamp(target):
 
 def insert_summoner(conn,
                     summoner: model.Summoner,
-                    ):
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> InsertResult:
     statement = "INSERT INTO summoners " \
                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'summoners', on_conflict)
 
     summoner = _set_timestamp(summoner)
     values = dataclasses.astuple(summoner)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=False,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    _invalidate(conn, commit, 'select_summoner', summoner.name)
+    return _insert_result(cur, 1, on_conflict)
 
 
 def insert_match(conn,
                  match: model.Match,
-                 ):
+                 commit: bool = True,
+                 on_conflict: str = 'error',
+                 ) -> InsertResult:
     statement = "INSERT INTO matches " \
                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'matches', on_conflict)
     values = dataclasses.astuple(match)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    _invalidate(conn, commit, 'select_match_by_gameid', match.game_id)
+    _invalidate(conn, commit, 'select_general_game_info', match.game_id)
+    return _insert_result(cur, 1, on_conflict)
 
 
 def insert_summoner_match(conn,
-                          summoner_match: model.SummonerMatch
-                          ):
+                          summoner_match: model.SummonerMatch,
+                          commit: bool = True,
+                          on_conflict: str = 'error',
+                          ) -> InsertResult:
     statement = "INSERT INTO summoner_matches " \
                 "VALUES (%s, %s)"
+    statement = _with_conflict_handling(statement, 'summoner_matches', on_conflict)
     values = dataclasses.astuple(summoner_match)
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
 
 
 def insert_team(conn,
-                team: model.Team
-                ):
+                team: model.Team,
+                commit: bool = True,
+                on_conflict: str = 'error',
+                ) -> InsertResult:
     statement = "INSERT INTO teams " \
                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'teams', on_conflict)
     values = dataclasses.astuple(team)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    _invalidate(conn, commit, 'select_team_from_teamid_and_gameid', team.game_id, team.team_id)
+    return _insert_result(cur, 1, on_conflict)
 
 
 def insert_champion(conn,
-                    champion: model.Champion
-                    ):
+                    champion: model.Champion,
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> InsertResult:
     statement = "INSERT INTO champions " \
                 "VALUES (%s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'champions', on_conflict)
 
     values = dataclasses.astuple(champion)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
 
+    _invalidate(conn, commit, 'select_champion_name_id', champion.champion_id)
+    return _insert_result(cur, 1, on_conflict)
 
+
+@cache.cacheable
 def select_champion_name_id(
     conn,
     champ_id: str,
@@ -196,12 +843,29 @@ def select_champion_name_id(
     return cur.fetchone()
 
 
-def insert_timeline(conn,
-                    timeline: model.Timeline
-                    ):
-    statement = "INSERT INTO timelines " \
-                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
-    values = (
+def select_all_champions(conn):
+    statement = 'SELECT * FROM champions'
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=()
+    )
+    return cur.fetchall()
+
+
+def select_all_queue_types(conn):
+    statement = 'SELECT * FROM queue_types'
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=()
+    )
+    return cur.fetchall()
+
+
+def _timeline_values(timeline: model.Timeline) -> tuple:
+    # deltas are stored as json
+    return (
         timeline.timeline_id,
         json.dumps(timeline.creeps_per_min_deltas),
         json.dumps(timeline.xp_per_min_deltas),
@@ -212,19 +876,36 @@ def insert_timeline(conn,
         json.dumps(timeline.damage_taken_diff_per_min_deltas)
     )
 
-    _execute(
+
+def insert_timeline(conn,
+                    timeline: model.Timeline,
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> InsertResult:
+    statement = "INSERT INTO timelines " \
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'timelines', on_conflict)
+    values = _timeline_values(timeline)
+
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
 
 
 def insert_stat(conn,
-                stat: model.Stat
-                ):
+                stat: model.Stat,
+                commit: bool = True,
+                on_conflict: str = 'error',
+                ) -> InsertResult:
     statement = "INSERT INTO stats " \
                 "VALUES (" \
                 "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s," \
@@ -233,15 +914,20 @@ def insert_stat(conn,
                 "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s," \
                 "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s," \
                 "%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'stats', on_conflict)
     values = dataclasses.astuple(stat)
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
 
 
 def select_participant_from_gameid_accountid(
@@ -253,81 +939,456 @@ def select_participant_from_gameid_accountid(
                 "WHERE gameid = %s AND accountid = %s"
     values = (game_id, account_id)
 
-    cur = _execute(
+    participant = _select_model(
         conn=conn,
         statement=statement,
         values=values,
+        cls=model.Participant,
     )
 
     conn.commit()
-    res = cur.fetchone()
-
-    if not res:
-        return None
-
-    return model.Participant(
-        participant_id=res[0],
-        game_id=res[1],
-        account_id=res[2],
-        champion_id=res[3],
-        stat_id=res[4],
-        team_id=res[5],
-        timeline_id=res[6],
-        spell1_id=res[7],
-        spell2_id=res[8],
-        role=res[9],
-        lane=res[10],
-    )
+    return participant
 
 
 def insert_participant(conn,
-                       participant: model.Participant
-                       ):
+                       participant: model.Participant,
+                       commit: bool = True,
+                       on_conflict: str = 'error',
+                       ) -> InsertResult:
     statement = "INSERT INTO participants " \
                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'participants', on_conflict)
 
     values = dataclasses.astuple(participant)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
 
 
-def insert_event(conn, event: model.Event):
+def insert_event(conn,
+                 event: model.Event,
+                 commit: bool = True,
+                 on_conflict: str = 'error',
+                 ) -> InsertResult:
     statement = "INSERT INTO events VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s," \
                 " %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'events', on_conflict)
 
     values = dataclasses.astuple(event)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
     )
 
-    conn.commit()
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
 
 
-def insert_participant_frame(conn, participant_frame: model.ParticipantFrame):
+def insert_participant_frame(conn,
+                             participant_frame: model.ParticipantFrame,
+                             commit: bool = True,
+                             on_conflict: str = 'error',
+                             ) -> InsertResult:
     statement = "INSERT INTO participant_frame " \
                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    statement = _with_conflict_handling(statement, 'participant_frame', on_conflict)
 
     values = dataclasses.astuple(participant_frame)
 
-    _execute(
+    cur = _execute(
         conn=conn,
         statement=statement,
         values=values,
         print_exception=True,
+        raise_exception=not commit,
+    )
+
+    if commit:
+        conn.commit()
+
+    return _insert_result(cur, 1, on_conflict)
+
+
+def insert_duo_games(conn,
+                     game_ids: typing.Iterable,
+                     commit: bool = True,
+                     ) -> InsertResult:
+    """
+    Materializes the duo_games rows (every pair of summoners of the same team) of given games from
+    participants, stats and teams. Existing rows of the games are overwritten, so it can be run
+    again after a game changed.
+    :param conn:
+    :param game_ids:
+    :param commit:
+    :return:
+    """
+    statement = "INSERT INTO duo_games " \
+                "SELECT p1.accountid, p2.accountid, p1.gameid, p1.teamid, t.win, " \
+                "p1.participantid, p2.participantid, p1.statid, p2.statid, p1.role, p2.role, p1.lane, p2.lane, " \
+                "p1.championid, p2.championid, st1.kills, st2.kills, st1.deaths, st2.deaths, " \
+                "st1.assists, st2.assists, st1.totalminionskilled, st2.totalminionskilled " \
+                "FROM participants p1 " \
+                "JOIN participants p2 ON p2.gameid = p1.gameid AND p2.teamid = p1.teamid " \
+                "AND p1.accountid < p2.accountid " \
+                "JOIN teams t ON t.teamid = p1.teamid AND t.gameid = p1.gameid " \
+                "JOIN stats st1 ON st1.statid = p1.statid " \
+                "JOIN stats st2 ON st2.statid = p2.statid " \
+                "WHERE p1.gameid = ANY(%s::bigint[])"
+    statement = _with_conflict_handling(statement, 'duo_games', 'update')
+
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=([int(game_id) for game_id in game_ids],),
+        print_exception=True,
+        raise_exception=not commit,
+    )
+
+    if commit:
+        conn.commit()
+
+    inserted, affected = cur.fetchone() if cur.description else (0, 0)
+    return InsertResult(inserted=inserted, updated=affected - inserted, skipped=0)
+
+
+# bulk insert statements
+#####################################################################################################
+#####################################################################################################
+#####################################################################################################
+
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_array_element(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _copy_value(value) -> str:
+    """
+    Formats a single value for COPY ... FROM STDIN in text format, the way psycopg2 would adapt it
+    for an INSERT: None is NULL, lists become arrays.
+    :param value:
+    :return:
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        value = '{' + ','.join(map(_copy_array_element, value)) + '}'
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _CopyBuffer(io.TextIOBase):
+    """
+    File-like object handing rows to copy_expert as formatted lines, so rows are streamed instead of
+    being rendered into one large string first.
+    """
+
+    def __init__(self, rows: typing.Iterable[tuple]):
+        self._rows = iter(rows)
+        self._pending = ''
+
+    def readable(self):
+        return True
+
+    def _next_line(self) -> str:
+        row = next(self._rows, None)
+        if row is None:
+            return ''
+        return '\t'.join(map(_copy_value, row)) + '\n'
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            data = self._pending + ''.join(iter(self._next_line, ''))
+            self._pending = ''
+            return data
+        chunks = [self._pending]
+        length = len(self._pending)
+        while length < size:
+            line = self._next_line()
+            if not line:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = ''.join(chunks)
+        self._pending = data[size:]
+        return data[:size]
+
+
+_row_getters = {}
+
+
+def _row_values(cls) -> typing.Callable[[typing.Any], tuple]:
+    """
+    Returns a function extracting the field values of given dataclass in field order, the same
+    values dataclasses.astuple would return for flat models without copying them.
+    :param cls:
+    :return:
+    """
+    getter = _row_getters.get(cls)
+    if getter is None:
+        getter = operator.attrgetter(*(field.name for field in dataclasses.fields(cls)))
+        _row_getters[cls] = getter
+    return getter
+
+
+def _insert_bulk(
+        conn,
+        table: str,
+        rows: typing.Iterable[tuple],
+        method: str = 'copy',
+        batch_size: int = 1000,
+        commit: bool = True,
+        on_conflict: str = 'error',
+) -> InsertResult:
+    """
+    Inserts given rows into given table. Using method "copy" rows are streamed via COPY FROM STDIN,
+    if copy cannot take the rows (inside a savepoint, so the surrounding transaction stays intact)
+    they are inserted via multi-row VALUES statements of batch_size rows each, which is also used
+    directly for method "values". Constraint violations are raised right away, they would fail the
+    VALUES statements just the same. Unless on_conflict is "error" rows are copied into a temporary staging
+    table first and moved with INSERT ... ON CONFLICT. Errors are raised, if commit is set the
+    transaction is rolled back first.
+    :param conn:
+    :param table:
+    :param rows:
+    :param method: "copy" or "values"
+    :param batch_size:
+    :param commit:
+    :param on_conflict: "error", "ignore" or "update"
+    :return:
+    """
+    if method not in ('copy', 'values'):
+        raise ValueError(f'unknown bulk insert method {method}')
+    statement = _with_conflict_handling(f'INSERT INTO {table} VALUES %s', table, on_conflict)
+    # rows are consumed twice if copy falls back
+    rows = rows if isinstance(rows, (list, tuple)) else list(rows)
+    if not rows:
+        return InsertResult(inserted=0, updated=0, skipped=0)
+
+    cur = conn.cursor()
+    try:
+        result = None
+        if method == 'copy':
+            result = _copy_rows(cur, table, rows, on_conflict)
+        if result is None:
+            inserted, updated, skipped = 0, 0, 0
+            for offset in range(0, len(rows), batch_size):
+                page = rows[offset:offset + batch_size]
+                start = time.perf_counter()
+                try:
+                    psycopg2.extras.execute_values(cur, statement, page, page_size=len(page))
+                except psycopg2.Error as e:
+                    instrumentation.record(statement, page, time.perf_counter() - start, error=e)
+                    raise
+                instrumentation.record(statement, page, time.perf_counter() - start, rows=len(page))
+                page_result = _insert_result(cur, len(page), on_conflict)
+                inserted += page_result.inserted
+                updated += page_result.updated
+                skipped += page_result.skipped
+            result = InsertResult(inserted=inserted, updated=updated, skipped=skipped)
+    except psycopg2.Error:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if commit:
+        conn.commit()
+    return result
+
+
+def _copy_rows(cur,
+               table: str,
+               rows: typing.Sequence[tuple],
+               on_conflict: str,
+               ) -> typing.Optional[InsertResult]:
+    """
+    Copies given rows into given table inside a savepoint, returns None if copy could not take the
+    rows (a value whose text form postgres reads differently than psycopg2's adaption, or copy not
+    being supported by the server) and the savepoint was rolled back. Other errors, most of all
+    integrity errors, are raised.
+    :param cur:
+    :param table:
+    :param rows:
+    :param on_conflict:
+    :return:
+    """
+    staging = f'bulk_{table}'
+    if on_conflict != 'error':
+        # kept for the session, emptied on commit and before every use
+        cur.execute(f'CREATE TEMPORARY TABLE IF NOT EXISTS {staging} '
+                    f'(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+
+    # recorded as one statement, the copy and for conflict handling the move out of staging
+    statement = f'COPY {table} FROM STDIN' if on_conflict == 'error' else \
+        f'COPY {staging} FROM STDIN; ' + \
+        _with_conflict_handling(f'INSERT INTO {table} SELECT * FROM {staging}', table, on_conflict)
+    cur.execute('SAVEPOINT bulk_copy')
+    start = time.perf_counter()
+    try:
+        if on_conflict == 'error':
+            cur.copy_expert(statement, _CopyBuffer(rows))
+            result = InsertResult(inserted=len(rows), updated=0, skipped=0)
+        else:
+            cur.execute(f'TRUNCATE {staging}')
+            cur.copy_expert(f'COPY {staging} FROM STDIN', _CopyBuffer(rows))
+            cur.execute(_with_conflict_handling(f'INSERT INTO {table} SELECT * FROM {staging}', table, on_conflict))
+            result = _insert_result(cur, len(rows), on_conflict)
+        cur.execute('RELEASE SAVEPOINT bulk_copy')
+    except psycopg2.Error as e:
+        instrumentation.record(statement, (), time.perf_counter() - start, error=e)
+        if not isinstance(e, (psycopg2.DataError, psycopg2.NotSupportedError)):
+            raise
+        cur.execute('ROLLBACK TO SAVEPOINT bulk_copy')
+        return None
+    instrumentation.record(statement, (), time.perf_counter() - start, rows=result.inserted + result.updated)
+    return result
+
+
+def insert_teams_bulk(conn,
+                      teams: typing.Iterable[model.Team],
+                      method: str = 'copy',
+                      batch_size: int = 1000,
+                      commit: bool = True,
+                      on_conflict: str = 'error',
+                      ) -> InsertResult:
+    teams = list(teams)
+    values = _row_values(model.Team)
+    result = _insert_bulk(
+        conn=conn,
+        table='teams',
+        rows=[values(team) for team in teams],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+    for team in teams:
+        _invalidate(conn, commit, 'select_team_from_teamid_and_gameid', team.game_id, team.team_id)
+    return result
+
+
+def insert_stats_bulk(conn,
+                      stats: typing.Iterable[model.Stat],
+                      method: str = 'copy',
+                      batch_size: int = 1000,
+                      commit: bool = True,
+                      on_conflict: str = 'error',
+                      ) -> InsertResult:
+    values = _row_values(model.Stat)
+    return _insert_bulk(
+        conn=conn,
+        table='stats',
+        rows=[values(stat) for stat in stats],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+
+
+def insert_timelines_bulk(conn,
+                          timelines: typing.Iterable[model.Timeline],
+                          method: str = 'copy',
+                          batch_size: int = 1000,
+                          commit: bool = True,
+                          on_conflict: str = 'error',
+                          ) -> InsertResult:
+    return _insert_bulk(
+        conn=conn,
+        table='timelines',
+        rows=[_timeline_values(timeline) for timeline in timelines],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+
+
+def insert_participants_bulk(conn,
+                             participants: typing.Iterable[model.Participant],
+                             method: str = 'copy',
+                             batch_size: int = 1000,
+                             commit: bool = True,
+                             on_conflict: str = 'error',
+                             ) -> InsertResult:
+    values = _row_values(model.Participant)
+    return _insert_bulk(
+        conn=conn,
+        table='participants',
+        rows=[values(participant) for participant in participants],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+
+
+def insert_events_bulk(conn,
+                       events: typing.Iterable[model.Event],
+                       method: str = 'copy',
+                       batch_size: int = 1000,
+                       commit: bool = True,
+                       on_conflict: str = 'error',
+                       ) -> InsertResult:
+    values = _row_values(model.Event)
+    return _insert_bulk(
+        conn=conn,
+        table='events',
+        rows=[values(event) for event in events],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+
+
+def insert_participant_frames_bulk(conn,
+                                   participant_frames: typing.Iterable[model.ParticipantFrame],
+                                   method: str = 'copy',
+                                   batch_size: int = 1000,
+                                   commit: bool = True,
+                                   on_conflict: str = 'error',
+                                   ) -> InsertResult:
+    values = _row_values(model.ParticipantFrame)
+    return _insert_bulk(
+        conn=conn,
+        table='participant_frame',
+        rows=[values(participant_frame) for participant_frame in participant_frames],
+        method=method,
+        batch_size=batch_size,
+        commit=commit,
+        on_conflict=on_conflict,
     )
 
-    conn.commit()
 
 # select statements
 #####################################################################################################
@@ -352,6 +1413,7 @@ def select_count_summoner_match(conn,
     return cur.fetchone()[0]
 
 
+@cache.cacheable
 def select_summoner(conn,
                     summoner_name: str,
                     ):
@@ -359,28 +1421,15 @@ def select_summoner(conn,
                 "WHERE name = %s"
     values = (summoner_name,)
 
-    cur = _execute(
+    summoner = _select_model(
         conn=conn,
         statement=statement,
         values=values,
+        cls=model.Summoner,
     )
 
     conn.commit()
-    res = cur.fetchone()
-
-    if res is None:
-        return None
-
-    return model.Summoner(
-        account_id=res[0],
-        summoner_id=res[1],
-        puuid=res[2],
-        name=res[3],
-        summoner_level=res[4],
-        profile_icon_id=res[5],
-        revision_date=res[6],
-        timestamp=res[7]
-    )
+    return summoner
 
 
 def select_stat_from_participant(conn,
@@ -401,132 +1450,29 @@ def select_stat_from_participant(conn,
 
 def select_stats(conn,
                  statid: str,
-                 ):
+                 ) -> model.Stat:
     statement = "SELECT * FROM stats " \
                 "WHERE statid = %s"
     values = (statid,)
 
-    cur = _execute(
+    return _select_model(
         conn=conn,
         statement=statement,
         values=values,
+        cls=model.Stat,
     )
 
-    stat_raw = cur.fetchone()
-
-    return model.Stat(
-        stat_id=stat_raw[0],
-        win=stat_raw[1],
-        items=stat_raw[2],
-        kills=stat_raw[3],
-        deaths=stat_raw[4],
-        assists=stat_raw[5],
-        largest_killing_spree=stat_raw[6],
-        largest_multi_kill=stat_raw[7],
-        killing_sprees=stat_raw[8],
-        longest_time_spent_living=stat_raw[9],
-        double_kills=stat_raw[10],
-        triple_kills=stat_raw[11],
-        quadra_kills=stat_raw[12],
-        penta_kills=stat_raw[13],
-        total_damage_dealt=stat_raw[14],
-        magic_damage_dealt=stat_raw[15],
-        physical_damage_dealt=stat_raw[16],
-        true_damage_dealt=stat_raw[17],
-        largest_critical_strike=stat_raw[18],
-        total_damage_dealt_to_champions=stat_raw[19],
-        magic_damage_dealt_to_champions=stat_raw[20],
-        physical_damage_dealt_to_champions=stat_raw[21],
-        true_damage_dealt_to_champions=stat_raw[22],
-        total_heal=stat_raw[23],
-        total_units_healed=stat_raw[24],
-        damage_self_mitigated=stat_raw[25],
-        damage_dealt_to_objectives=stat_raw[26],
-        damage_dealt_to_turrets=stat_raw[27],
-        vision_score=stat_raw[28],
-        time_ccing_others=stat_raw[29],
-        total_damage_taken=stat_raw[30],
-        magical_damage_taken=stat_raw[31],
-        physical_damage_taken=stat_raw[32],
-        true_damage_taken=stat_raw[33],
-        gold_earned=stat_raw[34],
-        gold_spent=stat_raw[35],
-        turret_kills=stat_raw[36],
-        inhibitor_kills=stat_raw[37],
-        total_minions_killed=stat_raw[38],
-        neutral_minions_killed_team_jungle=stat_raw[39],
-        neutral_minions_killed_enemy_jungle=stat_raw[40],
-        total_time_crowd_control_dealt=stat_raw[41],
-        champ_level=stat_raw[42],
-        vision_wards_bought_in_game=stat_raw[43],
-        sight_wards_bought_in_game=stat_raw[44],
-        wards_placed=stat_raw[45],
-        wards_killed=stat_raw[46],
-        first_blood_kill=stat_raw[47],
-        first_blood_assist=stat_raw[48],
-        first_tower_kill=stat_raw[49],
-        first_tower_assist=stat_raw[50],
-        first_inhibitor_kill=stat_raw[51],
-        first_inhibitor_assist=stat_raw[52],
-        combat_player_score=stat_raw[53],
-        objective_player_score=stat_raw[54],
-        total_player_score=stat_raw[55],
-        total_score_rank=stat_raw[56],
-        perk0=stat_raw[57],
-        perk0_var1=stat_raw[58],
-        perk0_var2=stat_raw[59],
-        perk0_var3=stat_raw[60],
-        perk1=stat_raw[61],
-        perk1_var1=stat_raw[62],
-        perk1_var2=stat_raw[63],
-        perk1_var3=stat_raw[64],
-        perk2=stat_raw[65],
-        perk2_var1=stat_raw[66],
-        perk2_var2=stat_raw[67],
-        perk2_var3=stat_raw[68],
-        perk3=stat_raw[69],
-        perk3_var1=stat_raw[70],
-        perk3_var2=stat_raw[71],
-        perk3_var3=stat_raw[72],
-        perk4=stat_raw[73],
-        perk4_var1=stat_raw[74],
-        perk4_var2=stat_raw[75],
-        perk4_var3=stat_raw[76],
-        perk5=stat_raw[77],
-        perk5_var1=stat_raw[78],
-        perk5_var2=stat_raw[79],
-        perk5_var3=stat_raw[80],
-        perk_primary_style=stat_raw[81],
-        perk_sub_style=stat_raw[82],
-        stat_perk0=stat_raw[83],
-        stat_perk1=stat_raw[84],
-        stat_perk2=stat_raw[85],
-    )
-
-
-def select_participant_from_stat(conn, stat: model.Stat):
+
+def select_participant_from_stat(conn, stat: model.Stat) -> model.Participant:
     statement = "SELECT * FROM participants " \
                 "WHERE statid = %s"
     values = (stat.stat_id,)
 
-    cur = _execute(
+    return _select_model(
         conn=conn,
         statement=statement,
         values=values,
-    )
-
-    participant = cur.fetchone()
-    return model.Participant(
-        participant_id=participant[0],
-        game_id=participant[1],
-        account_id=participant[2],
-        champion_id=participant[3],
-        stat_id=participant[4],
-        timeline_id=participant[5],
-        spell1_id=participant[6],
-        spell2_id=participant[7],
-        role=participant[8],
-        lane=participant[9]
+        cls=model.Participant,
     )
 
 
@@ -551,40 +1497,27 @@ def select_common_games(conn, s1: model.Summoner, s2: model.Summoner):
     return cur.fetchall()
 
 
-def select_participant(conn, participant_id: str):
+def select_participant(conn, participant_id: str) -> model.Participant:
     statement = "SELECT * FROM participants p WHERE p.participantid = %s"
     values = (participant_id,)
 
-    cur = _execute(
+    return _select_model(
         conn=conn,
         statement=statement,
-        values=values
-    )
-    participant = cur.fetchone()
-
-    return model.Participant(
-        participant_id=participant["participantid"],
-        game_id=participant["gameid"],
-        account_id=participant["accountid"],
-        champion_id=participant["championid"],
-        stat_id=participant["statid"],
-        team_id=participant["teamid"],
-        timeline_id=participant["timelineid"],
-        spell1_id=participant["spell1id"],
-        spell2_id=participant["spell2id"],
-        role=participant["role"],
-        lane=participant["lane"]
+        values=values,
+        cls=model.Participant,
     )
 
 
-def select_participant_frames(conn, participant_id: str):
+def select_participant_frames(conn, participant_id: str, as_tuples: bool = False):
     statement = "SELECT * FROM participant_frame p WHERE p.participantid = %s"
     values = (participant_id,)
 
     cur = _execute(
         conn=conn,
         statement=statement,
-        values=values
+        values=values,
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
     )
 
     return cur.fetchall()
@@ -606,28 +1539,11 @@ def select_opponent(conn, participant_id: str, game_id: str, position: (str, str
     statement = "SELECT * FROM participants p WHERE p.gameid = %s AND p.lane = %s AND p.role = %s AND p.participantid <> %s"
     values = (game_id, position[0], position[1], participant_id)
 
-    cur = _execute(
+    return _select_model(
         conn=conn,
         statement=statement,
-        values=values
-    )
-
-    opponent = cur.fetchone()
-
-    if opponent is None:
-        return None
-    return model.Participant(
-        participant_id=opponent["participantid"],
-        game_id=opponent["gameid"],
-        account_id=opponent["accountid"],
-        champion_id=opponent["championid"],
-        stat_id=opponent["statid"],
-        team_id=opponent["teamid"],
-        timeline_id=opponent["timelineid"],
-        spell1_id=opponent["spell1id"],
-        spell2_id=opponent["spell2id"],
-        role=opponent["role"],
-        lane=opponent["lane"]
+        values=values,
+        cls=model.Participant,
     )
 
 
@@ -659,8 +1575,11 @@ def select_overall_kill_information(conn, game_id: str, team_id: int):
 
 
 def select_game_events(conn, game_id: str):
-    statement = "SELECT * FROM events e  WHERE e.participantid = %s"
-    values = (participant_id,)
+    statement = "SELECT e.* FROM events e " \
+                "JOIN participants p ON p.participantid = e.participantid " \
+                "WHERE p.gameid = %s " \
+                "ORDER BY e.timestamp"
+    values = (game_id,)
 
     cur = _execute(
         conn=conn,
@@ -675,7 +1594,7 @@ def select_kill_timeline(conn, game_id: str, team_id: int):
     statement = "SELECT p.participantid, e.timestamp, e.position, e.killerid killer, e.victimid victim, p.teamid, " \
                 "e.assistingparticipantids FROM events e " \
                 "JOIN participants p ON e.participantid = p.participantid " \
-                "WHERE p.gameid = %s AND type = 'CHAMPION_KILL' AND p.teamid = %s" \
+                "WHERE p.gameid = %s AND type = 'CHAMPION_KILL' AND p.teamid = %s " \
                 "ORDER BY e.timestamp"
     values = (game_id, team_id,)
 
@@ -691,7 +1610,7 @@ def select_all_kill_timeline(conn, game_id: str):
     statement = "SELECT p.participantid, e.timestamp, e.position, e.killerid killer, e.victimid victim, p.teamid, " \
                 "e.assistingparticipantids FROM events e " \
                 "JOIN participants p ON e.participantid = p.participantid " \
-                "WHERE p.gameid = %s AND type = 'CHAMPION_KILL'" \
+                "WHERE p.gameid = %s AND type = 'CHAMPION_KILL' " \
                 "ORDER BY e.timestamp"
     values = (game_id,)
 
@@ -703,31 +1622,123 @@ def select_all_kill_timeline(conn, game_id: str):
 
     return cur.fetchall()
 
-def select_all_participants(conn):
-    statement = "SELECT * FROM stats s JOIN participants p ON s.statid = p.statid"
+_SELECT_ALL_PARTICIPANTS = "SELECT * FROM stats s JOIN participants p ON s.statid = p.statid"
+
+
+def select_all_participants(conn, as_tuples: bool = False):
+    statement = _SELECT_ALL_PARTICIPANTS
 
     cur = _execute(
         conn=conn,
         statement=statement,
-        values=()
+        values=(),
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
     )
 
     return cur.fetchall()
 
-def select_all_games(conn):
-    statement = "SELECT DISTINCT s1.gameid, s1.accountid s1_accountid, p1.participantid s1_participantid, " \
-                "p1.statid s1_statid, p1.teamid s1_teamid, p1.role s1_role, p1.lane s1_lane, t.win from summoner_matches s1 " \
-                "JOIN participants p1 ON p1.accountid = s1.accountid AND p1.gameid = s1.gameid " \
-                "JOIN teams t ON t.teamid = p1.teamid AND t.gameid = s1.gameid"
+
+def _participant_mapper(description):
+    # stats columns come first, the participant columns start behind them
+    stat = mapper.get_mapper(_SELECT_ALL_PARTICIPANTS, description, model.Stat)
+    participant = mapper.get_mapper(
+        _SELECT_ALL_PARTICIPANTS,
+        description,
+        model.Participant,
+        start=len(mapper.columns(model.Stat)),
+    )
+    return lambda row: (stat(row), participant(row))
+
+
+def iter_all_participants(conn, itersize: int = 2000, as_models: bool = False):
+    """
+    Streaming variant of select_all_participants, see _stream.
+    :param conn:
+    :param itersize: rows fetched per round trip
+    :param as_models: yield (model.Stat, model.Participant) tuples instead of rows
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_PARTICIPANTS,
+        values=(),
+        itersize=itersize,
+        cursor_factory=None if as_models else psycopg2.extras.DictCursor,
+        row_mapper=_participant_mapper if as_models else None,
+    )
+
+
+def chunk_all_participants(conn, chunk_size: int = 10000, as_models: bool = False):
+    """
+    Like iter_all_participants but yields lists of up to chunk_size rows.
+    :param conn:
+    :param chunk_size:
+    :param as_models:
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_PARTICIPANTS,
+        values=(),
+        itersize=chunk_size,
+        chunk_size=chunk_size,
+        cursor_factory=None if as_models else psycopg2.extras.DictCursor,
+        row_mapper=_participant_mapper if as_models else None,
+    )
+
+_SELECT_ALL_GAMES = "SELECT DISTINCT s1.gameid, s1.accountid s1_accountid, p1.participantid s1_participantid, " \
+                    "p1.statid s1_statid, p1.teamid s1_teamid, p1.role s1_role, p1.lane s1_lane, t.win from summoner_matches s1 " \
+                    "JOIN participants p1 ON p1.accountid = s1.accountid AND p1.gameid = s1.gameid " \
+                    "JOIN teams t ON t.teamid = p1.teamid AND t.gameid = s1.gameid"
+
+
+def select_all_games(conn, as_tuples: bool = False):
+    statement = _SELECT_ALL_GAMES
     cur = _execute(
         conn=conn,
         statement=statement,
-        values=()
+        values=(),
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
     )
 
     return cur.fetchall()
 
-def select_game_frames(conn, game_id:str):
+
+def iter_all_games(conn, itersize: int = 2000, as_tuples: bool = False):
+    """
+    Streaming variant of select_all_games, see _stream.
+    :param conn:
+    :param itersize: rows fetched per round trip
+    :param as_tuples:
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_GAMES,
+        values=(),
+        itersize=itersize,
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
+    )
+
+
+def chunk_all_games(conn, chunk_size: int = 10000, as_tuples: bool = False):
+    """
+    Like iter_all_games but yields lists of up to chunk_size rows.
+    :param conn:
+    :param chunk_size:
+    :param as_tuples:
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_GAMES,
+        values=(),
+        itersize=chunk_size,
+        chunk_size=chunk_size,
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
+    )
+
+def select_game_frames(conn, game_id: str, as_tuples: bool = False):
     statement = "SELECT * FROM participant_frame f " \
                 "JOIN participants p ON p.participantid = f.participantid " \
                 "WHERE p.gameid = %s " \
@@ -735,7 +1746,29 @@ def select_game_frames(conn, game_id:str):
     cur = _execute(
         conn=conn,
         statement=statement,
-        values=(game_id,)
+        values=(game_id,),
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
+    )
+
+    return cur.fetchall()
+
+
+def select_game_frame_columns(conn, game_id: str):
+    # numeric columns of all frames of a game as tuples, the position is split into x and y. Rows
+    # written before positions were stored as "x,y" hold "(x, y)" or "({x}, {y})", so parentheses,
+    # braces and blanks are stripped
+    statement = "SELECT f.timestamp, f.participantid, p.teamid, f.totalgold, f.xp, f.level, " \
+                "f.minionskilled, f.jungleminionskilled, " \
+                "NULLIF(btrim(split_part(btrim(f.position, '()'), ',', 1), ' {}'), '')::integer x, " \
+                "NULLIF(btrim(split_part(btrim(f.position, '()'), ',', 2), ' {}'), '')::integer y FROM participant_frame f " \
+                "JOIN participants p ON p.participantid = f.participantid " \
+                "WHERE p.gameid = %s " \
+                "ORDER BY f.timestamp"
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=(game_id,),
+        cursor_factory=None,
     )
 
     return cur.fetchall()
@@ -762,6 +1795,57 @@ def select_common_game_stats(conn, s1: model.Summoner, s2: model.Summoner):
     return cur.fetchall()
 
 
+def select_duo_games(conn, s1: model.Summoner, s2: model.Summoner):
+    """
+    Reads the games of s1 and s2 in the same team from duo_games. Rows have the columns of
+    select_common_games and select_common_game_stats (s1_* and s2_* as passed, not as stored).
+    :param conn:
+    :param s1:
+    :param s2:
+    :return:
+    """
+    if s1.account_id <= s2.account_id:
+        sides = (('s1', '1'), ('s2', '2'))
+    else:
+        sides = (('s1', '2'), ('s2', '1'))
+    columns = ', '.join(
+        f'accountid{n} {s}_accountid, participantid{n} {s}_participantid, statid{n} {s}_statid, '
+        f'teamid {s}_teamid, role{n} {s}_role, lane{n} {s}_lane, championid{n} {s}_champion, '
+        f'kills{n} {s}_kills, deaths{n} {s}_deaths, assists{n} {s}_assists, '
+        f'totalminionskilled{n} {s}_totalminionskilled'
+        for s, n in sides
+    )
+    statement = f"SELECT gameid, win, {columns} FROM duo_games " \
+                f"WHERE accountid1 = %s AND accountid2 = %s"
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=tuple(sorted((s1.account_id, s2.account_id))),
+    )
+
+    return cur.fetchall()
+
+
+def select_game_ids(conn, after: int = None, limit: int = 1000) -> typing.List[int]:
+    """
+    Returns up to limit ids of stored games in ascending order, only those greater than after if
+    given. Pass the last returned id as after to page through all games.
+    :param conn:
+    :param after:
+    :param limit:
+    :return:
+    """
+    statement = "SELECT gameid FROM matches WHERE gameid > %s ORDER BY gameid LIMIT %s"
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        # game ids are positive
+        values=(-1 if after is None else after, limit),
+        cursor_factory=None,
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
 def select_team_gold(conn, game_id: str, team_id):
     statement = "SELECT SUM(s.goldearned) gold FROM stats s " \
                 "JOIN participants p ON p.statid = s.statid " \
@@ -774,16 +1858,61 @@ def select_team_gold(conn, game_id: str, team_id):
     return cur.fetchall()
 
 
-def select_all_summoners(conn):
-    statement = "SELECT * FROM summoners"
+_SELECT_ALL_SUMMONERS = "SELECT * FROM summoners"
+
+
+def select_all_summoners(conn, as_tuples: bool = False):
+    statement = _SELECT_ALL_SUMMONERS
     cur = _execute(
         conn=conn,
         statement=statement,
-        values=()
+        values=(),
+        cursor_factory=None if as_tuples else psycopg2.extras.DictCursor,
     )
     return cur.fetchall()
 
 
+def _summoner_mapper(description):
+    return mapper.get_mapper(_SELECT_ALL_SUMMONERS, description, model.Summoner)
+
+
+def iter_all_summoners(conn, itersize: int = 2000, as_models: bool = False):
+    """
+    Streaming variant of select_all_summoners, see _stream.
+    :param conn:
+    :param itersize: rows fetched per round trip
+    :param as_models: yield model.Summoner instead of rows
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_SUMMONERS,
+        values=(),
+        itersize=itersize,
+        cursor_factory=None if as_models else psycopg2.extras.DictCursor,
+        row_mapper=_summoner_mapper if as_models else None,
+    )
+
+
+def chunk_all_summoners(conn, chunk_size: int = 10000, as_models: bool = False):
+    """
+    Like iter_all_summoners but yields lists of up to chunk_size rows.
+    :param conn:
+    :param chunk_size:
+    :param as_models:
+    :return:
+    """
+    return _stream(
+        conn=conn,
+        statement=_SELECT_ALL_SUMMONERS,
+        values=(),
+        itersize=chunk_size,
+        chunk_size=chunk_size,
+        cursor_factory=None if as_models else psycopg2.extras.DictCursor,
+        row_mapper=_summoner_mapper if as_models else None,
+    )
+
+
 def select_summoner_games(conn, account_id: str):
     statement = "SELECT s.accountid, p.gameid, t.win FROM participants p " \
                 "JOIN summoners s ON s.accountid = p.accountid " \
@@ -831,6 +1960,187 @@ def select_objectives(conn, game_id: str):
     return cur.fetchall()
 
 
+# batched variants of the per game selects above, one query for any number of games. Results are
+# dicts keyed by game id (every requested game is present) and, where the single variant takes a
+# team, by team id.
+
+def _game_ids(game_ids: typing.Iterable) -> typing.List[int]:
+    return list(dict.fromkeys(int(game_id) for game_id in game_ids))
+
+
+def _select_for_games(
+    conn,
+    statement: str,
+    game_ids: typing.List[int],
+    by_team: bool,
+    single: bool = False,
+) -> dict:
+    """
+    Executes given statement with the game ids as its only (array) parameter and groups the rows by
+    columns gameid and, if by_team, teamid. Groups are lists of rows, or one row if single.
+    :param conn:
+    :param statement:
+    :param game_ids:
+    :param by_team:
+    :param single:
+    :return:
+    """
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=(game_ids,),
+    )
+    grouped = {game_id: {} if by_team else [] for game_id in game_ids}
+    for row in cur.fetchall():
+        group = grouped.setdefault(row['gameid'], {} if by_team else [])
+        if not by_team:
+            group.append(row)
+        elif single:
+            group[row['teamid']] = row
+        else:
+            group.setdefault(row['teamid'], []).append(row)
+    return grouped
+
+
+def select_kill_timelines_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, typing.Dict[int, list]]:
+    """
+    Batched select_kill_timeline, returns the kills ordered by timestamp per game and team.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, p.participantid, e.timestamp, e.position, e.killerid killer, e.victimid victim, " \
+                "p.teamid, e.assistingparticipantids FROM events e " \
+                "JOIN participants p ON e.participantid = p.participantid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) AND type = 'CHAMPION_KILL' " \
+                "ORDER BY p.gameid, e.timestamp"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=True)
+
+
+def select_all_kill_timelines_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, list]:
+    """
+    Batched select_all_kill_timeline, returns the kills of both teams ordered by timestamp per game.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, p.participantid, e.timestamp, e.position, e.killerid killer, e.victimid victim, " \
+                "p.teamid, e.assistingparticipantids FROM events e " \
+                "JOIN participants p ON e.participantid = p.participantid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) AND type = 'CHAMPION_KILL' " \
+                "ORDER BY p.gameid, e.timestamp"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=False)
+
+
+def select_overall_kill_information_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    """
+    Batched select_overall_kill_information, returns the row (kills, deaths, assists) per game and
+    team.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, p.teamid, SUM(s.kills) kills, SUM(s.deaths) deaths, SUM(s.assists) assists " \
+                "FROM stats s " \
+                "JOIN participants p ON p.statid = s.statid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) " \
+                "GROUP BY p.gameid, p.teamid"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=True, single=True)
+
+
+def select_team_gold_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    """
+    Batched select_team_gold, returns the row (gold) per game and team.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, p.teamid, SUM(s.goldearned) gold FROM stats s " \
+                "JOIN participants p ON p.statid = s.statid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) " \
+                "GROUP BY p.gameid, p.teamid"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=True, single=True)
+
+
+def select_team_cs_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    """
+    Batched select_team_cs, returns the row (cs) per game and team.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, p.teamid, " \
+                "SUM(s.totalminionskilled + s.neutralminionskilledteamjungle + s.neutralminionskilledenemyjungle) cs " \
+                "FROM stats s " \
+                "JOIN participants p ON p.statid = s.statid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) " \
+                "GROUP BY p.gameid, p.teamid"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=True, single=True)
+
+
+def select_objectives_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, list]:
+    """
+    Batched select_objectives, returns the building and elite monster kills per game.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT * FROM events e " \
+                "JOIN participants p ON p.participantid = e.participantid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) and (e.type = 'BUILDING_KILL' or e.type = 'ELITE_MONSTER_KILL') " \
+                "ORDER BY p.gameid, e.timestamp"
+    return _select_for_games(conn=conn, statement=statement, game_ids=_game_ids(game_ids), by_team=False)
+
+
+def select_participants_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, typing.List[model.Participant]]:
+    """
+    Returns the stored participants per game as models. Used by the writers inside their
+    transaction, so errors are raised.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT * FROM participants p WHERE p.gameid = ANY(%s::bigint[])"
+    game_ids = _game_ids(game_ids)
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=(game_ids,),
+        raise_exception=True,
+        cursor_factory=None,
+    )
+    row_mapper = mapper.get_mapper(statement, cur.description, model.Participant)
+    grouped = {game_id: [] for game_id in game_ids}
+    for row in cur.fetchall():
+        participant = row_mapper(row)
+        grouped.setdefault(participant.game_id, []).append(participant)
+    return grouped
+
+
+def select_event_counts_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, int]:
+    """
+    Returns the number of stored events per game. Used by the writers inside their transaction, so
+    errors are raised.
+    :param conn:
+    :param game_ids:
+    :return:
+    """
+    statement = "SELECT p.gameid, COUNT(*) events FROM events e " \
+                "JOIN participants p ON p.participantid = e.participantid " \
+                "WHERE p.gameid = ANY(%s::bigint[]) " \
+                "GROUP BY p.gameid"
+    game_ids = _game_ids(game_ids)
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values=(game_ids,),
+        raise_exception=True,
+    )
+    counts = dict.fromkeys(game_ids, 0)
+    counts.update((row['gameid'], row['events']) for row in cur.fetchall())
+    return counts
+
+
 def select_participantid_from_game_and_account(
     conn,
     game_id: str,
@@ -859,6 +2169,7 @@ def select_teamid_from_game_and_account(
     return cur.fetchone()[5]
 
 
+@cache.cacheable
 def select_team_from_teamid_and_gameid(
     conn,
     game_id: str,
@@ -887,6 +2198,7 @@ def select_accountid_in_game(
     return cur.fetchone()
 
 
+@cache.cacheable
 def select_general_game_info(
     conn,
     game_id: str
@@ -900,6 +2212,39 @@ def select_general_game_info(
     return cur.fetchone()
 
 
+def select_game_bundle(
+    conn,
+    game_id: str,
+):
+    """
+    Selects everything stored of given game in one round trip: one row with the columns match and
+    queue_type (json objects) and teams, participants, stats, frames and events (json arrays of
+    rows, frames and events ordered by timestamp). Missing parts are None.
+    :param conn:
+    :param game_id:
+    :return:
+    """
+    statement = "WITH p AS (SELECT * FROM participants WHERE gameid = %(game_id)s) " \
+                "SELECT " \
+                "(SELECT row_to_json(m) FROM matches m WHERE m.gameid = %(game_id)s) match, " \
+                "(SELECT row_to_json(qt) FROM matches m JOIN queue_types qt ON m.queueid = qt.queueid " \
+                "WHERE m.gameid = %(game_id)s) queue_type, " \
+                "(SELECT json_agg(t) FROM teams t WHERE t.gameid = %(game_id)s) teams, " \
+                "(SELECT json_agg(p) FROM p) participants, " \
+                "(SELECT json_agg(s) FROM stats s JOIN p ON p.statid = s.statid) stats, " \
+                "(SELECT json_agg(f ORDER BY f.timestamp) FROM participant_frame f " \
+                "JOIN p ON p.participantid = f.participantid) frames, " \
+                "(SELECT json_agg(e ORDER BY e.timestamp) FROM events e " \
+                "JOIN p ON p.participantid = e.participantid) events"
+    cur = _execute(
+        conn=conn,
+        statement=statement,
+        values={'game_id': game_id},
+    )
+    return cur.fetchone()
+
+
+@cache.cacheable
 def select_match_by_gameid(
     conn,
     game_id: str,
@@ -911,3 +2256,9 @@ def select_match_by_gameid(
         values=(game_id,)
     )
     return cur.fetchone()
+
+
+# DB_BACKEND=memory replaces the functions above by their in-memory counterparts, see memdb
+if os.getenv('DB_BACKEND', 'postgres') == 'memory':
+    import memdb
+    memdb.install()
@@ -0,0 +1,250 @@
+import codecs
+import collections.abc
+import dataclasses
+import json
+import typing
+
+T = typing.TypeVar('T')
+
+# json keys of riot's api not following the camelCase of the field name
+_KEY_OVERRIDES = {
+    ('MasteryDto', 'master_id'): 'masteryId',
+    ('ParticipantStatsDto', 'time_ccing_others'): 'timeCCingOthers',
+}
+
+
+def camel_case(name: str) -> str:
+    # spell1_id -> spell1Id, perk0_var1 -> perk0Var1
+    first, *rest = name.split('_')
+    return first + ''.join(part[:1].upper() + part[1:] for part in rest)
+
+
+def field_map(cls) -> typing.Dict[str, str]:
+    """
+    Returns the json key of every field of given dto.
+    :param cls:
+    :return:
+    """
+    return {
+        field.name: _KEY_OVERRIDES.get((cls.__name__, field.name), camel_case(field.name))
+        for field in dataclasses.fields(cls)
+    }
+
+
+def _list(value):
+    if value is None:
+        return []
+    return value
+
+
+def _list_of(decode_item):
+    def decode(value):
+        if value is None:
+            return []
+        return [decode_item(item) for item in value]
+    return decode
+
+
+def _mapping_of(decode_item):
+    def decode(value):
+        if value is None:
+            return {}
+        return {key: decode_item(item) for key, item in value.items()}
+    return decode
+
+
+def _optional(decode_item):
+    def decode(value):
+        if value is None:
+            return None
+        return decode_item(value)
+    return decode
+
+
+_decoders = {}
+
+
+def _converter(tp) -> typing.Optional[typing.Callable]:
+    """
+    Returns the function converting a json value into given field type, None if the value is used
+    as is.
+    :param tp:
+    :return:
+    """
+    if dataclasses.is_dataclass(tp):
+        return _optional(get_decoder(tp))
+
+    origin = typing.get_origin(tp)
+    if origin is list:
+        item = _converter(typing.get_args(tp)[0])
+        return _list_of(item) if item is not None else _list
+    if origin in (dict, collections.abc.Mapping):
+        item = _converter(typing.get_args(tp)[1])
+        return _mapping_of(item) if item is not None else None
+    return None
+
+
+def _compile(cls) -> typing.Callable[[typing.Mapping], typing.Any]:
+    # generates a function calling cls with one argument per field, missing keys become None
+    keys = field_map(cls)
+    hints = typing.get_type_hints(cls)
+    namespace = {'cls': cls}
+    arguments = []
+    for field in dataclasses.fields(cls):
+        converter = _converter(hints[field.name])
+        value = f'get({keys[field.name]!r})'
+        if converter is not None:
+            namespace[f'convert_{field.name}'] = converter
+            value = f'convert_{field.name}({value})'
+        arguments.append(f'        {value},\n')
+
+    exec(
+        'def decode(data):\n'
+        '    get = data.get\n'
+        '    return cls(\n'
+        + ''.join(arguments)
+        + '    )\n',
+        namespace,
+    )
+    decode = namespace['decode']
+    decode.__qualname__ = f'decode_{cls.__name__}'
+    return decode
+
+
+def get_decoder(cls: typing.Type[T]) -> typing.Callable[[typing.Mapping], T]:
+    """
+    Returns the function turning parsed riot api json into given dto, it is compiled on first use.
+    :param cls:
+    :return:
+    """
+    decoder = _decoders.get(cls)
+    if decoder is None:
+        decoder = _compile(cls)
+        _decoders[cls] = decoder
+    return decoder
+
+
+def decode(cls: typing.Type[T], data: typing.Mapping) -> T:
+    """
+    Turns parsed riot api json into given dto. Nested dtos, lists and mappings are decoded as well,
+    fields missing in the json are None, except for lists and mappings of dtos which are empty.
+    :param cls:
+    :param data:
+    :return:
+    """
+    return get_decoder(cls)(data)
+
+
+def decode_json(cls: typing.Type[T], raw: typing.Union[str, bytes]) -> T:
+    """
+    Turns riot api json (a str or the raw response bytes) into given dto.
+    :param cls:
+    :param raw:
+    :return:
+    """
+    return get_decoder(cls)(json.loads(raw))
+
+
+_json_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _JsonStream:
+    """
+    Reads json from a file-like object (text or bytes) chunk by chunk and decodes it value by value,
+    only the unread rest of the current chunk and the value being decoded are held.
+    """
+
+    def __init__(self, fh: typing.IO, chunk_size: int):
+        self._fh = fh
+        self._chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    def _read(self) -> bool:
+        # appends the next chunk, dropping what was read already, returns False at the end
+        if self._eof:
+            return False
+        chunk = self._fh.read(self._chunk_size)
+        self._eof = not chunk
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk, final=self._eof)
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        # skips whitespace and returns the next character, '' at the end
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(f'expected one of {characters!r}', self._buffer, self._position)
+        self._position += 1
+        return character
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                # the value may continue in the next chunk
+                if not self._read():
+                    raise
+                continue
+            # keys and values in an object or array are followed by a delimiter, without one in the
+            # chunk the value (e.g. a number cut into "0." and "25") may continue in the next one
+            after = end
+            while after < len(self._buffer) and self._buffer[after] in _WHITESPACE:
+                after += 1
+            if (after == len(self._buffer) or self._buffer[after] not in ':,]}') and not self._eof:
+                self._read()
+                continue
+            self._position = end
+            return value
+
+
+def iter_json_array(fh: typing.IO,
+                    key: str,
+                    chunk_size: int = 65536,
+                    ) -> typing.Iterator[typing.Any]:
+    """
+    Yields the items of the array under given key of the json object in given file-like object
+    (text or utf-8 bytes, e.g. a file or a streamed http response) one by one while reading it,
+    so memory stays bounded by chunk_size and the largest item instead of the whole document. Other
+    values of the object are decoded and dropped, nothing is yielded if key is missing.
+    :param fh:
+    :param key:
+    :param chunk_size:
+    :return:
+    """
+    stream = _JsonStream(fh, chunk_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        name = stream.value()
+        stream.expect(':')
+        if name == key and stream.peek() == '[':
+            stream.expect('[')
+            if stream.peek() != ']':
+                while True:
+                    yield stream.value()
+                    if stream.expect(',]') == ']':
+                        break
+            else:
+                stream.expect(']')
+        else:
+            stream.value()
+        if stream.expect(',}') == '}':
+            return
@@ -0,0 +1,77 @@
+import argparse
+import typing
+
+import database
+import schema
+
+# duo_games holds one row per pair of summoners in the same team of a game, so duo lookups read
+# one primary key range instead of joining summoner_matches, participants, teams and stats. It is
+# filled for every match written by ingest.MatchWriter, games stored before are filled by backfill
+# (python duo.py backfill). The table is created by schema migration 3.
+
+
+def refresh(conn,
+            game_ids: typing.Iterable,
+            commit: bool = True,
+            ) -> database.InsertResult:
+    """
+    Rebuilds the duo_games rows of given games.
+    :param conn:
+    :param game_ids:
+    :param commit:
+    :return:
+    """
+    return database.insert_duo_games(conn=conn, game_ids=game_ids, commit=commit)
+
+
+def backfill(conn,
+             batch_size: int = 500,
+             after: int = None,
+             progress: typing.Callable[[int, int], None] = None,
+             ) -> int:
+    """
+    Refreshes duo_games for all stored games in batches of batch_size games, each batch is
+    committed on its own so an interrupted backfill can be resumed by passing the last reported
+    game id as after.
+    :param conn:
+    :param batch_size:
+    :param after: only games with a greater id are refreshed
+    :param progress: called with the number of refreshed games and the last game id after every batch
+    :return: number of refreshed games
+    """
+    games = 0
+    while True:
+        game_ids = database.select_game_ids(conn=conn, after=after, limit=batch_size)
+        if not game_ids:
+            return games
+        refresh(conn=conn, game_ids=game_ids, commit=True)
+        games += len(game_ids)
+        after = game_ids[-1]
+        if progress is not None:
+            progress(games, after)
+
+
+def main(argv: typing.Sequence[str] = None):
+    parser = argparse.ArgumentParser(description='maintains the duo_games table')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help='creates the table by applying the schema migrations')
+    backfill_parser = commands.add_parser('backfill', help='fills the table from all stored games')
+    backfill_parser.add_argument('--batch-size', type=int, default=500)
+    backfill_parser.add_argument('--after', type=int, default=None, help='resume after this game id')
+    args = parser.parse_args(argv)
+
+    with database.connection() as conn:
+        schema.migrate(conn)
+        if args.command == 'create':
+            return
+        games = backfill(
+            conn=conn,
+            batch_size=args.batch_size,
+            after=args.after,
+            progress=lambda count, last: print(f'{count} games refreshed, last game id {last}'),
+        )
+        print(f'done, {games} games refreshed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import typing
+
+import numpy as np
+
+import database
+
+COLUMNS = ('total_gold', 'xp', 'level', 'minions', 'jungle_minions', 'x', 'y')
+
+
+class GameFrames:
+    """
+    Columnar view of all participant frames of one game. Every frame row is one entry of the flat
+    arrays (timestamp, participant, total_gold, ...), participant is an index into participant_ids
+    and participant_teams. Accessors return arrays over the distinct frame timestamps.
+    """
+
+    def __init__(self,
+                 timestamp: np.ndarray,
+                 participant: np.ndarray,
+                 participant_ids: np.ndarray,
+                 participant_teams: np.ndarray,
+                 total_gold: np.ndarray,
+                 xp: np.ndarray,
+                 level: np.ndarray,
+                 minions: np.ndarray,
+                 jungle_minions: np.ndarray,
+                 x: np.ndarray,
+                 y: np.ndarray,
+                 ):
+        self.timestamp = timestamp
+        self.participant = participant
+        self.participant_ids = participant_ids
+        self.participant_teams = participant_teams
+        self.total_gold = total_gold
+        self.xp = xp
+        self.level = level
+        self.minions = minions
+        self.jungle_minions = jungle_minions
+        self.x = x
+        self.y = y
+        self.timestamps, self._frame = np.unique(timestamp, return_inverse=True)
+        self._matrices = {}
+
+    @classmethod
+    def from_rows(cls, rows: typing.Sequence[tuple]) -> 'GameFrames':
+        """
+        Builds the columns from rows of database.select_game_frame_columns.
+        :param rows:
+        :return:
+        """
+        if rows:
+            (timestamp, participant_id, team_id, total_gold, xp, level, minions, jungle_minions, x,
+             y) = zip(*rows)
+        else:
+            timestamp = participant_id = team_id = total_gold = xp = level = minions = jungle_minions = x = y = ()
+
+        participant_ids, first, participant = np.unique(
+            np.array(participant_id, dtype=object),
+            return_index=True,
+            return_inverse=True,
+        )
+        team_id = np.array(team_id, dtype=np.int64)
+
+        def _int(values):
+            return np.array(values, dtype=np.int64)
+
+        def _float(values):
+            # positions may be missing
+            return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+        return cls(
+            timestamp=_int(timestamp),
+            participant=participant.astype(np.int64),
+            participant_ids=participant_ids,
+            participant_teams=team_id[first],
+            total_gold=_int(total_gold),
+            xp=_int(xp),
+            level=_int(level),
+            minions=_int(minions),
+            jungle_minions=_int(jungle_minions),
+            x=_float(x),
+            y=_float(y),
+        )
+
+    def matrix(self, column: str) -> np.ndarray:
+        """
+        Returns given column as matrix of shape (timestamps, participants), missing frames are nan.
+        :param column: one of COLUMNS
+        :return:
+        """
+        if column not in COLUMNS:
+            raise ValueError(f'unknown column {column}, expected one of {COLUMNS}')
+        matrix = self._matrices.get(column)
+        if matrix is None:
+            matrix = np.full((len(self.timestamps), len(self.participant_ids)), np.nan)
+            matrix[self._frame, self.participant] = getattr(self, column)
+            self._matrices[column] = matrix
+        return matrix
+
+    def participant_index(self, participant_id: str) -> int:
+        index = int(np.searchsorted(self.participant_ids, participant_id))
+        if index == len(self.participant_ids) or self.participant_ids[index] != participant_id:
+            raise KeyError(participant_id)
+        return index
+
+    def participant_series(self, participant: typing.Union[int, str], column: str) -> np.ndarray:
+        """
+        Returns given column of one participant over time, participant is an index or an id.
+        :param participant:
+        :param column:
+        :return:
+        """
+        if isinstance(participant, str):
+            participant = self.participant_index(participant)
+        return self.matrix(column)[:, participant]
+
+    def team_sum(self, team_id: int, column: str) -> np.ndarray:
+        """
+        Returns the sum of given column over all participants of given team over time.
+        :param team_id:
+        :param column:
+        :return:
+        """
+        return np.nansum(self.matrix(column)[:, self.participant_teams == team_id], axis=1)
+
+    def team_difference(self, column: str, team_id: int = 100, other_team_id: int = 200) -> np.ndarray:
+        """
+        Returns team_sum of team_id minus team_sum of other_team_id over time.
+        :param column:
+        :param team_id:
+        :param other_team_id:
+        :return:
+        """
+        return self.team_sum(team_id, column) - self.team_sum(other_team_id, column)
+
+    def gold_difference(self, team_id: int = 100, other_team_id: int = 200) -> np.ndarray:
+        return self.team_difference('total_gold', team_id, other_team_id)
+
+    def xp_difference(self, team_id: int = 100, other_team_id: int = 200) -> np.ndarray:
+        return self.team_difference('xp', team_id, other_team_id)
+
+
+def load_game_frames(conn, game_id: str) -> GameFrames:
+    """
+    Returns all participant frames of given game as GameFrames.
+    :param conn:
+    :param game_id:
+    :return:
+    """
+    return GameFrames.from_rows(database.select_game_frame_columns(conn=conn, game_id=game_id))
@@ -0,0 +1,55 @@
+import uuid
+
+# namespace of all ids derived from natural keys, changing it changes every derived id
+NAMESPACE = uuid.UUID('957ae67e-db30-4b01-b1a3-56024a219561')
+
+
+def _derive(kind: str,
+            platform_id: str,
+            game_id: int,
+            participant_id: int,
+            ) -> str:
+    return str(uuid.uuid5(NAMESPACE, f'{kind}:{platform_id}:{game_id}:{participant_id}'))
+
+
+def participant_id(platform_id: str,
+                   game_id: int,
+                   participant_id: int,
+                   ) -> str:
+    """
+    Returns the id of a match participant, derived from platform, game and the participant id (1-10)
+    riot uses within the match. Same input always gives the same id.
+    :param platform_id:
+    :param game_id:
+    :param participant_id:
+    :return:
+    """
+    return _derive('participant', platform_id, game_id, participant_id)
+
+
+def stat_id(platform_id: str,
+            game_id: int,
+            participant_id: int,
+            ) -> str:
+    """
+    Returns the id of the stats of a match participant, see participant_id.
+    :param platform_id:
+    :param game_id:
+    :param participant_id:
+    :return:
+    """
+    return _derive('stat', platform_id, game_id, participant_id)
+
+
+def timeline_id(platform_id: str,
+                game_id: int,
+                participant_id: int,
+                ) -> str:
+    """
+    Returns the id of the timeline of a match participant, see participant_id.
+    :param platform_id:
+    :param game_id:
+    :param participant_id:
+    :return:
+    """
+    return _derive('timeline', platform_id, game_id, participant_id)
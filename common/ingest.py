@@ -0,0 +1,226 @@
+import typing
+
+import database
+import model
+import rid_parser
+from dtos import match
+from dtos import match_timeline
+
+
+class TimelineWriter:
+    """
+    Buffers participant frames and events and writes them with bulk inserts whenever buffer_size rows
+    of a kind are pending, so at most buffer_size rows per kind are held no matter how long a game
+    is. Call flush() after the last row.
+    """
+
+    def __init__(self,
+                 conn,
+                 buffer_size: int = 2000,
+                 bulk_method: str = 'copy',
+                 commit: bool = True,
+                 on_conflict: str = 'error',
+                 ):
+        self.conn = conn
+        self.buffer_size = buffer_size
+        self.bulk_method = bulk_method
+        self.commit = commit
+        self.on_conflict = on_conflict
+        self._participant_frames = []
+        self._events = []
+        self.participant_frames_written = 0
+        self.events_written = 0
+
+    def write(self, row: typing.Union[model.ParticipantFrame, model.Event]):
+        if isinstance(row, model.Event):
+            self._events.append(row)
+            if len(self._events) >= self.buffer_size:
+                self._flush_events()
+        else:
+            self._participant_frames.append(row)
+            if len(self._participant_frames) >= self.buffer_size:
+                self._flush_participant_frames()
+
+    def write_all(self, rows: typing.Iterable[typing.Union[model.ParticipantFrame, model.Event]]):
+        for row in rows:
+            self.write(row)
+
+    def _flush_participant_frames(self):
+        if self._participant_frames:
+            database.insert_participant_frames_bulk(
+                conn=self.conn,
+                participant_frames=self._participant_frames,
+                method=self.bulk_method,
+                commit=self.commit,
+                on_conflict=self.on_conflict,
+            )
+            self.participant_frames_written += len(self._participant_frames)
+            self._participant_frames = []
+
+    def _flush_events(self):
+        if self._events:
+            database.insert_events_bulk(
+                conn=self.conn,
+                events=self._events,
+                method=self.bulk_method,
+                commit=self.commit,
+                on_conflict=self.on_conflict,
+            )
+            self.events_written += len(self._events)
+            self._events = []
+
+    def flush(self):
+        self._flush_participant_frames()
+        self._flush_events()
+
+
+def stream_timeline(conn,
+                    rows: typing.Iterable[typing.Union[model.ParticipantFrame, model.Event]],
+                    buffer_size: int = 2000,
+                    bulk_method: str = 'copy',
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> TimelineWriter:
+    """
+    Writes given participant frames and events (e.g. from rid_parser.iter_match_timeline_rows) in
+    bulk batches of at most buffer_size rows per kind, see TimelineWriter.
+    :param conn:
+    :param rows:
+    :param buffer_size:
+    :param bulk_method:
+    :param commit: commit after every batch
+    :param on_conflict:
+    :return:
+    """
+    writer = TimelineWriter(
+        conn=conn,
+        buffer_size=buffer_size,
+        bulk_method=bulk_method,
+        commit=commit,
+        on_conflict=on_conflict,
+    )
+    writer.write_all(rows)
+    writer.flush()
+    return writer
+
+
+class MatchWriter:
+    """
+    Unit of work writing a whole match (match, teams, stats, timelines, participants and, if a
+    timeline is given, participant frames and events) in a single transaction. Either everything is
+    committed at once or, on any error, everything is rolled back and the error is raised.
+    With skip_existing a match already in the database is skipped as a whole instead of raising.
+    With duo_games the duo_games rows of the match are materialized as well (see duo).
+    Participants already stored under other ids (see rid_parser.legacy_ids) keep them and their
+    stored rows, only missing rows are added.
+    """
+
+    def __init__(self,
+                 conn,
+                 bulk_method: str = 'copy',
+                 skip_existing: bool = True,
+                 duo_games: bool = True,
+                 ):
+        self.conn = conn
+        self.bulk_method = bulk_method
+        self.skip_existing = skip_existing
+        self.duo_games = duo_games
+
+    def write(self,
+              match_dto: match.MatchDto,
+              timeline_dto: match_timeline.MatchTimelineDto = None,
+              timeline_stream: typing.IO = None,
+              ) -> typing.Optional[model.Match]:
+        """
+        Writes given match, returns the written match or None if it was skipped. The timeline is
+        given either decoded as timeline_dto or as timeline_stream, a file-like object with its riot
+        api json that is read frame by frame while writing, so a long game is never held as a whole.
+        :param match_dto:
+        :param timeline_dto:
+        :param timeline_stream:
+        :return:
+        """
+        try:
+            match_row = self._write(match_dto, timeline_dto, timeline_stream)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return match_row
+
+    def _write(self,
+               match_dto: match.MatchDto,
+               timeline_dto: typing.Optional[match_timeline.MatchTimelineDto],
+               timeline_stream: typing.Optional[typing.IO] = None,
+               ) -> typing.Optional[model.Match]:
+        match_row = rid_parser.parse_match(match_dto)
+        result = database.insert_match(
+            conn=self.conn,
+            match=match_row,
+            commit=False,
+            on_conflict='ignore' if self.skip_existing else 'error',
+        )
+        if result.skipped:
+            return None
+
+        stats, timelines, participants, participant_ids = rid_parser.parse_match_participants(match_dto)
+        mapped = rid_parser.legacy_ids(
+            participants,
+            database.select_participants_for_games(self.conn, [match_row.game_id])[match_row.game_id],
+        )
+        on_conflict = 'error'
+        events_stored = False
+        if mapped:
+            # participants ingested before ids were derived keep their ids, frames and events are
+            # parsed with the replaced participant_ids. Rows stored already are kept, events have no
+            # key so they are only written if the game has none.
+            stats = [rid_parser.replace_ids(stat, mapped) for stat in stats]
+            timelines = [rid_parser.replace_ids(timeline, mapped) for timeline in timelines]
+            participants = [rid_parser.replace_ids(participant, mapped) for participant in participants]
+            participant_ids = {
+                number: mapped.get(participant_id, participant_id) for number, participant_id in participant_ids.items()
+            }
+            on_conflict = 'ignore'
+            events_stored = database.select_event_counts_for_games(self.conn, [match_row.game_id])[match_row.game_id] > 0
+        for team in rid_parser.parse_teams(match_dto):
+            database.insert_team(conn=self.conn, team=team, commit=False, on_conflict=on_conflict)
+        arguments = {'conn': self.conn, 'method': self.bulk_method, 'commit': False, 'on_conflict': on_conflict}
+        database.insert_stats_bulk(stats=stats, **arguments)
+        database.insert_timelines_bulk(timelines=timelines, **arguments)
+        database.insert_participants_bulk(participants=participants, **arguments)
+        if self.duo_games:
+            database.insert_duo_games(conn=self.conn, game_ids=(match_row.game_id,), commit=False)
+
+        rows = None
+        if timeline_dto is not None:
+            rows = rid_parser.iter_match_timeline_rows(timeline_dto, participant_ids)
+        elif timeline_stream is not None:
+            rows = rid_parser.iter_match_timeline_stream_rows(timeline_stream, participant_ids)
+        if rows is not None:
+            if events_stored:
+                rows = (row for row in rows if not isinstance(row, model.Event))
+            stream_timeline(
+                conn=self.conn,
+                rows=rows,
+                bulk_method=self.bulk_method,
+                commit=False,
+                on_conflict=on_conflict,
+            )
+
+        return match_row
+
+
+def ingest_match(conn,
+                 match_dto: match.MatchDto,
+                 timeline_dto: match_timeline.MatchTimelineDto = None,
+                 timeline_stream: typing.IO = None,
+                 ) -> typing.Optional[model.Match]:
+    """
+    Writes given match (and timeline) in one transaction, see MatchWriter.
+    :param conn:
+    :param match_dto:
+    :param timeline_dto:
+    :param timeline_stream:
+    :return:
+    """
+    return MatchWriter(conn=conn).write(match_dto=match_dto, timeline_dto=timeline_dto, timeline_stream=timeline_stream)
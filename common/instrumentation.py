@@ -0,0 +1,266 @@
+import bisect
+import collections
+import dataclasses
+import json
+import sys
+import threading
+import typing
+
+import util
+
+# statement metrics recorded by database (_execute, the bulk inserts and the streaming selects),
+# keyed by the database function that issued the statement (the first caller not being a private
+# helper of database). Recording is a few dict and list operations under one lock, it is on by
+# default.
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_MAX_PARAMETERS_LENGTH = 1000
+
+_logger = util.Logger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class StatementStats:
+    function: str
+    calls: int
+    errors: typing.Dict[str, int]
+    rows: int
+    total_seconds: float
+    max_seconds: float
+    buckets: typing.Tuple[int, ...]  # calls per bucket of BUCKETS plus one for slower calls
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates given quantile from the histogram, returns the upper bound of the bucket it falls
+        into (max_seconds for the unbounded bucket).
+        :param q: between 0 and 1
+        :return:
+        """
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_seconds
+
+
+@dataclasses.dataclass(frozen=True)
+class SlowQuery:
+    function: str
+    statement: str
+    parameters: str
+    seconds: float
+
+
+class _Metrics:
+
+    __slots__ = ('calls', 'errors', 'rows', 'total_seconds', 'max_seconds', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = collections.Counter()
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+
+enabled = True
+slow_query_threshold: typing.Optional[float] = None
+log_parameters = True
+
+_lock = threading.Lock()
+_metrics: typing.Dict[str, _Metrics] = {}
+_slow_queries = collections.deque(maxlen=100)
+
+
+def configure(
+        enable: bool = None,
+        slow_query_threshold: float = None,
+        log_parameters: bool = None,
+        slow_query_history: int = None,
+):
+    """
+    Changes the given settings, arguments left None keep their value.
+    :param enable: record metrics at all
+    :param slow_query_threshold: seconds from which a statement is logged as slow, 0 or less disables it
+    :param log_parameters: include the statement parameters in the slow query log
+    :param slow_query_history: number of slow queries kept for slow_queries()
+    :return:
+    """
+    # the arguments shadow the module settings
+    module = sys.modules[__name__]
+    if enable is not None:
+        module.enabled = enable
+    if slow_query_threshold is not None:
+        module.slow_query_threshold = slow_query_threshold if slow_query_threshold > 0 else None
+    if log_parameters is not None:
+        module.log_parameters = log_parameters
+    if slow_query_history is not None:
+        with _lock:
+            module._slow_queries = collections.deque(_slow_queries, maxlen=slow_query_history)
+
+
+def _function_name(frame) -> str:
+    # skips helpers like _select_model so the statement is booked on the public function
+    module = frame.f_globals.get('__name__')
+    while frame.f_back is not None and frame.f_code.co_name.startswith('_') \
+            and frame.f_globals.get('__name__') == module:
+        frame = frame.f_back
+    return frame.f_code.co_name
+
+
+def caller(depth: int = 2) -> str:
+    """
+    Returns the name of the database function a statement is booked on, as record() looks it up:
+    depth is the frame of the caller of the executing function, 2 if called by that function.
+    :param depth:
+    :return:
+    """
+    return _function_name(sys._getframe(depth))
+
+
+def record(
+        statement: str,
+        values,
+        seconds: float,
+        rows: int = 0,
+        error: BaseException = None,
+        depth: int = 2,
+        function: str = None,
+):
+    """
+    Records one executed statement. The function is looked up on the stack, depth is the frame of the
+    caller of the executing function, 2 if called by the function executing the statement. Pass
+    function (see caller()) where the stack does not lead to it, e.g. in generators.
+    :param statement:
+    :param values:
+    :param seconds:
+    :param rows: affected or returned rows, negative if unknown
+    :param error:
+    :param depth:
+    :param function:
+    :return:
+    """
+    if not enabled:
+        return
+    if function is None:
+        function = _function_name(sys._getframe(depth))
+    bucket = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        metrics = _metrics.get(function)
+        if metrics is None:
+            metrics = _metrics[function] = _Metrics()
+        metrics.calls += 1
+        metrics.total_seconds += seconds
+        if seconds > metrics.max_seconds:
+            metrics.max_seconds = seconds
+        metrics.buckets[bucket] += 1
+        if rows > 0:
+            metrics.rows += rows
+        if error is not None:
+            metrics.errors[type(error).__name__] += 1
+
+    threshold = slow_query_threshold
+    if threshold is not None and seconds >= threshold:
+        parameters = repr(values)[:_MAX_PARAMETERS_LENGTH] if log_parameters else ''
+        _slow_queries.append(SlowQuery(function, statement, parameters, seconds))
+        _logger.warn('slow query in %s took %.3fs: %s %s', function, seconds, statement, parameters)
+
+
+def snapshot() -> typing.Dict[str, StatementStats]:
+    """
+    Returns the metrics recorded so far by function name.
+    :return:
+    """
+    with _lock:
+        return {
+            function: StatementStats(
+                function=function,
+                calls=metrics.calls,
+                errors=dict(metrics.errors),
+                rows=metrics.rows,
+                total_seconds=metrics.total_seconds,
+                max_seconds=metrics.max_seconds,
+                buckets=tuple(metrics.buckets),
+            )
+            for function, metrics in _metrics.items()
+        }
+
+
+def slow_queries() -> typing.List[SlowQuery]:
+    return list(_slow_queries)
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+        _slow_queries.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def to_prometheus(prefix: str = 'db_statement') -> str:
+    """
+    Returns the metrics in the prometheus text exposition format.
+    :param prefix: of the metric names
+    :return:
+    """
+    stats = snapshot()
+    lines = [
+        f'# HELP {prefix}_duration_seconds Execution time of statements by database function.',
+        f'# TYPE {prefix}_duration_seconds histogram',
+    ]
+    for function, stat in sorted(stats.items()):
+        label = f'function="{_label(function)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), stat.buckets):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{prefix}_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+        lines.append(f'{prefix}_duration_seconds_sum{{{label}}} {stat.total_seconds!r}')
+        lines.append(f'{prefix}_duration_seconds_count{{{label}}} {stat.calls}')
+
+    lines.append(f'# HELP {prefix}_rows_total Rows returned or affected by statements by database function.')
+    lines.append(f'# TYPE {prefix}_rows_total counter')
+    for function, stat in sorted(stats.items()):
+        lines.append(f'{prefix}_rows_total{{function="{_label(function)}"}} {stat.rows}')
+
+    lines.append(f'# HELP {prefix}_errors_total Failed statements by database function and error.')
+    lines.append(f'# TYPE {prefix}_errors_total counter')
+    for function, stat in sorted(stats.items()):
+        for error, count in sorted(stat.errors.items()):
+            lines.append(f'{prefix}_errors_total{{function="{_label(function)}",error="{_label(error)}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def to_json(**kwargs) -> str:
+    """
+    Returns the metrics and the slow queries as json.
+    :param kwargs: passed to json.dumps
+    :return:
+    """
+    return json.dumps({
+        'buckets': BUCKETS,
+        'statements': {
+            function: {
+                **dataclasses.asdict(stat),
+                'mean_seconds': stat.mean_seconds,
+                'p50_seconds': stat.quantile(0.5),
+                'p99_seconds': stat.quantile(0.99),
+            }
+            for function, stat in sorted(snapshot().items())
+        },
+        'slow_queries': [dataclasses.asdict(query) for query in slow_queries()],
+    }, **kwargs)
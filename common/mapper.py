@@ -0,0 +1,76 @@
+import dataclasses
+import operator
+import typing
+
+T = typing.TypeVar('T')
+
+
+class MappingError(ValueError):
+    pass
+
+
+def columns(cls) -> typing.Tuple[str, ...]:
+    """
+    Returns the database column names of given model, columns are named like the model fields
+    without underscores.
+    :param cls:
+    :return:
+    """
+    return tuple(field.name.replace('_', '') for field in dataclasses.fields(cls))
+
+
+def compile_mapper(
+        column_names: typing.Sequence[str],
+        cls: typing.Type[T],
+        start: int = 0,
+) -> typing.Callable[[typing.Sequence], T]:
+    """
+    Returns a function creating an instance of given model from a result row with given columns.
+    Every model field is looked up by name once, the first matching column at or after start is
+    used, so joins can be mapped by passing the offset of the joined table. Raises MappingError if a
+    field has no column.
+    :param column_names:
+    :param cls:
+    :param start:
+    :return:
+    """
+    positions = {}
+    for position in range(len(column_names) - 1, start - 1, -1):
+        positions[column_names[position]] = position
+
+    indices = []
+    for column in columns(cls):
+        if column not in positions:
+            raise MappingError(f'no column {column} for {cls.__name__} in {list(column_names[start:])}')
+        indices.append(positions[column])
+
+    if indices == list(range(len(column_names))):
+        return lambda row: cls(*row)
+    getter = operator.itemgetter(*indices)
+    return lambda row: cls(*getter(row))
+
+
+_mappers = {}
+
+
+def get_mapper(
+        statement: str,
+        description: typing.Sequence,
+        cls: typing.Type[T],
+        start: int = 0,
+) -> typing.Callable[[typing.Sequence], T]:
+    """
+    Returns the mapper of given statement and model, it is compiled from the cursor description on
+    first use.
+    :param statement:
+    :param description: cursor.description after executing statement
+    :param cls:
+    :param start:
+    :return:
+    """
+    key = (statement, cls, start)
+    mapper = _mappers.get(key)
+    if mapper is None:
+        mapper = compile_mapper([column[0] for column in description], cls, start)
+        _mappers[key] = mapper
+    return mapper
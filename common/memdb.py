@@ -0,0 +1,1273 @@
+import contextlib
+import dataclasses
+import datetime
+import operator
+import sys
+import threading
+import typing
+
+import psycopg2.errors
+
+import database
+import model
+import util
+
+_logger = util.Logger(__name__)
+
+# in-memory counterpart of database: every insert_*, select_*, iter_* and chunk_* function of
+# database is available here with the same arguments and results, working on indexed tables held in
+# process. Rows are Rows (list with access by column name like psycopg2's DictRow) or tuples where
+# database returns tuples. Connections only keep an undo log so rollback works, writes are visible
+# to every connection right away (there is no isolation). No sql is run, functions of database not
+# listed here (schema migrations, plan checks, cursors) need postgres.
+#
+# Setting the env variable DB_BACKEND=memory, or calling install(), replaces the functions of
+# database with the ones of this module, so code written against database (ingest, duo, bundle,
+# adatabase, ...) runs without a server, e.g. to benchmark parsing without database cost.
+
+# lookup columns per table besides the unique key
+_INDEXES = {
+    'summoners': (('name',),),
+    'summoner_matches': (('accountid',), ('gameid',)),
+    'teams': (('gameid',),),
+    'participants': (('gameid',), ('accountid',), ('statid',)),
+    'participant_frame': (('participantid',),),
+    'events': (('participantid',),),
+    'duo_games': (('accountid1', 'accountid2'),),
+}
+
+# tables without insert function in database, fill them with load()
+_EXTRA_TABLES = {
+    'queue_types': (('queueid', 'map', 'description', 'notes'), ('queueid',)),
+}
+
+
+class Row(list):
+    """
+    Result row, a list of column values that can be indexed by column name as well.
+    """
+    __slots__ = ('_index',)
+
+    def __init__(self, index: typing.Mapping[str, int], values: typing.Iterable):
+        super().__init__(values)
+        self._index = index
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return list.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def keys(self):
+        return iter(self._index)
+
+    def values(self):
+        return (list.__getitem__(self, position) for position in self._index.values())
+
+    def items(self):
+        return ((name, list.__getitem__(self, position)) for name, position in self._index.items())
+
+
+_indexes = {}
+
+
+def _index(columns: typing.Tuple[str, ...]) -> typing.Dict[str, int]:
+    # like DictRow a duplicated column name refers to its last occurrence
+    index = _indexes.get(columns)
+    if index is None:
+        index = _indexes[columns] = {name: position for position, name in enumerate(columns)}
+    return index
+
+
+def _getter(index: typing.Mapping[str, int], columns: typing.Sequence[str]):
+    # single columns give the bare value, several a tuple
+    return operator.itemgetter(*(index[column] for column in columns))
+
+
+class Table:
+    """
+    Rows of one table in insertion order, with a dict from unique key to position and one dict from
+    column values to positions per index. Positions of rolled back rows hold None.
+    """
+
+    def __init__(self,
+                 name: str,
+                 columns: typing.Tuple[str, ...],
+                 key: typing.Tuple[str, ...],
+                 indexes: typing.Iterable[typing.Tuple[str, ...]] = (),
+                 ):
+        self.name = name
+        self.columns = columns
+        self.key = key
+        self.index = _index(columns)
+        self.rows: typing.List[typing.Optional[Row]] = []
+        self._key = _getter(self.index, key) if key else None
+        self._positions = {}
+        self._lookups = {lookup: ({}, _getter(self.index, lookup)) for lookup in indexes}
+
+    def __iter__(self) -> typing.Iterator[Row]:
+        return (row for row in self.rows if row is not None)
+
+    def __len__(self):
+        return len(self.rows) - self.rows.count(None)
+
+    def row(self, values: typing.Sequence) -> Row:
+        return Row(self.index, values)
+
+    def key_of(self, row: typing.Sequence):
+        return self._key(row)
+
+    def get(self, key) -> typing.Optional[Row]:
+        position = self._positions.get(key)
+        return None if position is None else self.rows[position]
+
+    def find(self, columns: typing.Tuple[str, ...], value) -> typing.List[Row]:
+        lookup, _ = self._lookups[columns]
+        return [self.rows[position] for position in lookup.get(value, ())]
+
+    def _add(self, row: Row) -> int:
+        position = len(self.rows)
+        self.rows.append(row)
+        if self._key is not None:
+            self._positions[self._key(row)] = position
+        for lookup, value in self._lookups.values():
+            lookup.setdefault(value(row), []).append(position)
+        return position
+
+    def _replace(self, position: int, row: Row) -> Row:
+        old = self.rows[position]
+        self.rows[position] = row
+        for lookup, value in self._lookups.values():
+            before, after = value(old), value(row)
+            if before != after:
+                lookup[before].remove(position)
+                lookup.setdefault(after, []).append(position)
+        return old
+
+    def _remove(self, position: int):
+        row = self.rows[position]
+        self.rows[position] = None
+        if self._key is not None:
+            del self._positions[self._key(row)]
+        for lookup, value in self._lookups.values():
+            lookup[value(row)].remove(position)
+
+
+class Database:
+    """
+    The tables of database's schema, shared by all connections to it.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = {
+            name: Table(name, columns, database._TABLE_KEYS[name], _INDEXES.get(name, ()))
+            for name, columns in database._TABLE_COLUMNS.items()
+        }
+        for name, (columns, key) in _EXTRA_TABLES.items():
+            self.tables[name] = Table(name, columns, key, _INDEXES.get(name, ()))
+
+
+class Connection:
+    """
+    Stand-in for a psycopg2 connection to a Database. Writes are undone by rollback() (and close())
+    until commit(), unless autocommit is set.
+    """
+
+    def __init__(self, db: Database):
+        self.database = db
+        self.autocommit = False
+        self.closed = 0
+        self._undo = []
+
+    def table(self, name: str) -> Table:
+        return self.database.tables[name]
+
+    def _add(self, table: Table, row: Row):
+        position = table._add(row)
+        if not self.autocommit:
+            self._undo.append((table, position, None))
+
+    def _replace(self, table: Table, position: int, row: Row):
+        old = table._replace(position, row)
+        if not self.autocommit:
+            self._undo.append((table, position, old))
+
+    def commit(self):
+        self._undo = []
+
+    def rollback(self):
+        with self.database.lock:
+            for table, position, old in reversed(self._undo):
+                if old is None:
+                    table._remove(position)
+                else:
+                    table._replace(position, old)
+            self._undo = []
+
+    def close(self):
+        if not self.closed:
+            self.rollback()
+            self.closed = 1
+
+    def cursor(self, *args, **kwargs):
+        raise NotImplementedError('the memory backend does not run sql')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+# connections
+#####################################################################################################
+#####################################################################################################
+#####################################################################################################
+
+
+_database = Database()
+
+
+def get_database() -> Database:
+    return _database
+
+
+def reset():
+    """
+    Replaces the module database by an empty one, connections opened before keep the old one.
+    :return:
+    """
+    global _database
+    _database = Database()
+
+
+def get_connection(
+        database=None,
+        user=None,
+        password=None,
+        host=None,
+        port=None,
+) -> Connection:
+    """
+    Returns a connection to the module database, the arguments are accepted for compatibility and
+    ignored.
+    :return:
+    """
+    return Connection(_database)
+
+
+def kill_connection(conn):
+    conn.close()
+
+
+@contextlib.contextmanager
+def connection(timeout: float = None):
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        kill_connection(conn)
+
+
+def init_pool(*args, **kwargs):
+    # connections are free, there is nothing to pool
+    return None
+
+
+def close_pool():
+    pass
+
+
+def get_pool():
+    return None
+
+
+# inserts
+#####################################################################################################
+#####################################################################################################
+#####################################################################################################
+
+
+def _insert(conn: Connection,
+            table_name: str,
+            rows: typing.Sequence[typing.Sequence],
+            on_conflict: str,
+            ) -> database.InsertResult:
+    """
+    Inserts given rows (values in column order) into given table handling conflicts like
+    database._with_conflict_handling. With on_conflict "error" nothing is written if any row
+    conflicts and psycopg2.errors.UniqueViolation is raised.
+    :param conn:
+    :param table_name:
+    :param rows:
+    :param on_conflict:
+    :return:
+    """
+    if on_conflict not in database.ON_CONFLICT:
+        raise ValueError(f'unknown conflict handling {on_conflict}, expected one of {database.ON_CONFLICT}')
+    table = conn.table(table_name)
+    if on_conflict == 'update' and not table.key:
+        raise ValueError(f'rows of {table_name} have no unique key and cannot be updated')
+    rows = [table.row(values) for values in rows]
+
+    with conn.database.lock:
+        if not table.key:
+            for row in rows:
+                conn._add(table, row)
+            return database.InsertResult(inserted=len(rows), updated=0, skipped=0)
+
+        if on_conflict == 'error':
+            keys = [table.key_of(row) for row in rows]
+            conflicts = [key for key in keys if key in table._positions]
+            if conflicts or len(set(keys)) < len(keys):
+                key = conflicts[0] if conflicts else keys[0]
+                raise psycopg2.errors.UniqueViolation(
+                    f'duplicate key value violates unique constraint of {table_name}: {key}')
+
+        inserted, updated = 0, 0
+        for row in rows:
+            position = table._positions.get(table.key_of(row))
+            if position is None:
+                conn._add(table, row)
+                inserted += 1
+            elif on_conflict == 'update':
+                conn._replace(table, position, row)
+                updated += 1
+        return database.InsertResult(inserted=inserted, updated=updated, skipped=len(rows) - inserted - updated)
+
+
+def _insert_one(conn: Connection,
+                table_name: str,
+                values: typing.Sequence,
+                commit: bool,
+                on_conflict: str,
+                print_exception: bool = True,
+                ) -> database.InsertResult:
+    # like the single inserts of database: with commit errors are printed and the row is skipped
+    try:
+        result = _insert(conn, table_name, (values,), on_conflict)
+    except psycopg2.Error as e:
+        if not commit:
+            raise
+        if print_exception:
+            _logger.error('%s', e)
+        conn.rollback()
+        return database.InsertResult(inserted=0, updated=0, skipped=1)
+    if commit:
+        conn.commit()
+    return result
+
+
+def _insert_many(conn: Connection,
+                 table_name: str,
+                 rows: typing.Sequence[typing.Sequence],
+                 commit: bool,
+                 on_conflict: str,
+                 ) -> database.InsertResult:
+    # like database._insert_bulk: errors are raised, after a rollback if commit is set
+    try:
+        result = _insert(conn, table_name, rows, on_conflict)
+    except psycopg2.Error:
+        if commit:
+            conn.rollback()
+        raise
+    if commit:
+        conn.commit()
+    return result
+
+
+def insert_summoner(conn,
+                    summoner: model.Summoner,
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> database.InsertResult:
+    summoner = database._set_timestamp(summoner)
+    values = database._row_values(model.Summoner)(summoner)[:-1] + (datetime.datetime.now(),)
+    return _insert_one(conn, 'summoners', values, commit, on_conflict, print_exception=False)
+
+
+def insert_match(conn,
+                 match: model.Match,
+                 commit: bool = True,
+                 on_conflict: str = 'error',
+                 ) -> database.InsertResult:
+    return _insert_one(conn, 'matches', database._row_values(model.Match)(match), commit, on_conflict)
+
+
+def insert_summoner_match(conn,
+                          summoner_match: model.SummonerMatch,
+                          commit: bool = True,
+                          on_conflict: str = 'error',
+                          ) -> database.InsertResult:
+    values = database._row_values(model.SummonerMatch)(summoner_match)
+    return _insert_one(conn, 'summoner_matches', values, commit, on_conflict)
+
+
+def insert_team(conn,
+                team: model.Team,
+                commit: bool = True,
+                on_conflict: str = 'error',
+                ) -> database.InsertResult:
+    return _insert_one(conn, 'teams', database._row_values(model.Team)(team), commit, on_conflict)
+
+
+def insert_champion(conn,
+                    champion: model.Champion,
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> database.InsertResult:
+    return _insert_one(conn, 'champions', database._row_values(model.Champion)(champion), commit, on_conflict)
+
+
+def insert_timeline(conn,
+                    timeline: model.Timeline,
+                    commit: bool = True,
+                    on_conflict: str = 'error',
+                    ) -> database.InsertResult:
+    # deltas are kept as the dicts postgres would return for the json columns
+    return _insert_one(conn, 'timelines', database._row_values(model.Timeline)(timeline), commit, on_conflict)
+
+
+def insert_stat(conn,
+                stat: model.Stat,
+                commit: bool = True,
+                on_conflict: str = 'error',
+                ) -> database.InsertResult:
+    return _insert_one(conn, 'stats', database._row_values(model.Stat)(stat), commit, on_conflict)
+
+
+def insert_participant(conn,
+                       participant: model.Participant,
+                       commit: bool = True,
+                       on_conflict: str = 'error',
+                       ) -> database.InsertResult:
+    values = database._row_values(model.Participant)(participant)
+    return _insert_one(conn, 'participants', values, commit, on_conflict)
+
+
+def insert_event(conn,
+                 event: model.Event,
+                 commit: bool = True,
+                 on_conflict: str = 'error',
+                 ) -> database.InsertResult:
+    return _insert_one(conn, 'events', database._row_values(model.Event)(event), commit, on_conflict)
+
+
+def insert_participant_frame(conn,
+                             participant_frame: model.ParticipantFrame,
+                             commit: bool = True,
+                             on_conflict: str = 'error',
+                             ) -> database.InsertResult:
+    values = database._row_values(model.ParticipantFrame)(participant_frame)
+    return _insert_one(conn, 'participant_frame', values, commit, on_conflict)
+
+
+def insert_duo_games(conn,
+                     game_ids: typing.Iterable,
+                     commit: bool = True,
+                     ) -> database.InsertResult:
+    participants, teams, stats = conn.table('participants'), conn.table('teams'), conn.table('stats')
+    values = database._row_values(model.DuoGame)
+    rows = []
+    for game_id in database._game_ids(game_ids):
+        for p1 in participants.find(('gameid',), game_id):
+            team = teams.get((game_id, p1['teamid']))
+            st1 = stats.get(p1['statid'])
+            if team is None or st1 is None:
+                continue
+            for p2 in participants.find(('gameid',), game_id):
+                st2 = stats.get(p2['statid'])
+                if p2['teamid'] != p1['teamid'] or not p1['accountid'] < p2['accountid'] or st2 is None:
+                    continue
+                rows.append(values(model.DuoGame(
+                    account_id1=p1['accountid'],
+                    account_id2=p2['accountid'],
+                    game_id=game_id,
+                    team_id=p1['teamid'],
+                    win=team['win'],
+                    participant_id1=p1['participantid'],
+                    participant_id2=p2['participantid'],
+                    stat_id1=p1['statid'],
+                    stat_id2=p2['statid'],
+                    role1=p1['role'],
+                    role2=p2['role'],
+                    lane1=p1['lane'],
+                    lane2=p2['lane'],
+                    champion_id1=p1['championid'],
+                    champion_id2=p2['championid'],
+                    kills1=st1['kills'],
+                    kills2=st2['kills'],
+                    deaths1=st1['deaths'],
+                    deaths2=st2['deaths'],
+                    assists1=st1['assists'],
+                    assists2=st2['assists'],
+                    total_minions_killed1=st1['totalminionskilled'],
+                    total_minions_killed2=st2['totalminionskilled'],
+                )))
+    result = _insert_many(conn, 'duo_games', rows, commit, 'update')
+    return dataclasses.replace(result, skipped=0)
+
+
+def _bulk(rows, method: str):
+    if method not in ('copy', 'values'):
+        raise ValueError(f'unknown bulk insert method {method}')
+    return rows
+
+
+def insert_teams_bulk(conn,
+                      teams: typing.Iterable[model.Team],
+                      method: str = 'copy',
+                      batch_size: int = 1000,
+                      commit: bool = True,
+                      on_conflict: str = 'error',
+                      ) -> database.InsertResult:
+    values = database._row_values(model.Team)
+    return _insert_many(conn, 'teams', _bulk([values(team) for team in teams], method), commit, on_conflict)
+
+
+def insert_stats_bulk(conn,
+                      stats: typing.Iterable[model.Stat],
+                      method: str = 'copy',
+                      batch_size: int = 1000,
+                      commit: bool = True,
+                      on_conflict: str = 'error',
+                      ) -> database.InsertResult:
+    values = database._row_values(model.Stat)
+    return _insert_many(conn, 'stats', _bulk([values(stat) for stat in stats], method), commit, on_conflict)
+
+
+def insert_timelines_bulk(conn,
+                          timelines: typing.Iterable[model.Timeline],
+                          method: str = 'copy',
+                          batch_size: int = 1000,
+                          commit: bool = True,
+                          on_conflict: str = 'error',
+                          ) -> database.InsertResult:
+    values = database._row_values(model.Timeline)
+    rows = _bulk([values(timeline) for timeline in timelines], method)
+    return _insert_many(conn, 'timelines', rows, commit, on_conflict)
+
+
+def insert_participants_bulk(conn,
+                             participants: typing.Iterable[model.Participant],
+                             method: str = 'copy',
+                             batch_size: int = 1000,
+                             commit: bool = True,
+                             on_conflict: str = 'error',
+                             ) -> database.InsertResult:
+    values = database._row_values(model.Participant)
+    rows = _bulk([values(participant) for participant in participants], method)
+    return _insert_many(conn, 'participants', rows, commit, on_conflict)
+
+
+def insert_events_bulk(conn,
+                       events: typing.Iterable[model.Event],
+                       method: str = 'copy',
+                       batch_size: int = 1000,
+                       commit: bool = True,
+                       on_conflict: str = 'error',
+                       ) -> database.InsertResult:
+    values = database._row_values(model.Event)
+    return _insert_many(conn, 'events', _bulk([values(event) for event in events], method), commit, on_conflict)
+
+
+def insert_participant_frames_bulk(conn,
+                                   participant_frames: typing.Iterable[model.ParticipantFrame],
+                                   method: str = 'copy',
+                                   batch_size: int = 1000,
+                                   commit: bool = True,
+                                   on_conflict: str = 'error',
+                                   ) -> database.InsertResult:
+    values = database._row_values(model.ParticipantFrame)
+    rows = _bulk([values(participant_frame) for participant_frame in participant_frames], method)
+    return _insert_many(conn, 'participant_frame', rows, commit, on_conflict)
+
+
+def load(conn,
+         table: str,
+         rows: typing.Iterable[typing.Union[typing.Sequence, typing.Mapping]],
+         commit: bool = True,
+         ) -> database.InsertResult:
+    """
+    Fills given table with rows given as values in column order or as mappings of column name to
+    value (e.g. rows selected from postgres), existing rows are updated. Meant for tables database
+    has no insert function for, like queue_types.
+    :param conn:
+    :param table:
+    :param rows:
+    :param commit:
+    :return:
+    """
+    columns = conn.table(table).columns
+    rows = [[row[column] for column in columns] if hasattr(row, 'keys') else row for row in rows]
+    return _insert_many(conn, table, rows, commit, 'update' if conn.table(table).key else 'error')
+
+
+# selects
+#####################################################################################################
+#####################################################################################################
+#####################################################################################################
+
+
+def _model(cls, row: typing.Optional[Row]):
+    # rows of a single table hold the model fields in order
+    return None if row is None else cls(*row)
+
+
+def _first(rows: typing.List[Row]) -> typing.Optional[Row]:
+    return rows[0] if rows else None
+
+
+def _join(*rows: Row) -> Row:
+    # SELECT * over joined tables
+    columns = sum((tuple(row._index) for row in rows), ())
+    return Row(_index(columns), [value for row in rows for value in row])
+
+
+def _as(rows: typing.Iterable[Row], as_tuples: bool) -> list:
+    return [tuple(row) for row in rows] if as_tuples else list(rows)
+
+
+def _game_participants(conn, game_id) -> typing.List[Row]:
+    return conn.table('participants').find(('gameid',), int(game_id))
+
+
+def _sum(rows: typing.Iterable[Row], *columns: str) -> typing.Optional[int]:
+    # SUM ignores NULL and is NULL without values
+    values = [row[column] for row in rows for column in columns if row[column] is not None]
+    return sum(values) if values else None
+
+
+# like in database some selects commit
+
+def select_count_summoner_match(conn,
+                                account_id: str,
+                                ):
+    conn.commit()
+    return len(conn.table('summoner_matches').find(('accountid',), account_id))
+
+
+def select_summoner(conn,
+                    summoner_name: str,
+                    ):
+    conn.commit()
+    return _model(model.Summoner, _first(conn.table('summoners').find(('name',), summoner_name)))
+
+
+def select_champion_name_id(
+    conn,
+    champ_id: str,
+):
+    return conn.table('champions').get(int(champ_id))
+
+
+def select_all_champions(conn):
+    return list(conn.table('champions'))
+
+
+def select_all_queue_types(conn):
+    return list(conn.table('queue_types'))
+
+
+_STAT_ID = ('statid',)
+
+
+def select_stat_from_participant(conn,
+                                 summoner: model.Summoner,
+                                 ):
+    index = _index(_STAT_ID)
+    return [Row(index, (row['statid'],)) for row in conn.table('participants').find(('accountid',), summoner.account_id)]
+
+
+def select_stats(conn,
+                 statid: str,
+                 ) -> model.Stat:
+    return _model(model.Stat, conn.table('stats').get(statid))
+
+
+def select_participant_from_stat(conn, stat: model.Stat) -> model.Participant:
+    return _model(model.Participant, _first(conn.table('participants').find(('statid',), stat.stat_id)))
+
+
+def select_participant_from_gameid_accountid(
+    conn,
+    game_id: int,
+    account_id: str,
+) -> model.Participant:
+    conn.commit()
+    return _model(model.Participant, select_accountid_in_game(conn, account_id, game_id))
+
+
+def select_participant(conn, participant_id: str) -> model.Participant:
+    return _model(model.Participant, conn.table('participants').get(participant_id))
+
+
+def select_participant_team(conn, participant_id: str):
+    row = conn.table('participants').get(participant_id)
+    return [] if row is None else [row]
+
+
+def select_participant_frames(conn, participant_id: str, as_tuples: bool = False):
+    return _as(conn.table('participant_frame').find(('participantid',), participant_id), as_tuples)
+
+
+_TOTAL_GOLD = ('totalgold',)
+_POSITION = ('position',)
+
+
+def select_participant_gold(conn, participant_id: str):
+    index = _index(_TOTAL_GOLD)
+    return [Row(index, (row['totalgold'],))
+            for row in conn.table('participant_frame').find(('participantid',), participant_id)]
+
+
+def select_positions(conn, participant_id: str):
+    index = _index(_POSITION)
+    return [Row(index, (row['position'],))
+            for row in conn.table('participant_frame').find(('participantid',), participant_id)]
+
+
+def select_opponent(conn, participant_id: str, game_id: str, position: (str, str)) -> model.Participant:
+    for row in _game_participants(conn, game_id):
+        if row['lane'] == position[0] and row['role'] == position[1] and row['participantid'] != participant_id:
+            return _model(model.Participant, row)
+    return None
+
+
+def select_accountid_in_game(
+    conn,
+    account_id: str,
+    game_id: str,
+):
+    for row in _game_participants(conn, game_id):
+        if row['accountid'] == account_id:
+            return row
+    return None
+
+
+def select_participantid_from_game_and_account(
+    conn,
+    game_id: str,
+    account_id: str,
+):
+    return select_accountid_in_game(conn, account_id, game_id)[0]
+
+
+def select_teamid_from_game_and_account(
+    conn,
+    game_id: str,
+    account_id: str,
+):
+    return select_accountid_in_game(conn, account_id, game_id)[5]
+
+
+def select_team_from_teamid_and_gameid(
+    conn,
+    game_id: str,
+    team_id: str,
+):
+    return conn.table('teams').get((int(game_id), int(team_id)))
+
+
+def select_match_by_gameid(
+    conn,
+    game_id: str,
+):
+    return conn.table('matches').get(int(game_id))
+
+
+def select_general_game_info(
+    conn,
+    game_id: str
+):
+    match = conn.table('matches').get(int(game_id))
+    queue_type = None if match is None else conn.table('queue_types').get(match['queueid'])
+    return None if queue_type is None else _join(match, queue_type)
+
+
+def select_game_ids(conn, after: int = None, limit: int = 1000) -> typing.List[int]:
+    after = -1 if after is None else after
+    return sorted(game_id for game_id in conn.table('matches')._positions if game_id > after)[:limit]
+
+
+def select_summoner_games(conn, account_id: str):
+    if conn.table('summoners').get(account_id) is None:
+        return []
+    index = _index(('accountid', 'gameid', 'win'))
+    teams = conn.table('teams')
+    rows = []
+    for participant in conn.table('participants').find(('accountid',), account_id):
+        team = teams.get((participant['gameid'], participant['teamid']))
+        if team is not None:
+            rows.append(Row(index, (account_id, participant['gameid'], team['win'])))
+    return rows
+
+
+# stats of a game or team
+
+_KILL_INFORMATION = ('kills', 'deaths', 'assists')
+_CS = ('totalminionskilled', 'neutralminionskilledteamjungle', 'neutralminionskilledenemyjungle')
+
+
+def _team_stats(conn, game_id, team_id) -> typing.List[Row]:
+    stats = conn.table('stats')
+    rows = (stats.get(participant['statid'])
+            for participant in _game_participants(conn, game_id) if participant['teamid'] == int(team_id))
+    return [row for row in rows if row is not None]
+
+
+def select_overall_kill_information(conn, game_id: str, team_id: int):
+    stats = _team_stats(conn, game_id, team_id)
+    return Row(_index(_KILL_INFORMATION), [_sum(stats, column) for column in _KILL_INFORMATION])
+
+
+def select_team_gold(conn, game_id: str, team_id):
+    return [Row(_index(('gold',)), (_sum(_team_stats(conn, game_id, team_id), 'goldearned'),))]
+
+
+def select_team_cs(conn, game_id: str, team_id):
+    # a row with a NULL summand is left out of SUM(a + b + c)
+    stats = [row for row in _team_stats(conn, game_id, team_id) if all(row[column] is not None for column in _CS)]
+    return [Row(_index(('cs',)), (_sum(stats, *_CS),))]
+
+
+# events and frames of a game
+
+def _game_events(conn, game_id, types: typing.Tuple[str, ...] = None) -> typing.List[typing.Tuple[Row, Row]]:
+    # (event, participant) of given game ordered by timestamp
+    events = conn.table('events')
+    pairs = [
+        (event, participant)
+        for participant in _game_participants(conn, game_id)
+        for event in events.find(('participantid',), participant['participantid'])
+        if types is None or event['type'] in types
+    ]
+    pairs.sort(key=lambda pair: pair[0]['timestamp'])
+    return pairs
+
+
+def select_game_events(conn, game_id: str):
+    return [event for event, _ in _game_events(conn, game_id)]
+
+
+_KILL_TIMELINE = ('participantid', 'timestamp', 'position', 'killer', 'victim', 'teamid', 'assistingparticipantids')
+
+
+def _kill_row(event: Row, participant: Row, game_id: int = None) -> Row:
+    values = (participant['participantid'], event['timestamp'], event['position'], event['killerid'],
+              event['victimid'], participant['teamid'], event['assistingparticipantids'])
+    if game_id is None:
+        return Row(_index(_KILL_TIMELINE), values)
+    return Row(_index(('gameid',) + _KILL_TIMELINE), (game_id,) + values)
+
+
+def select_kill_timeline(conn, game_id: str, team_id: int):
+    return [
+        _kill_row(event, participant)
+        for event, participant in _game_events(conn, game_id, ('CHAMPION_KILL',))
+        if participant['teamid'] == int(team_id)
+    ]
+
+
+def select_all_kill_timeline(conn, game_id: str):
+    return [_kill_row(event, participant) for event, participant in _game_events(conn, game_id, ('CHAMPION_KILL',))]
+
+
+_OBJECTIVES = ('BUILDING_KILL', 'ELITE_MONSTER_KILL')
+
+
+def select_objectives(conn, game_id: str):
+    return [_join(event, participant) for event, participant in _game_events(conn, game_id, _OBJECTIVES)]
+
+
+def _game_frames(conn, game_id) -> typing.List[typing.Tuple[Row, Row]]:
+    # (frame, participant) of given game ordered by timestamp
+    frames = conn.table('participant_frame')
+    pairs = [
+        (frame, participant)
+        for participant in _game_participants(conn, game_id)
+        for frame in frames.find(('participantid',), participant['participantid'])
+    ]
+    pairs.sort(key=lambda pair: pair[0]['timestamp'])
+    return pairs
+
+
+def select_game_frames(conn, game_id: str, as_tuples: bool = False):
+    return _as((_join(frame, participant) for frame, participant in _game_frames(conn, game_id)), as_tuples)
+
+
+def _coordinate(position: typing.Optional[str], part: int) -> typing.Optional[int]:
+    # NULLIF(btrim(split_part(btrim(position, '()'), ',', part), ' {}'), '')::integer
+    if position is None:
+        return None
+    parts = position.strip('()').split(',')
+    value = parts[part].strip(' {}') if part < len(parts) else ''
+    return int(value) if value != '' else None
+
+
+def select_game_frame_columns(conn, game_id: str):
+    return [
+        (frame['timestamp'], frame['participantid'], participant['teamid'], frame['totalgold'], frame['xp'],
+         frame['level'], frame['minionskilled'], frame['jungleminionskilled'],
+         _coordinate(frame['position'], 0), _coordinate(frame['position'], 1))
+        for frame, participant in _game_frames(conn, game_id)
+    ]
+
+
+def select_game_bundle(
+    conn,
+    game_id: str,
+):
+    game_id = int(game_id)
+    participants = _game_participants(conn, game_id)
+    match = conn.table('matches').get(game_id)
+    queue_type = None if match is None else conn.table('queue_types').get(match['queueid'])
+    stats = conn.table('stats')
+    stat_rows = [stats.get(participant['statid']) for participant in participants]
+    values = (
+        None if match is None else dict(match),
+        None if queue_type is None else dict(queue_type),
+        [dict(team) for team in conn.table('teams').find(('gameid',), game_id)] or None,
+        [dict(participant) for participant in participants] or None,
+        [dict(stat) for stat in stat_rows if stat is not None] or None,
+        [dict(frame) for frame, _ in _game_frames(conn, game_id)] or None,
+        [dict(event) for event, _ in _game_events(conn, game_id)] or None,
+    )
+    return Row(_index(('match', 'queue_type', 'teams', 'participants', 'stats', 'frames', 'events')), values)
+
+
+# games of two summoners
+
+def _common_participants(conn, s1: model.Summoner, s2: model.Summoner) -> typing.Iterator[tuple]:
+    # (game id, participant 1, participant 2, team) of games both summoners played in the same team
+    summoner_matches = conn.table('summoner_matches')
+    games = set(row['gameid'] for row in summoner_matches.find(('accountid',), s2.account_id))
+    teams = conn.table('teams')
+    for row in summoner_matches.find(('accountid',), s1.account_id):
+        game_id = row['gameid']
+        if game_id not in games:
+            continue
+        p1 = select_accountid_in_game(conn, s1.account_id, game_id)
+        p2 = select_accountid_in_game(conn, s2.account_id, game_id)
+        if p1 is None or p2 is None or p1['teamid'] != p2['teamid']:
+            continue
+        team = teams.get((game_id, p1['teamid']))
+        if team is not None:
+            yield game_id, p1, p2, team
+
+
+_COMMON_GAMES = ('gameid', 's1_accountid', 's1_participantid', 's1_statid', 's1_teamid', 's2_accountid',
+                 's2_participantid', 's2_statid', 's2_teamid', 's1_role', 's1_lane', 's2_role', 's2_lane', 'win')
+
+
+def select_common_games(conn, s1: model.Summoner, s2: model.Summoner):
+    index = _index(_COMMON_GAMES)
+    rows = dict.fromkeys(
+        (game_id, p1['accountid'], p1['participantid'], p1['statid'], p1['teamid'], p2['accountid'],
+         p2['participantid'], p2['statid'], p2['teamid'], p1['role'], p1['lane'], p2['role'], p2['lane'],
+         team['win'])
+        for game_id, p1, p2, team in _common_participants(conn, s1, s2)
+    )
+    return [Row(index, row) for row in rows]
+
+
+_COMMON_GAME_STATS = ('gameid', 's1_kills', 's1_deaths', 's1_assists', 's1_totalminionskilled', 's1_role',
+                      's1_lane', 's2_kills', 's2_deaths', 's2_assists', 's2_totalminionskilled', 's2_role',
+                      's2_lane', 'win', 's1_champion', 's2_champion')
+
+
+def select_common_game_stats(conn, s1: model.Summoner, s2: model.Summoner):
+    index = _index(_COMMON_GAME_STATS)
+    stats = conn.table('stats')
+    rows = {}
+    for game_id, p1, p2, team in _common_participants(conn, s1, s2):
+        st1, st2 = stats.get(p1['statid']), stats.get(p2['statid'])
+        if st1 is None or st2 is None:
+            continue
+        rows[(game_id, st1['kills'], st1['deaths'], st1['assists'], st1['totalminionskilled'], p1['role'],
+              p1['lane'], st2['kills'], st2['deaths'], st2['assists'], st2['totalminionskilled'], p2['role'],
+              p2['lane'], team['win'], p1['championid'], p2['championid'])] = None
+    return [Row(index, row) for row in rows]
+
+
+_DUO_SIDE = ('accountid', 'participantid', 'statid', 'teamid', 'role', 'lane', 'champion', 'kills', 'deaths',
+             'assists', 'totalminionskilled')
+_DUO_STORED = ('accountid{n}', 'participantid{n}', 'statid{n}', 'teamid', 'role{n}', 'lane{n}', 'championid{n}',
+               'kills{n}', 'deaths{n}', 'assists{n}', 'totalminionskilled{n}')
+_DUO_GAMES = ('gameid', 'win') + tuple(f'{s}_{column}' for s in ('s1', 's2') for column in _DUO_SIDE)
+
+
+def select_duo_games(conn, s1: model.Summoner, s2: model.Summoner):
+    first, second = ('1', '2') if s1.account_id <= s2.account_id else ('2', '1')
+    columns = ('gameid', 'win') + tuple(column.format(n=n) for n in (first, second) for column in _DUO_STORED)
+    index = _index(_DUO_GAMES)
+    duo_games = conn.table('duo_games')
+    values = _getter(duo_games.index, columns)
+    return [
+        Row(index, values(row))
+        for row in duo_games.find(('accountid1', 'accountid2'), tuple(sorted((s1.account_id, s2.account_id))))
+    ]
+
+
+# full table reads, streamed from a snapshot of the table
+
+_ALL_GAMES = ('gameid', 's1_accountid', 's1_participantid', 's1_statid', 's1_teamid', 's1_role', 's1_lane', 'win')
+
+
+def _all_participants(conn) -> typing.Iterator[Row]:
+    stats = conn.table('stats')
+    for participant in list(conn.table('participants')):
+        stat = stats.get(participant['statid'])
+        if stat is not None:
+            yield _join(stat, participant)
+
+
+def _all_games(conn) -> typing.Iterator[Row]:
+    index = _index(_ALL_GAMES)
+    teams = conn.table('teams')
+    seen = set()
+    for row in list(conn.table('summoner_matches')):
+        participant = select_accountid_in_game(conn, row['accountid'], row['gameid'])
+        team = None if participant is None else teams.get((row['gameid'], participant['teamid']))
+        if team is None:
+            continue
+        values = (row['gameid'], row['accountid'], participant['participantid'], participant['statid'],
+                  participant['teamid'], participant['role'], participant['lane'], team['win'])
+        if values not in seen:
+            seen.add(values)
+            yield Row(index, values)
+
+
+def _participant_models(row: Row) -> typing.Tuple[model.Stat, model.Participant]:
+    stat_columns = len(database._TABLE_COLUMNS['stats'])
+    return model.Stat(*row[:stat_columns]), model.Participant(*row[stat_columns:])
+
+
+def _stream(rows: typing.Iterator, chunk_size: int = None, convert: typing.Callable = None):
+    if convert is not None:
+        rows = map(convert, rows)
+    if chunk_size is None:
+        yield from rows
+        return
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def select_all_participants(conn, as_tuples: bool = False):
+    return _as(_all_participants(conn), as_tuples)
+
+
+def iter_all_participants(conn, itersize: int = 2000, as_models: bool = False):
+    return _stream(_all_participants(conn), convert=_participant_models if as_models else None)
+
+
+def chunk_all_participants(conn, chunk_size: int = 10000, as_models: bool = False):
+    return _stream(_all_participants(conn), chunk_size=chunk_size, convert=_participant_models if as_models else None)
+
+
+def select_all_games(conn, as_tuples: bool = False):
+    return _as(_all_games(conn), as_tuples)
+
+
+def iter_all_games(conn, itersize: int = 2000, as_tuples: bool = False):
+    return _stream(_all_games(conn), convert=tuple if as_tuples else None)
+
+
+def chunk_all_games(conn, chunk_size: int = 10000, as_tuples: bool = False):
+    return _stream(_all_games(conn), chunk_size=chunk_size, convert=tuple if as_tuples else None)
+
+
+def select_all_summoners(conn, as_tuples: bool = False):
+    return _as(conn.table('summoners'), as_tuples)
+
+
+def _summoner_model(row: Row) -> model.Summoner:
+    return model.Summoner(*row)
+
+
+def iter_all_summoners(conn, itersize: int = 2000, as_models: bool = False):
+    return _stream(iter(list(conn.table('summoners'))), convert=_summoner_model if as_models else None)
+
+
+def chunk_all_summoners(conn, chunk_size: int = 10000, as_models: bool = False):
+    return _stream(
+        iter(list(conn.table('summoners'))),
+        chunk_size=chunk_size,
+        convert=_summoner_model if as_models else None,
+    )
+
+
+# batched selects, grouped like database._select_for_games
+
+def _group_for_games(rows: typing.Iterable[Row], game_ids: typing.List[int], by_team: bool, single: bool = False):
+    grouped = {game_id: {} if by_team else [] for game_id in game_ids}
+    for row in rows:
+        group = grouped[row['gameid']]
+        if not by_team:
+            group.append(row)
+        elif single:
+            group[row['teamid']] = row
+        else:
+            group.setdefault(row['teamid'], []).append(row)
+    return grouped
+
+
+def _kills_for_games(conn, game_ids: typing.List[int]) -> typing.Iterator[Row]:
+    for game_id in game_ids:
+        for event, participant in _game_events(conn, game_id, ('CHAMPION_KILL',)):
+            yield _kill_row(event, participant, game_id)
+
+
+def select_kill_timelines_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, typing.Dict[int, list]]:
+    game_ids = database._game_ids(game_ids)
+    return _group_for_games(_kills_for_games(conn, game_ids), game_ids, by_team=True)
+
+
+def select_all_kill_timelines_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, list]:
+    game_ids = database._game_ids(game_ids)
+    return _group_for_games(_kills_for_games(conn, game_ids), game_ids, by_team=False)
+
+
+def _team_stats_for_games(conn,
+                          game_ids: typing.List[int],
+                          ) -> typing.Iterator[typing.Tuple[int, int, typing.List[Row]]]:
+    # (game id, team id, stats) of every team with stored participants
+    stats = conn.table('stats')
+    for game_id in game_ids:
+        teams = {}
+        for participant in _game_participants(conn, game_id):
+            stat = stats.get(participant['statid'])
+            if stat is not None:
+                teams.setdefault(participant['teamid'], []).append(stat)
+        for team_id, rows in teams.items():
+            yield game_id, team_id, rows
+
+
+def select_overall_kill_information_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    game_ids = database._game_ids(game_ids)
+    index = _index(('gameid', 'teamid') + _KILL_INFORMATION)
+    rows = (
+        Row(index, (game_id, team_id) + tuple(_sum(stats, column) for column in _KILL_INFORMATION))
+        for game_id, team_id, stats in _team_stats_for_games(conn, game_ids)
+    )
+    return _group_for_games(rows, game_ids, by_team=True, single=True)
+
+
+def select_team_gold_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    game_ids = database._game_ids(game_ids)
+    index = _index(('gameid', 'teamid', 'gold'))
+    rows = (
+        Row(index, (game_id, team_id, _sum(stats, 'goldearned')))
+        for game_id, team_id, stats in _team_stats_for_games(conn, game_ids)
+    )
+    return _group_for_games(rows, game_ids, by_team=True, single=True)
+
+
+def select_team_cs_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, dict]:
+    game_ids = database._game_ids(game_ids)
+    index = _index(('gameid', 'teamid', 'cs'))
+    rows = (
+        Row(index, (game_id, team_id, _sum([row for row in stats if all(row[c] is not None for c in _CS)], *_CS)))
+        for game_id, team_id, stats in _team_stats_for_games(conn, game_ids)
+    )
+    return _group_for_games(rows, game_ids, by_team=True, single=True)
+
+
+def select_objectives_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, list]:
+    game_ids = database._game_ids(game_ids)
+    rows = (
+        _join(event, participant)
+        for game_id in game_ids
+        for event, participant in _game_events(conn, game_id, _OBJECTIVES)
+    )
+    return _group_for_games(rows, game_ids, by_team=False)
+
+
+def select_participants_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, typing.List[model.Participant]]:
+    game_ids = database._game_ids(game_ids)
+    return {
+        game_id: [_model(model.Participant, row) for row in _game_participants(conn, game_id)]
+        for game_id in game_ids
+    }
+
+
+def select_event_counts_for_games(conn, game_ids: typing.Iterable) -> typing.Dict[int, int]:
+    game_ids = database._game_ids(game_ids)
+    return {game_id: len(_game_events(conn, game_id)) for game_id in game_ids}
+
+
+# backend selection
+#####################################################################################################
+#####################################################################################################
+#####################################################################################################
+
+
+_CONNECTION_FUNCTIONS = ('get_connection', 'kill_connection', 'connection', 'init_pool', 'close_pool', 'get_pool')
+_originals = {}
+
+
+def _functions() -> typing.List[str]:
+    module = sys.modules[__name__]
+    names = [
+        name for name in dir(database)
+        if name.startswith(('select_', 'insert_', 'iter_', 'chunk_')) and callable(getattr(database, name))
+    ]
+    missing = [name for name in names if not hasattr(module, name)]
+    if missing:
+        raise NotImplementedError(f'no in-memory implementation of database.{", database.".join(missing)}')
+    return names + list(_CONNECTION_FUNCTIONS)
+
+
+def install():
+    """
+    Replaces the insert, select and connection functions of database by the ones of this module.
+    :return:
+    """
+    module = sys.modules[__name__]
+    for name in _functions():
+        _originals.setdefault(name, getattr(database, name))
+        setattr(database, name, getattr(module, name))
+
+
+def uninstall():
+    """
+    Restores the functions of database replaced by install().
+    :return:
+    """
+    for name, function in _originals.items():
+        setattr(database, name, function)
+    _originals.clear()
+
+
+def installed() -> bool:
+    return bool(_originals)
+
+
+@contextlib.contextmanager
+def backend():
+    """
+    Context manager installing this module as backend of database for its duration.
+    :return:
+    """
+    was_installed = installed()
+    install()
+    try:
+        yield _database
+    finally:
+        if not was_installed:
+            uninstall()
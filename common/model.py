@@ -1,7 +1,39 @@
 import dataclasses
+import operator
 import typing
 
 
+def _compact(cls):
+    """
+    Recreates given frozen dataclass with __slots__ instead of a per instance __dict__ and with an
+    __init__ writing the slots directly instead of going through object.__setattr__. Field names,
+    equality, hashing, pickling and dataclasses.astuple behave as before. Used for models created
+    thousands of times per match.
+    :param cls:
+    :return:
+    """
+    names = tuple(field.name for field in dataclasses.fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items() if key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    compact = type(cls)(cls.__name__, cls.__bases__, namespace)
+
+    # slot descriptors bypass the frozen __setattr__
+    setters = {f'_set_{name}': getattr(compact, name).__set__ for name in names}
+    exec(
+        f'def __init__(self, {", ".join(names)}):\n'
+        + ''.join(f'    _set_{name}(self, {name})\n' for name in names),
+        setters,
+    )
+    init = setters['__init__']
+    init.__qualname__ = f'{cls.__qualname__}.__init__'
+    compact.__init__ = init
+
+    # pickled as constructor call with the field values, cheaper to load than restoring slot by slot
+    values = operator.attrgetter(*names) if len(names) > 1 else lambda self: (getattr(self, names[0]),)
+    compact.__reduce__ = lambda self: (compact, values(self))
+    return compact
+
+
 @dataclasses.dataclass(frozen=False)
 class Summoner:
     account_id: str
@@ -72,6 +104,7 @@ class Timeline:
     damage_taken_diff_per_min_deltas: typing.Mapping[str, float]
 
 
+@_compact
 @dataclasses.dataclass(frozen=True)
 class Stat:
     stat_id: str
@@ -177,6 +210,7 @@ class Participant:
     lane: str
 
 
+@_compact
 @dataclasses.dataclass(frozen=True)
 class ParticipantFrame:
     participant_id: str
@@ -191,6 +225,7 @@ class ParticipantFrame:
     jungle_minions_killed: int
 
 
+@_compact
 @dataclasses.dataclass(frozen=True)
 class Event:
     participant_id: str
@@ -217,6 +252,37 @@ class Event:
     victim_id: str
 
 
+@dataclasses.dataclass(frozen=True)
+class DuoGame:
+    """
+    Row of the duo_games materialization: two summoners playing in the same team of a game, side 1
+    is the summoner with the smaller account id.
+    """
+    account_id1: str
+    account_id2: str
+    game_id: int
+    team_id: int
+    win: str
+    participant_id1: str
+    participant_id2: str
+    stat_id1: str
+    stat_id2: str
+    role1: str
+    role2: str
+    lane1: str
+    lane2: str
+    champion_id1: int
+    champion_id2: int
+    kills1: int
+    kills2: int
+    deaths1: int
+    deaths2: int
+    assists1: int
+    assists2: int
+    total_minions_killed1: int
+    total_minions_killed2: int
+
+
 @dataclasses.dataclass(frozen=True)
 class AnalyseRequest:
     summoner_name: str
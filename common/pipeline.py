@@ -0,0 +1,493 @@
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import os
+import queue
+import threading
+import time
+import typing
+
+import database
+import decoder
+import model
+import rid_parser
+import util
+from dtos import match
+
+# parallel ingest: worker processes decode the riot json of a game and parse it into rows, writer
+# threads take the parsed games from a bounded queue and write them in batches, every table of a
+# batch with one bulk insert (COPY) in one transaction. Parsing is cpu bound and runs on all cores,
+# writing waits on the database and overlaps with it. At most max_pending games are between
+# submit() and written, submit() blocks while that many are pending (backpressure), so a slow
+# database slows down the producer instead of filling memory. close() drains: everything submitted
+# is parsed and written before it returns.
+#
+#   with IngestPipeline(processes=4, writers=2) as pipeline:
+#       for match_json, timeline_json in games:
+#           pipeline.submit(match_json, timeline_json)
+#   print(pipeline.metrics())
+
+_logger = util.Logger(__name__)
+
+
+@dataclasses.dataclass
+class GameRows:
+    match: model.Match
+    teams: typing.List[model.Team]
+    stats: typing.List[model.Stat]
+    timelines: typing.List[model.Timeline]
+    participants: typing.List[model.Participant]
+    participant_frames: typing.List[model.ParticipantFrame]
+    events: typing.List[model.Event]
+    # time spent parsing in the worker
+    seconds: float = 0.0
+
+    def __len__(self):
+        return 1 + len(self.teams) + len(self.stats) + len(self.timelines) + len(self.participants) \
+               + len(self.participant_frames) + len(self.events)
+
+
+def _load(raw: typing.Union[str, bytes, typing.Mapping]) -> typing.Mapping:
+    return json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+
+
+def parse_game(match_json: typing.Union[str, bytes, typing.Mapping],
+               timeline_json: typing.Union[str, bytes, typing.Mapping] = None,
+               ) -> GameRows:
+    """
+    Parses a match (and its timeline) given as riot api json (raw or loaded) into the rows
+    ingest.MatchWriter writes. Runs in the worker processes.
+    :param match_json:
+    :param timeline_json:
+    :return:
+    """
+    start = time.perf_counter()
+    match_dto = decoder.decode(match.MatchDto, _load(match_json))
+    stats, timelines, participants, participant_ids = rid_parser.parse_match_participants(match_dto)
+
+    participant_frames = []
+    events = []
+    if timeline_json is not None:
+        for row in rid_parser.iter_match_timeline_json_rows(_load(timeline_json), participant_ids):
+            if isinstance(row, model.Event):
+                events.append(row)
+            else:
+                participant_frames.append(row)
+
+    return GameRows(
+        match=rid_parser.parse_match(match_dto),
+        teams=rid_parser.parse_teams(match_dto),
+        stats=stats,
+        timelines=timelines,
+        participants=participants,
+        participant_frames=participant_frames,
+        events=events,
+        seconds=time.perf_counter() - start,
+    )
+
+
+def parse_game_line(line: typing.Union[str, bytes]) -> GameRows:
+    """
+    Parses one json line {"match": ..., "timeline": ...} as written by synthetic.
+    :param line:
+    :return:
+    """
+    game = json.loads(line)
+    return parse_game(game['match'], game.get('timeline'))
+
+
+@dataclasses.dataclass(frozen=True)
+class PipelineMetrics:
+    elapsed: float
+    submitted: int
+    parsed: int
+    parse_failed: int
+    cancelled: int
+    parse_seconds: float
+    written: int
+    skipped: int
+    write_failed: int
+    rows_written: int
+    batches: int
+    write_seconds: float
+    backpressure_waits: int
+    backpressure_seconds: float
+    pending: int
+    queued: int
+
+    @property
+    def parse_rate(self) -> float:
+        # games per second over all workers
+        return self.parsed / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def write_rate(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_written / self.elapsed if self.elapsed else 0.0
+
+
+class IngestPipeline:
+    """
+    Parses submitted games on a process pool and writes them with writer threads, see the module
+    comment. Every writer uses its own connection from connect (database.get_connection by
+    default). A batch that fails is written again game by game, so a broken game only loses itself;
+    failures are counted and logged, not raised. Only a writer that cannot connect stops the
+    pipeline: its games are dropped and the error is raised from submit and close.
+    """
+
+    def __init__(self,
+                 processes: int = None,
+                 writers: int = 1,
+                 batch_size: int = 50,
+                 max_pending: int = None,
+                 bulk_method: str = 'copy',
+                 skip_existing: bool = True,
+                 duo_games: bool = True,
+                 connect: typing.Callable[[], typing.Any] = None,
+                 ):
+        if writers < 1 or batch_size < 1:
+            raise ValueError(f'invalid pipeline writers={writers} batch_size={batch_size}')
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes)
+        self.batch_size = batch_size
+        self.max_pending = max_pending if max_pending is not None else max(2 * batch_size * writers, 4 * self.processes)
+        self.bulk_method = bulk_method
+        self.skip_existing = skip_existing
+        self.duo_games = duo_games
+        self._connect = connect if connect is not None else database.get_connection
+        # a slot is taken on submit and given back once the game is written or dropped
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        # holds finished parse futures, never more than max_pending
+        self._parsed = queue.Queue(maxsize=self.max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        # the first error a writer failed to connect with
+        self._error = None
+        self._started = time.perf_counter()
+        self._stopped = None
+
+        self._submitted = 0
+        self._parsed_count = 0
+        self._parse_failed = 0
+        self._cancelled = 0
+        self._parse_seconds = 0.0
+        self._written = 0
+        self._skipped = 0
+        self._write_failed = 0
+        self._rows_written = 0
+        self._batches = 0
+        self._write_seconds = 0.0
+        self._backpressure_waits = 0
+        self._backpressure_seconds = 0.0
+
+        self._writers = [
+            threading.Thread(target=self._write_loop, name=f'ingest-writer-{number}', daemon=True)
+            for number in range(writers)
+        ]
+        for writer in self._writers:
+            writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # on errors (e.g. KeyboardInterrupt) games not parsed yet are dropped, parsed ones written
+        try:
+            self.close(cancel=exc_type is not None)
+        except Exception:
+            # don't hide the error already raised
+            if exc_type is None:
+                raise
+
+    # producer
+    #################################################################################################
+
+    def _submit(self, function, *args):
+        if self._closed:
+            raise RuntimeError('pipeline is closed')
+        if self._error is not None:
+            raise self._error
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self._slots.acquire()
+            with self._lock:
+                self._backpressure_waits += 1
+                self._backpressure_seconds += time.perf_counter() - start
+        try:
+            future = self._pool.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._submitted += 1
+        # never blocks, there are at most max_pending futures
+        future.add_done_callback(self._parsed.put)
+
+    def submit(self,
+               match_json: typing.Union[str, bytes, typing.Mapping],
+               timeline_json: typing.Union[str, bytes, typing.Mapping] = None,
+               ):
+        """
+        Queues a game given as riot api json for parsing, blocks while max_pending games are pending.
+        :param match_json:
+        :param timeline_json:
+        :return:
+        """
+        self._submit(parse_game, match_json, timeline_json)
+
+    def submit_line(self, line: typing.Union[str, bytes]):
+        """
+        Like submit for a json line {"match": ..., "timeline": ...}, decoded in the worker.
+        :param line:
+        :return:
+        """
+        self._submit(parse_game_line, line)
+
+    def close(self, cancel: bool = False) -> PipelineMetrics:
+        """
+        Stops accepting games and waits until every submitted game is parsed and written. With
+        cancel games whose parsing has not started are dropped instead. Raises the error a writer
+        failed to connect with, after every game is written or dropped.
+        :param cancel:
+        :return:
+        """
+        if not self._closed:
+            self._closed = True
+            self._pool.shutdown(wait=True, cancel_futures=cancel)
+            # behind the last game, one per writer
+            for _ in self._writers:
+                self._parsed.put(None)
+            for writer in self._writers:
+                writer.join()
+            self._stopped = time.perf_counter()
+        if self._error is not None:
+            raise self._error
+        return self.metrics()
+
+    # writers
+    #################################################################################################
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            _logger.error('writer failed to connect, dropping its games: %r', e)
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            # still take games off the queue, their slots must be given back
+            conn = None
+        try:
+            done = False
+            while not done:
+                future = self._parsed.get()
+                if future is None:
+                    return
+                batch = [future]
+                # take whatever else is parsed already, up to batch_size
+                while len(batch) < self.batch_size:
+                    try:
+                        future = self._parsed.get_nowait()
+                    except queue.Empty:
+                        break
+                    if future is None:
+                        done = True
+                        break
+                    batch.append(future)
+                self._write_batch(conn, batch)
+        finally:
+            if conn is not None:
+                database.kill_connection(conn)
+
+    def _write_batch(self, conn, futures: typing.List[concurrent.futures.Future]):
+        games = []
+        try:
+            for future in futures:
+                if future.cancelled():
+                    with self._lock:
+                        self._cancelled += 1
+                    continue
+                error = future.exception()
+                if error is not None:
+                    _logger.error('parsing a game failed: %r', error)
+                    with self._lock:
+                        self._parse_failed += 1
+                    continue
+                game = future.result()
+                games.append(game)
+                with self._lock:
+                    self._parsed_count += 1
+                    self._parse_seconds += game.seconds
+            if not games:
+                return
+            if conn is None:
+                with self._lock:
+                    self._write_failed += len(games)
+                return
+
+            start = time.perf_counter()
+            failed = 0
+            try:
+                written = self._write_games(conn, games)
+            except Exception as e:
+                _logger.warn('writing a batch of %s games failed, writing them one by one: %r', len(games), e)
+                written = []
+                for game in games:
+                    try:
+                        written += self._write_games(conn, [game])
+                    except Exception as e:
+                        _logger.error('writing game %s failed: %r', game.match.game_id, e)
+                        failed += 1
+            with self._lock:
+                self._batches += 1
+                self._written += len(written)
+                self._write_failed += failed
+                self._skipped += len(games) - len(written) - failed
+                self._rows_written += sum(len(game) for game in written)
+                self._write_seconds += time.perf_counter() - start
+        finally:
+            for _ in futures:
+                self._slots.release()
+
+    def _write_games(self, conn, games: typing.List[GameRows]) -> typing.List[GameRows]:
+        """
+        Writes given games in one transaction with one bulk insert per table, returns the written
+        games (without the skipped existing ones). Rolls back and raises on errors.
+        :param conn:
+        :param games:
+        :return:
+        """
+        try:
+            fresh = []
+            for game in games:
+                result = database.insert_match(
+                    conn=conn,
+                    match=game.match,
+                    commit=False,
+                    on_conflict='ignore' if self.skip_existing else 'error',
+                )
+                if not result.skipped:
+                    fresh.append(game)
+            if fresh:
+                fresh, on_conflict = self._reuse_legacy_ids(conn, fresh)
+                self._insert_rows(conn, fresh, on_conflict)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return fresh
+
+    def _reuse_legacy_ids(self, conn, games: typing.List[GameRows]) -> typing.Tuple[typing.List[GameRows], str]:
+        """
+        Like ingest.MatchWriter: participants stored under other ids, as ingested before ids were
+        derived from natural keys, keep their ids in every row of their game and their stored rows
+        are kept. Events have no key, they are dropped if the game has stored events already. Returns
+        the games and the conflict handling to write them with.
+        :param conn:
+        :param games:
+        :return:
+        """
+        stored = database.select_participants_for_games(conn, [game.match.game_id for game in games])
+        mapped = {game.match.game_id: rid_parser.legacy_ids(game.participants, stored[game.match.game_id]) for game in games}
+        legacy = [game_id for game_id, ids in mapped.items() if ids]
+        if not legacy:
+            return games, 'error'
+
+        events_stored = database.select_event_counts_for_games(conn, legacy)
+        replaced = []
+        for game in games:
+            ids = mapped[game.match.game_id]
+            if ids:
+                game = dataclasses.replace(
+                    game,
+                    stats=[rid_parser.replace_ids(stat, ids) for stat in game.stats],
+                    timelines=[rid_parser.replace_ids(timeline, ids) for timeline in game.timelines],
+                    participants=[rid_parser.replace_ids(participant, ids) for participant in game.participants],
+                    participant_frames=[rid_parser.replace_ids(frame, ids) for frame in game.participant_frames],
+                    events=[] if events_stored[game.match.game_id] else [
+                        rid_parser.replace_ids(event, ids) for event in game.events
+                    ],
+                )
+            replaced.append(game)
+        return replaced, 'ignore'
+
+    def _insert_rows(self, conn, games: typing.List[GameRows], on_conflict: str = 'error'):
+        arguments = {'conn': conn, 'method': self.bulk_method, 'commit': False, 'on_conflict': on_conflict}
+        database.insert_teams_bulk(teams=[team for game in games for team in game.teams], **arguments)
+        database.insert_stats_bulk(stats=[stat for game in games for stat in game.stats], **arguments)
+        database.insert_timelines_bulk(
+            timelines=[timeline for game in games for timeline in game.timelines],
+            **arguments,
+        )
+        database.insert_participants_bulk(
+            participants=[participant for game in games for participant in game.participants],
+            **arguments,
+        )
+        if self.duo_games:
+            database.insert_duo_games(conn=conn, game_ids=[game.match.game_id for game in games], commit=False)
+        database.insert_participant_frames_bulk(
+            participant_frames=[frame for game in games for frame in game.participant_frames],
+            **arguments,
+        )
+        database.insert_events_bulk(events=[event for game in games for event in game.events], **arguments)
+
+    # metrics
+    #################################################################################################
+
+    def metrics(self) -> PipelineMetrics:
+        with self._lock:
+            return PipelineMetrics(
+                elapsed=(self._stopped or time.perf_counter()) - self._started,
+                submitted=self._submitted,
+                parsed=self._parsed_count,
+                parse_failed=self._parse_failed,
+                cancelled=self._cancelled,
+                parse_seconds=self._parse_seconds,
+                written=self._written,
+                skipped=self._skipped,
+                write_failed=self._write_failed,
+                rows_written=self._rows_written,
+                batches=self._batches,
+                write_seconds=self._write_seconds,
+                backpressure_waits=self._backpressure_waits,
+                backpressure_seconds=self._backpressure_seconds,
+                pending=self._submitted - self._written - self._skipped - self._write_failed
+                - self._parse_failed - self._cancelled,
+                queued=self._parsed.qsize(),
+            )
+
+
+def _report(metrics: PipelineMetrics) -> str:
+    return f'{metrics.written} games written ({metrics.write_rate:.1f}/s, {metrics.rows_per_second:.0f} rows/s), ' \
+           f'{metrics.parsed} parsed ({metrics.parse_rate:.1f}/s), {metrics.skipped} skipped, ' \
+           f'{metrics.parse_failed + metrics.write_failed} failed, {metrics.pending} pending, ' \
+           f'{metrics.backpressure_seconds:.1f}s backpressure'
+
+
+def main(argv: typing.Sequence[str] = None):
+    parser = argparse.ArgumentParser(description='ingests games from json lines {"match", "timeline"}')
+    parser.add_argument('input', help='json lines file, e.g. written by synthetic.py')
+    parser.add_argument('--processes', type=int, default=None, help='parser processes, one per core by default')
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=50, help='games per write transaction')
+    parser.add_argument('--report-every', type=float, default=5.0, help='seconds between progress lines')
+    args = parser.parse_args(argv)
+
+    pipeline = IngestPipeline(processes=args.processes, writers=args.writers, batch_size=args.batch_size)
+    reported = time.perf_counter()
+    with pipeline, open(args.input, 'rb') as infh:
+        for line in infh:
+            if line.strip():
+                pipeline.submit_line(line)
+            if time.perf_counter() - reported >= args.report_every:
+                print(_report(pipeline.metrics()))
+                reported = time.perf_counter()
+    print(f'done, {_report(pipeline.metrics())}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import datetime
+import json
+import os
+import threading
+import typing
+
+import database
+
+
+def _index(rows: typing.List[dict], key: str) -> typing.List[typing.Optional[dict]]:
+    # ids are small integers, so a list indexed by id is the cheapest lookup
+    table = [None] * (max((row[key] for row in rows), default=-1) + 1)
+    for row in rows:
+        table[row[key]] = row
+    return table
+
+
+def _lookup(table: typing.List[typing.Optional[dict]], key) -> typing.Optional[dict]:
+    try:
+        key = int(key)
+    except (TypeError, ValueError):
+        return None
+    if 0 <= key < len(table):
+        return table[key]
+    return None
+
+
+class ReferenceData:
+    """
+    In-memory copy of the small, static reference tables champions and queue_types. Rows are dicts
+    of column name to value, lookups by id are list accesses. Load it from the database with load()
+    (again to refresh) or from a file written by snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._champions = []
+        self._queue_types = []
+        self.loaded_at = None
+
+    def _set(self,
+             champions: typing.List[dict],
+             queue_types: typing.List[dict],
+             loaded_at: str,
+             ):
+        champion_table = _index(champions, 'championid')
+        queue_type_table = _index(queue_types, 'queueid')
+        # swapped at once so readers never see a half refreshed registry
+        with self._lock:
+            self._champions = champion_table
+            self._queue_types = queue_type_table
+            self.loaded_at = loaded_at
+
+    def load(self, conn) -> 'ReferenceData':
+        """
+        Loads both tables from the database, replaces previously loaded data.
+        :param conn:
+        :return:
+        """
+        self._set(
+            champions=[dict(row) for row in database.select_all_champions(conn=conn)],
+            queue_types=[dict(row) for row in database.select_all_queue_types(conn=conn)],
+            loaded_at=datetime.datetime.now().isoformat(),
+        )
+        return self
+
+    refresh = load
+
+    def champion(self, champion_id) -> typing.Optional[dict]:
+        return _lookup(self._champions, champion_id)
+
+    def champion_name(self, champion_id) -> typing.Optional[str]:
+        champion = _lookup(self._champions, champion_id)
+        return champion['name'] if champion else None
+
+    def queue_type(self, queue_id) -> typing.Optional[dict]:
+        return _lookup(self._queue_types, queue_id)
+
+    def champions(self) -> typing.List[dict]:
+        return [row for row in self._champions if row is not None]
+
+    def queue_types(self) -> typing.List[dict]:
+        return [row for row in self._queue_types if row is not None]
+
+    def snapshot(self, path: str):
+        """
+        Writes the loaded data to given json file, written to a temporary file first and then renamed.
+        :param path:
+        :return:
+        """
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({
+                'loaded_at': self.loaded_at,
+                'champions': self.champions(),
+                'queue_types': self.queue_types(),
+            }, f, default=str)
+        os.replace(tmp, path)
+
+    def load_snapshot(self, path: str) -> 'ReferenceData':
+        with open(path) as f:
+            snapshot = json.load(f)
+        self._set(
+            champions=snapshot['champions'],
+            queue_types=snapshot['queue_types'],
+            loaded_at=snapshot['loaded_at'],
+        )
+        return self
+
+
+registry = ReferenceData()
+
+
+def warm_start(conn=None,
+               path: str = None,
+               ) -> ReferenceData:
+    """
+    Fills the module registry from the snapshot at path if there is one, otherwise from the database
+    and writes the snapshot for the next start.
+    :param conn: used if there is no snapshot, a connection is opened if not given
+    :param path:
+    :return:
+    """
+    if path is not None and os.path.exists(path):
+        return registry.load_snapshot(path)
+    if conn is None:
+        with database.connection() as conn:
+            registry.load(conn)
+    else:
+        registry.load(conn)
+    if path is not None:
+        registry.snapshot(path)
+    return registry
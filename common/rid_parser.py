@@ -1,14 +1,18 @@
+import dataclasses
 from datetime import datetime
 import typing
-from uuid import uuid4
 
-import database
+import decoder
+import ids
 import model
+import util
 from dtos import summoner
 from dtos import match
 from dtos import matchlist
 from dtos import match_timeline
 
+_logger = util.Logger(__name__)
+
 
 def parse_summoner(summoner_dto: summoner.SummonerDto
                    ) -> model.Summoner:
@@ -105,7 +109,7 @@ def parse_timelines(match: match.MatchDto,
     timelines = []
     for participant in match.participants:
         timelines.append(model.Timeline(
-            timeline_id=str(uuid4()),
+            timeline_id=ids.timeline_id(match.platform_id, match.game_id, participant.participant_id),
             creeps_per_min_deltas=participant.timeline.cs_diff_per_min_deltas,
             xp_per_min_deltas=participant.timeline.cs_diff_per_min_deltas,
             gold_per_min_deltas=participant.timeline.cs_diff_per_min_deltas,
@@ -118,9 +122,12 @@ def parse_timelines(match: match.MatchDto,
     return timelines
 
 
-def parse_timeline(timeline_dto: match.ParticipantTimelineDto) -> model.Timeline:
+def parse_timeline(timeline_dto: match.ParticipantTimelineDto,
+                   game_id: int,
+                   platform_id: str,
+                   ) -> model.Timeline:
     return model.Timeline(
-        timeline_id=str(uuid4()),
+        timeline_id=ids.timeline_id(platform_id, game_id, timeline_dto.participant_id),
         creeps_per_min_deltas=timeline_dto.cs_diff_per_min_deltas,
         xp_per_min_deltas=timeline_dto.cs_diff_per_min_deltas,
         gold_per_min_deltas=timeline_dto.cs_diff_per_min_deltas,
@@ -131,10 +138,12 @@ def parse_timeline(timeline_dto: match.ParticipantTimelineDto) -> model.Timeline
     )
 
 
-def parse_stats(stat: match.ParticipantStatsDto
+def parse_stats(stat: match.ParticipantStatsDto,
+                game_id: int,
+                platform_id: str,
                 ) -> model.Stat:
     return (model.Stat(
-        stat_id=str(uuid4()),
+        stat_id=ids.stat_id(platform_id, game_id, stat.participant_id),
         win=stat.win,
         items=[stat.item0, stat.item1, stat.item2, stat.item3, stat.item4, stat.item5],
         kills=stat.kills,
@@ -239,7 +248,7 @@ def parse_participants(match_dto: match.MatchDto,
                 identity = participant_identity
 
         participants.append(model.Participant(
-            participant_id=str(uuid4()),
+            participant_id=ids.participant_id(match_dto.platform_id, match_dto.game_id, participant.participant_id),
             game_id=match_dto.game_id,
             account_id=identity.player.account_id,
             champion_id=participant.champion_id,
@@ -263,17 +272,11 @@ def parse_participant(
     team_id: int,
     timeline_id: str,
     role: str,
-    lane: str
+    lane: str,
+    platform_id: str,
 ) -> model.Participant:
-
-    participant = database.select_participant_from_gameid_accountid(
-        conn=database.get_connection(),
-        game_id=game_id,
-        account_id=account_id,
-    )
-
     return model.Participant(
-        participant_id=str(uuid4()) if not participant else participant.participant_id,
+        participant_id=ids.participant_id(platform_id, game_id, participant_dto.participant_id),
         game_id=game_id,
         account_id=account_id,
         champion_id=participant_dto.champion_id,
@@ -287,57 +290,125 @@ def parse_participant(
     )
 
 
+def parse_match_participants(match_dto: match.MatchDto,
+                             ) -> typing.Tuple[typing.List[model.Stat],
+                                               typing.List[model.Timeline],
+                                               typing.List[model.Participant],
+                                               typing.Dict[int, str]]:
+    """
+    Parses stats, timeline and participant of every participant of given match, ids derived from the
+    natural key of the match. Also returns the ids of the participants by their id within the match
+    (1-10), as needed to parse the match timeline.
+    :param match_dto:
+    :return: stats, timelines, participants, participant ids
+    """
+    account_ids = {
+        identity.participant_id: identity.player.account_id
+        for identity in match_dto.participant_identities
+    }
+
+    stats = []
+    timelines = []
+    participants = []
+    participant_ids = {}
+    for participant_dto in match_dto.participants:
+        stat = parse_stats(
+            stat=participant_dto.stats,
+            game_id=match_dto.game_id,
+            platform_id=match_dto.platform_id,
+        )
+        timeline = parse_timeline(
+            timeline_dto=participant_dto.timeline,
+            game_id=match_dto.game_id,
+            platform_id=match_dto.platform_id,
+        )
+        participant = parse_participant(
+            participant_dto=participant_dto,
+            game_id=match_dto.game_id,
+            account_id=account_ids[participant_dto.participant_id],
+            stat_id=stat.stat_id,
+            team_id=participant_dto.team_id,
+            timeline_id=timeline.timeline_id,
+            role=participant_dto.timeline.role,
+            lane=participant_dto.timeline.lane,
+            platform_id=match_dto.platform_id,
+        )
+        stats.append(stat)
+        timelines.append(timeline)
+        participants.append(participant)
+        participant_ids[participant_dto.participant_id] = participant.participant_id
+
+    return stats, timelines, participants, participant_ids
+
+
+# fields holding participant, stat or timeline ids per row model, see replace_ids
+_ID_FIELDS = {
+    model.Stat: ('stat_id',),
+    model.Timeline: ('timeline_id',),
+    model.Participant: ('participant_id', 'stat_id', 'timeline_id'),
+    model.ParticipantFrame: ('participant_id',),
+    model.Event: ('participant_id', 'killer_id', 'victim_id'),
+}
+
+
+def legacy_ids(participants: typing.Iterable[model.Participant],
+               stored: typing.Iterable[model.Participant],
+               ) -> typing.Dict[str, str]:
+    """
+    Maps the derived participant, stat and timeline ids of given participants to the ids the same
+    summoner already has in the stored participants of the game. Participants ingested before ids
+    were derived from natural keys have random ids, writing their match again has to reuse them.
+    Only differing ids are mapped, for matches ingested with derived ids the result is empty.
+    :param participants: parsed participants of a match
+    :param stored: participants of the match in the database
+    :return:
+    """
+    by_account = {participant.account_id: participant for participant in stored if participant.account_id is not None}
+    mapped = {}
+    for participant in participants:
+        existing = by_account.get(participant.account_id)
+        if existing is None or existing.participant_id == participant.participant_id:
+            continue
+        mapped[participant.participant_id] = existing.participant_id
+        if existing.stat_id is not None:
+            mapped[participant.stat_id] = existing.stat_id
+        if existing.timeline_id is not None:
+            mapped[participant.timeline_id] = existing.timeline_id
+    return mapped
+
+
+def replace_ids(row, mapped: typing.Mapping[str, str]):
+    """
+    Returns given stat, timeline, participant, participant frame or event with its ids replaced as
+    mapped (see legacy_ids), the row itself if none is.
+    :param row:
+    :param mapped:
+    :return:
+    """
+    changes = {
+        name: mapped[getattr(row, name)]
+        for name in _ID_FIELDS[type(row)]
+        if getattr(row, name) in mapped
+    }
+    if isinstance(row, model.Event) and any(participant_id in mapped for participant_id in row.assisting_participant_ids or ()):
+        changes['assisting_participant_ids'] = [
+            mapped.get(participant_id, participant_id) for participant_id in row.assisting_participant_ids
+        ]
+    return dataclasses.replace(row, **changes) if changes else row
+
+
 def parse_match_timeline_frames(match_timeline: match_timeline.MatchTimelineDto,
                                 mapping_participant_ids_to_match_participant_ids: typing.Mapping[int, str],
                                 ) -> (typing.List[model.ParticipantFrame], typing.List[model.Event]):
     participant_frames = []
     events = []
-    for frame in match_timeline.frames:
-        for participant_frame_dto in frame.participant_frames.values():
-            participant_frames.append(model.ParticipantFrame(
-                participant_id=mapping_participant_ids_to_match_participant_ids[participant_frame_dto.participant_id],
-                timestamp=frame.timestamp,
-                minions_killed=participant_frame_dto.minions_killed,
-                team_score=participant_frame_dto.team_score,
-                total_gold=participant_frame_dto.total_gold,
-                level=participant_frame_dto.level,
-                xp=participant_frame_dto.xp,
-                current_gold=participant_frame_dto.current_gold,
-                position=({participant_frame_dto.position.x}, {participant_frame_dto.position.y}),
-                jungle_minions_killed=participant_frame_dto.jungle_minions_killed,
-            ))
-
-        for event_dto in frame.events:
-            assisting_participant_ids = []
-            for assisting_participant_id in event_dto.assisting_participant_ids:
-                assisting_participant_ids.append(
-                    mapping_participant_ids_to_match_participant_ids[assisting_participant_id])
-
-            events.append(model.Event(
-                participant_id=mapping_participant_ids_to_match_participant_ids[event_dto.participant_id],
-                timestamp=frame.timestamp,
-                lane_type=event_dto.lane_type,
-                skill_slot=event_dto.skill_slot,
-                ascended_type=event_dto.ascended_type,
-                creator_id=event_dto.creator_id,
-                after_id=event_dto.after_id,
-                event_type=event_dto.event_type,
-                type=event_dto.type,
-                level_up_type=event_dto.level_up_type,
-                ward_type=event_dto.ward_type,
-                tower_type=event_dto.tower_type,
-                item_id=event_dto.item_id,
-                before_id=event_dto.before_id,
-                monster_type=event_dto.monster_type,
-                monster_sub_type=event_dto.monster_sub_type,
-                position=(event_dto.position.x, event_dto.item_id.y),
-                killer_id=mapping_participant_ids_to_match_participant_ids[event_dto.killer_id],
-                assisting_participant_ids=assisting_participant_ids,
-                building_type=event_dto.building_type,
-                victim_id=mapping_participant_ids_to_match_participant_ids[event_dto.victim_id],
-            ))
-
-    return participant_frames
+    for row in iter_match_timeline_rows(match_timeline, mapping_participant_ids_to_match_participant_ids):
+        if isinstance(row, model.Event):
+            events.append(row)
+        else:
+            participant_frames.append(row)
+
+    return participant_frames, events
 
 
 def parse_event(
@@ -399,3 +470,71 @@ def parse_participant_frame(participant_frame_dto: match_timeline.MatchParticipa
         position=f'{participant_frame_dto.position.x},{participant_frame_dto.position.y}' if participant_frame_dto.position else None,
         jungle_minions_killed=participant_frame_dto.jungle_minions_killed,
     )
+
+
+def _parse_frame_rows(frame: match_timeline.MatchFrameDto,
+                      participant_ids: typing.Mapping[int, str],
+                      ) -> typing.Iterator[typing.Union[model.ParticipantFrame, model.Event]]:
+    # checked once per frame, debug logging off costs one attribute lookup
+    debug = _logger.debug_enabled
+    if debug:
+        _logger.debug(
+            'frame %s: %s participant frames, %s events',
+            frame.timestamp, len(frame.participant_frames), len(frame.events),
+            rate_limit=1.0,
+        )
+    for participant_frame_dto in frame.participant_frames.values():
+        yield parse_participant_frame(
+            participant_frame_dto=participant_frame_dto,
+            participant_id=participant_ids[participant_frame_dto.participant_id],
+            timestamp=frame.timestamp,
+        )
+    for event_dto in frame.events:
+        if debug:
+            _logger.debug('event %s at %s', event_dto.type, event_dto.timestamp, sample=100)
+        yield parse_event(event_dto, participant_ids)
+
+
+def iter_match_timeline_rows(timeline_dto: match_timeline.MatchTimelineDto,
+                             participant_ids: typing.Mapping[int, str],
+                             ) -> typing.Iterator[typing.Union[model.ParticipantFrame, model.Event]]:
+    """
+    Yields the participant frames and events of given timeline frame by frame, participant_ids maps
+    the participant ids of the match (1-10) to the ids of the stored participants.
+    :param timeline_dto:
+    :param participant_ids:
+    :return:
+    """
+    for frame in timeline_dto.frames:
+        yield from _parse_frame_rows(frame, participant_ids)
+
+
+def iter_match_timeline_json_rows(timeline_json: typing.Mapping,
+                                  participant_ids: typing.Mapping[int, str],
+                                  ) -> typing.Iterator[typing.Union[model.ParticipantFrame, model.Event]]:
+    """
+    Like iter_match_timeline_rows but for riot api json, each frame is decoded only when reached.
+    :param timeline_json:
+    :param participant_ids:
+    :return:
+    """
+    decode_frame = decoder.get_decoder(match_timeline.MatchFrameDto)
+    for frame in timeline_json['frames']:
+        yield from _parse_frame_rows(decode_frame(frame), participant_ids)
+
+
+def iter_match_timeline_stream_rows(fh: typing.IO,
+                                    participant_ids: typing.Mapping[int, str],
+                                    chunk_size: int = 65536,
+                                    ) -> typing.Iterator[typing.Union[model.ParticipantFrame, model.Event]]:
+    """
+    Like iter_match_timeline_json_rows but reads the riot api json from given file-like object (a
+    file or a streamed response) while iterating, only one frame of it is held at a time.
+    :param fh:
+    :param participant_ids:
+    :param chunk_size:
+    :return:
+    """
+    decode_frame = decoder.get_decoder(match_timeline.MatchFrameDto)
+    for frame in decoder.iter_json_array(fh, 'frames', chunk_size=chunk_size):
+        yield from _parse_frame_rows(decode_frame(frame), participant_ids)
@@ -0,0 +1,524 @@
+import argparse
+import ast
+import dataclasses
+import re
+import sys
+import typing
+
+import psycopg2
+
+import database
+
+# versioned schema of the database. Migrations are applied in order by migrate() and recorded in
+# schema_migrations, a migration must never change once released, changes go into a new one.
+# Tables are created with IF NOT EXISTS so databases set up by hand before can be adopted.
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: typing.Tuple[str, ...]
+
+
+MIGRATIONS = (
+    Migration(1, 'tables', (
+        """
+        CREATE TABLE IF NOT EXISTS summoners (
+            accountid text NOT NULL,
+            summonerid text,
+            puuid text,
+            name text,
+            summonerlevel integer,
+            profileiconid integer,
+            revisiondate bigint,
+            timestamp timestamp,
+            PRIMARY KEY (accountid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS matches (
+            gameid bigint NOT NULL,
+            platformid text,
+            gamecreation bigint,
+            gameduration bigint,
+            queueid integer,
+            mapid integer,
+            seasonid integer,
+            gameversion text,
+            gamemode text,
+            gametype text,
+            PRIMARY KEY (gameid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS summoner_matches (
+            accountid text NOT NULL,
+            gameid bigint NOT NULL,
+            PRIMARY KEY (accountid, gameid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS teams (
+            teamid integer NOT NULL,
+            gameid bigint NOT NULL,
+            win text,
+            firstblood boolean,
+            firsttower boolean,
+            firstinhibitor boolean,
+            firstbaron boolean,
+            firstdragon boolean,
+            firstriftherald boolean,
+            towerkills integer,
+            inhibitorkills integer,
+            baronkills integer,
+            dragonkills integer,
+            riftheraldkills integer,
+            bans integer[],
+            PRIMARY KEY (gameid, teamid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS champions (
+            championid integer NOT NULL,
+            name text,
+            classes text[],
+            PRIMARY KEY (championid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS queue_types (
+            queueid integer NOT NULL,
+            map text,
+            description text,
+            notes text,
+            PRIMARY KEY (queueid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS timelines (
+            timelineid text NOT NULL,
+            creepspermindeltas json,
+            xppermindeltas json,
+            goldpermindeltas json,
+            csdiffpermindeltas json,
+            xpdiffpermindeltas json,
+            damagetakenpermindeltas json,
+            damagetakendiffpermindeltas json,
+            PRIMARY KEY (timelineid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats (
+            statid text NOT NULL,
+            win boolean,
+            items integer[],
+            kills integer,
+            deaths integer,
+            assists integer,
+            largestkillingspree integer,
+            largestmultikill integer,
+            killingsprees integer,
+            longesttimespentliving integer,
+            doublekills integer,
+            triplekills integer,
+            quadrakills integer,
+            pentakills integer,
+            totaldamagedealt integer,
+            magicdamagedealt integer,
+            physicaldamagedealt integer,
+            truedamagedealt integer,
+            largestcriticalstrike integer,
+            totaldamagedealttochampions integer,
+            magicdamagedealttochampions integer,
+            physicaldamagedealttochampions integer,
+            truedamagedealttochampions integer,
+            totalheal integer,
+            totalunitshealed integer,
+            damageselfmitigated integer,
+            damagedealttoobjectives integer,
+            damagedealttoturrets integer,
+            visionscore integer,
+            timeccingothers integer,
+            totaldamagetaken integer,
+            magicaldamagetaken integer,
+            physicaldamagetaken integer,
+            truedamagetaken integer,
+            goldearned integer,
+            goldspent integer,
+            turretkills integer,
+            inhibitorkills integer,
+            totalminionskilled integer,
+            neutralminionskilledteamjungle integer,
+            neutralminionskilledenemyjungle integer,
+            totaltimecrowdcontroldealt integer,
+            champlevel integer,
+            visionwardsboughtingame integer,
+            sightwardsboughtingame integer,
+            wardsplaced integer,
+            wardskilled integer,
+            firstbloodkill boolean,
+            firstbloodassist boolean,
+            firsttowerkill boolean,
+            firsttowerassist boolean,
+            firstinhibitorkill boolean,
+            firstinhibitorassist boolean,
+            combatplayerscore integer,
+            objectiveplayerscore integer,
+            totalplayerscore integer,
+            totalscorerank integer,
+            perk0 integer,
+            perk0var1 integer,
+            perk0var2 integer,
+            perk0var3 integer,
+            perk1 integer,
+            perk1var1 integer,
+            perk1var2 integer,
+            perk1var3 integer,
+            perk2 integer,
+            perk2var1 integer,
+            perk2var2 integer,
+            perk2var3 integer,
+            perk3 integer,
+            perk3var1 integer,
+            perk3var2 integer,
+            perk3var3 integer,
+            perk4 integer,
+            perk4var1 integer,
+            perk4var2 integer,
+            perk4var3 integer,
+            perk5 integer,
+            perk5var1 integer,
+            perk5var2 integer,
+            perk5var3 integer,
+            perkprimarystyle integer,
+            perksubstyle integer,
+            statperk0 integer,
+            statperk1 integer,
+            statperk2 integer,
+            PRIMARY KEY (statid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS participants (
+            participantid text NOT NULL,
+            gameid bigint,
+            accountid text,
+            championid integer,
+            statid text,
+            teamid integer,
+            timelineid text,
+            spell1id integer,
+            spell2id integer,
+            role text,
+            lane text,
+            PRIMARY KEY (participantid)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS participant_frame (
+            participantid text NOT NULL,
+            timestamp bigint NOT NULL,
+            minionskilled integer,
+            teamscore integer,
+            totalgold integer,
+            level integer,
+            xp integer,
+            currentgold integer,
+            position text,
+            jungleminionskilled integer,
+            PRIMARY KEY (participantid, timestamp)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            participantid text,
+            timestamp bigint,
+            lanetype text,
+            skillslot integer,
+            ascendedtype text,
+            creatorid integer,
+            afterid integer,
+            eventtype text,
+            type text,
+            leveluptype text,
+            wardtype text,
+            towertype text,
+            itemid integer,
+            beforeid integer,
+            monstertype text,
+            monstersubtype text,
+            teamid integer,
+            position text,
+            killerid text,
+            assistingparticipantids text[],
+            buildingtype text,
+            victimid text
+        )
+        """,
+    )),
+    # participant_frame (participantid, timestamp) and summoner_matches (accountid, ...) are
+    # covered by their primary keys
+    Migration(2, 'indexes', (
+        "CREATE INDEX IF NOT EXISTS participants_gameid_accountid_idx ON participants (gameid, accountid)",
+        "CREATE INDEX IF NOT EXISTS participants_accountid_idx ON participants (accountid)",
+        "CREATE INDEX IF NOT EXISTS participants_statid_idx ON participants (statid)",
+        "CREATE INDEX IF NOT EXISTS summoner_matches_gameid_idx ON summoner_matches (gameid)",
+        "CREATE INDEX IF NOT EXISTS events_participantid_type_idx ON events (participantid, type)",
+        "CREATE INDEX IF NOT EXISTS events_assistingparticipantids_idx ON events "
+        "USING GIN (assistingparticipantids)",
+        "CREATE INDEX IF NOT EXISTS summoners_name_idx ON summoners (name)",
+    )),
+    Migration(3, 'duo_games', (
+        """
+        CREATE TABLE IF NOT EXISTS duo_games (
+            accountid1 text NOT NULL,
+            accountid2 text NOT NULL,
+            gameid bigint NOT NULL,
+            teamid bigint,
+            win text,
+            participantid1 text,
+            participantid2 text,
+            statid1 text,
+            statid2 text,
+            role1 text,
+            role2 text,
+            lane1 text,
+            lane2 text,
+            championid1 bigint,
+            championid2 bigint,
+            kills1 bigint,
+            kills2 bigint,
+            deaths1 bigint,
+            deaths2 bigint,
+            assists1 bigint,
+            assists2 bigint,
+            totalminionskilled1 bigint,
+            totalminionskilled2 bigint,
+            PRIMARY KEY (accountid1, accountid2, gameid)
+        )
+        """,
+    )),
+)
+
+# held while migrating so concurrently starting workers do not migrate twice
+_LOCK_ID = 1796234051
+
+
+def _create_migrations_table(cur):
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version integer NOT NULL PRIMARY KEY, "
+        "name text NOT NULL, "
+        "appliedat timestamp NOT NULL DEFAULT now())"
+    )
+
+
+def current_version(conn) -> int:
+    """
+    Returns the version of the newest applied migration, 0 if none was applied.
+    :param conn:
+    :return:
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cur.fetchone()[0]
+
+
+def migrate(conn, target: int = None) -> typing.List[int]:
+    """
+    Applies all migrations newer than the current version up to target (the newest if None) in one
+    transaction, on error nothing is applied and the error is raised.
+    :param conn:
+    :param target:
+    :return: versions of the applied migrations
+    """
+    applied = []
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_ID,))
+        _create_migrations_table(cur)
+        version = current_version(conn)
+        for migration in MIGRATIONS:
+            if migration.version <= version or (target is not None and migration.version > target):
+                continue
+            for statement in migration.statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (migration.version, migration.name),
+            )
+            applied.append(migration.version)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return applied
+
+
+# query plan check
+#####################################################################################################
+
+# tables growing with every ingested match, a full scan of these is a missing index
+LARGE_TABLES = frozenset((
+    'summoners', 'matches', 'summoner_matches', 'teams', 'timelines', 'stats', 'participants',
+    'participant_frame', 'events', 'duo_games',
+))
+
+# functions reading whole tables on purpose
+ALLOWED_SEQ_SCANS = frozenset((
+    'select_all_participants',
+    'select_all_games',
+    'select_all_summoners',
+))
+
+_PLACEHOLDER = re.compile(r'%\((\w+)\)s|%s|%%')
+
+
+@dataclasses.dataclass(frozen=True)
+class PlanFinding:
+    function: str
+    statement: str
+    full_scans: typing.Tuple[str, ...]
+    error: typing.Optional[str] = None
+
+
+def collect_statements(module=database) -> typing.Dict[str, str]:
+    """
+    Returns the select statements of given module by function name: every string (or module
+    constant) assigned to a variable named statement inside a top level function. Statements built at
+    runtime (f-strings, function calls) are not collected.
+    :param module:
+    :return:
+    """
+    with open(module.__file__) as f:
+        tree = ast.parse(f.read())
+
+    statements = {}
+    for function in tree.body:
+        if not isinstance(function, ast.FunctionDef):
+            continue
+        for node in ast.walk(function):
+            if not (isinstance(node, ast.Assign)
+                    and any(isinstance(target, ast.Name) and target.id == 'statement' for target in node.targets)):
+                continue
+            if isinstance(node.value, ast.Constant):
+                statement = node.value.value
+            elif isinstance(node.value, ast.Name):
+                statement = getattr(module, node.value.id, None)
+            else:
+                continue
+            if isinstance(statement, str) and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                statements[function.name] = statement
+    return statements
+
+
+def _numbered(statement: str) -> typing.Tuple[str, int]:
+    # %s and %(name)s placeholders to $1, $2, ..., returns the statement and the parameter count
+    names = {}
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) == '%%':
+            return '%'
+        name = match.group(1)
+        if name is not None and name in names:
+            return f'${names[name]}'
+        count += 1
+        if name is not None:
+            names[name] = count
+        return f'${count}'
+
+    return _PLACEHOLDER.sub(replace, statement), count
+
+
+def _full_scans(plan: dict) -> typing.Iterator[str]:
+    # with sequential scans disabled the planner falls back to reading a whole index instead, an
+    # index scan without index condition
+    node_type = plan.get('Node Type')
+    if node_type == 'Seq Scan' or (node_type in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in plan):
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from _full_scans(child)
+
+
+def check_plans(conn,
+                statements: typing.Dict[str, str] = None,
+                large_tables: typing.AbstractSet[str] = LARGE_TABLES,
+                allowed: typing.AbstractSet[str] = ALLOWED_SEQ_SCANS,
+                ) -> typing.List[PlanFinding]:
+    """
+    Explains every statement (all of database by default) as generic plan, the plan used for
+    prepared statements independent of the parameter values, with sequential scans disabled, so the
+    result does not depend on the (local, mostly empty) table contents. Returns a finding for every
+    statement still reading a whole large table, which means no index fits, and for every statement
+    failing to plan. Nothing is written, the transaction is rolled back.
+    :param conn:
+    :param statements: by function name
+    :param large_tables:
+    :param allowed: function names whose full scans are intended
+    :return:
+    """
+    if statements is None:
+        statements = collect_statements()
+
+    findings = []
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        cur.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        for index, (function, statement) in enumerate(sorted(statements.items())):
+            name = f'plan_check_{index}'
+            numbered, parameters = _numbered(statement)
+            arguments = f'({", ".join(["NULL"] * parameters)})' if parameters else ''
+            cur.execute("SAVEPOINT plan_check")
+            try:
+                cur.execute(f"PREPARE {name} AS {numbered}")
+                try:
+                    cur.execute(f"EXPLAIN (FORMAT JSON) EXECUTE {name}{arguments}")
+                    plan = cur.fetchone()[0][0]['Plan']
+                finally:
+                    cur.execute(f"DEALLOCATE {name}")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT plan_check")
+                findings.append(PlanFinding(function, statement, (), str(e).strip()))
+                continue
+            full_scans = tuple(sorted(set(_full_scans(plan)) & set(large_tables)))
+            if full_scans and function not in allowed:
+                findings.append(PlanFinding(function, statement, full_scans))
+    finally:
+        conn.rollback()
+    return findings
+
+
+def main(argv: typing.Sequence[str] = None):
+    parser = argparse.ArgumentParser(description='manages the database schema')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help='prints the current and the newest version')
+    migrate_parser = commands.add_parser('migrate', help='applies pending migrations')
+    migrate_parser.add_argument('--target', type=int, default=None)
+    commands.add_parser('check', help='flags statements of database scanning whole large tables')
+    args = parser.parse_args(argv)
+
+    with database.connection() as conn:
+        if args.command == 'status':
+            print(f'version {current_version(conn)}, newest {MIGRATIONS[-1].version}')
+        elif args.command == 'migrate':
+            applied = migrate(conn, target=args.target)
+            print(f'applied {applied}' if applied else 'up to date')
+        else:
+            findings = check_plans(conn)
+            for finding in findings:
+                problem = finding.error or f'full scan of {", ".join(finding.full_scans)}'
+                print(f'{finding.function}: {problem}')
+            if findings:
+                sys.exit(1)
+            print('no full scans of large tables')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,652 @@
+import argparse
+import base64
+import dataclasses
+import hashlib
+import json
+import random
+import sys
+import typing
+
+import decoder
+from dtos import match
+from dtos import match_timeline
+from dtos import matchlist
+from dtos import summoner
+
+# seeded generator of riot api data for load tests. Every game is derived from (seed, game index)
+# only, so any game can be generated on its own, in any order and in parallel, and generating it
+# again gives the same dtos. Players are drawn from one summoner population, a part of the games
+# contains one of a fixed set of duo pairs, so summoners and duos recur across games. Raw json is
+# written by python synthetic.py --count N > games.jsonl.
+
+PLATFORM_ID = 'EUW1'
+GAME_VERSION = '10.19.336.6025'
+QUEUE_ID = 420
+SEASON_ID = 13
+MAP_ID = 11
+
+TEAMS = (100, 200)
+# (lane, role) of the five participants of a team
+POSITIONS = (('TOP', 'SOLO'), ('JUNGLE', 'NONE'), ('MIDDLE', 'SOLO'), ('BOTTOM', 'DUO_CARRY'), ('BOTTOM', 'DUO_SUPPORT'))
+CHAMPION_IDS = tuple(range(1, 151))
+ITEM_IDS = (1001, 1036, 1037, 1038, 1052, 1055, 1056, 2003, 2055, 3006, 3020, 3031, 3047, 3071, 3078, 3089,
+            3111, 3153, 3157, 3340, 3363, 3364)
+SPELL_IDS = (4, 14, 12, 11, 7, 3, 21)
+DRAGONS = ('FIRE_DRAGON', 'WATER_DRAGON', 'EARTH_DRAGON', 'AIR_DRAGON')
+LANES = ('TOP_LANE', 'MID_LANE', 'BOT_LANE')
+TOWERS = ('OUTER_TURRET', 'INNER_TURRET', 'BASE_TURRET')
+_DELTAS = ('0-10', '10-20', '20-30', '30-end')
+# events only carry the fields of their type
+_EMPTY_EVENT = dict.fromkeys((field.name for field in dataclasses.fields(match_timeline.MatchEventDto)))
+
+
+def _token(*parts) -> str:
+    # riot like opaque id, stable for given parts
+    digest = hashlib.blake2b(':'.join(map(str, parts)).encode(), digest_size=24).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def _position(rng: random.Random) -> match_timeline.MatchPositionDto:
+    return match_timeline.MatchPositionDto(x=int(rng.random() * 14870), y=int(rng.random() * 14980))
+
+
+def _deltas(history: typing.List[float], frames: int) -> typing.Dict[str, float]:
+    # per minute rates of a cumulative per frame history over the usual delta intervals
+    deltas = {}
+    for index, key in enumerate(_DELTAS):
+        start = index * 10
+        end = frames - 1 if index == len(_DELTAS) - 1 else min(start + 10, frames - 1)
+        if end <= start:
+            break
+        deltas[key] = round((history[end] - history[start]) / (end - start), 2)
+    return deltas
+
+
+_hints = {}
+
+
+def _fill(cls, rng: random.Random, values: dict):
+    # fields not given are numbers of a plausible magnitude, False or None
+    hints = _hints.get(cls)
+    if hints is None:
+        hints = _hints[cls] = typing.get_type_hints(cls)
+    for name, tp in hints.items():
+        if name not in values:
+            values[name] = int(rng.random() * 2000) if tp is int else False if tp is bool else None
+    return cls(**values)
+
+
+class _Player:
+    # running state of one participant while a game is simulated
+
+    def __init__(self, participant_id: int, team_id: int, lane: str, role: str):
+        self.participant_id = participant_id
+        self.team_id = team_id
+        self.lane = lane
+        self.role = role
+        self.gold = 500
+        self.total_gold = 500
+        self.xp = 0
+        self.level = 1
+        self.minions = 0
+        self.jungle_minions = 0
+        self.kills = 0
+        self.deaths = 0
+        self.assists = 0
+        self.wards_placed = 0
+        self.wards_killed = 0
+        self.turret_kills = 0
+        self.inhibitor_kills = 0
+        self.items = []
+        self.first_blood_kill = False
+        self.first_blood_assist = False
+        self.first_tower_kill = False
+        self.first_tower_assist = False
+        self.largest_killing_spree = 0
+        self.spree = 0
+        self.history = {'minions': [], 'xp': [], 'gold': []}
+
+
+class Generator:
+    """
+    Deterministic source of synthetic games. Game i has the id first_game_id + i; its ten players
+    are drawn from a population of summoners indices 0 <= index < summoners. duo_share of the
+    games contain one of duo_pairs pairs (summoners 2k and 2k + 1) in the same team.
+    """
+
+    def __init__(self,
+                 seed: int = 0,
+                 summoners: int = 10000,
+                 duo_pairs: int = 100,
+                 duo_share: float = 0.3,
+                 first_game_id: int = 4000000000,
+                 first_game_creation: int = 1600000000000,
+                 platform_id: str = PLATFORM_ID,
+                 ):
+        if summoners < 10 or 2 * duo_pairs > summoners:
+            raise ValueError('a population needs at least 10 summoners and room for the duo pairs')
+        self.seed = seed
+        self.summoners = summoners
+        self.duo_pairs = duo_pairs
+        self.duo_share = duo_share
+        self.first_game_id = first_game_id
+        self.first_game_creation = first_game_creation
+        self.platform_id = platform_id
+
+    # summoners
+    #################################################################################################
+
+    def account_id(self, index: int) -> str:
+        return _token(self.seed, 'account', index)
+
+    def summoner_name(self, index: int) -> str:
+        return f'Summoner{index}'
+
+    def summoner_dto(self, index: int) -> summoner.SummonerDto:
+        rng = random.Random(f'{self.seed}:summoner:{index}')
+        return summoner.SummonerDto(
+            account_id=self.account_id(index),
+            profile_icon_id=rng.randint(0, 4500),
+            revision_date=self.first_game_creation + rng.randint(0, 10 ** 9),
+            name=self.summoner_name(index),
+            id=_token(self.seed, 'summoner', index),
+            puuid=_token(self.seed, 'puuid', index) + _token(self.seed, 'puuid2', index),
+            summoner_level=rng.randint(30, 500),
+        )
+
+    def players(self, game: int) -> typing.List[int]:
+        """
+        Returns the summoner indices of the ten participants of given game, participant i + 1 is
+        players[i]; the first five play for team 100.
+        :param game:
+        :return:
+        """
+        rng = random.Random(f'{self.seed}:players:{game}')
+        players = [None] * 10
+        if self.duo_pairs and rng.random() < self.duo_share:
+            # one duo pair at two random positions of one team
+            pair = rng.randrange(self.duo_pairs)
+            team = rng.choice((0, 5))
+            first, second = rng.sample(range(5), 2)
+            players[team + first], players[team + second] = 2 * pair, 2 * pair + 1
+        chosen = set(player for player in players if player is not None)
+        for slot in range(10):
+            while players[slot] is None:
+                player = rng.randrange(self.summoners)
+                if player not in chosen:
+                    chosen.add(player)
+                    players[slot] = player
+        return players
+
+    def game_id(self, game: int) -> int:
+        return self.first_game_id + game
+
+    # games
+    #################################################################################################
+
+    def match_dto(self, game: int) -> match.MatchDto:
+        return self.game(game)[0]
+
+    def timeline_dto(self, game: int) -> match_timeline.MatchTimelineDto:
+        return self.game(game)[1]
+
+    def games(self, count: int, start: int = 0) -> typing.Iterator[
+            typing.Tuple[match.MatchDto, match_timeline.MatchTimelineDto]]:
+        for game in range(start, start + count):
+            yield self.game(game)
+
+    def matchlist_dto(self, index: int, games: typing.Iterable[int]) -> matchlist.MatchlistDto:
+        """
+        Returns the matchlist of summoner index over the given game indices, newest game first.
+        Only the players of every game are drawn, the games themselves are not generated.
+        :param index:
+        :param games:
+        :return:
+        """
+        references = []
+        for game in games:
+            players = self.players(game)
+            if index not in players:
+                continue
+            participant = players.index(index)
+            lane, role = POSITIONS[participant % 5]
+            rng = random.Random(f'{self.seed}:game:{game}')
+            references.append(matchlist.MatchReferenceDto(
+                game_id=self.game_id(game),
+                role=role,
+                season=SEASON_ID,
+                platform_id=self.platform_id,
+                champion=self._champions(rng)[participant],
+                queue=QUEUE_ID,
+                lane=lane,
+                timestamp=self._game_creation(game),
+            ))
+        references.reverse()
+        return matchlist.MatchlistDto(
+            start_index=0,
+            total_games=len(references),
+            end_index=len(references),
+            matches=references,
+        )
+
+    def _game_creation(self, game: int) -> int:
+        return self.first_game_creation + game * 90000
+
+    @staticmethod
+    def _champions(rng: random.Random) -> typing.List[int]:
+        # first draw of the game rng, so matchlists agree with the generated game: ten picks, ten bans
+        return rng.sample(CHAMPION_IDS, 20)
+
+    def game(self, game: int) -> typing.Tuple[match.MatchDto, match_timeline.MatchTimelineDto]:
+        """
+        Simulates given game minute by minute and returns the match and its timeline, the match
+        stats are the totals of the timeline.
+        :param game:
+        :return:
+        """
+        rng = random.Random(f'{self.seed}:game:{game}')
+        champions = self._champions(rng)
+        players = [
+            _Player(participant_id, TEAMS[(participant_id - 1) // 5], *POSITIONS[(participant_id - 1) % 5])
+            for participant_id in range(1, 11)
+        ]
+        duration = rng.randint(20 * 60, 40 * 60)
+        winner = rng.choice(TEAMS)
+        frames, teams = self._simulate(rng, players, duration, winner)
+        timeline = match_timeline.MatchTimelineDto(frames=frames, frame_interval=60000)
+
+        summoner_indices = self.players(game)
+        participants = [
+            self._participant(rng, player, champions[player.participant_id - 1], winner, len(frames), duration)
+            for player in players
+        ]
+        identities = [
+            match.ParticipantIdentityDto(
+                participant_id=player.participant_id,
+                player=self._player(rng, summoner_indices[player.participant_id - 1]),
+            )
+            for player in players
+        ]
+        team_stats = [
+            match.TeamStatsDto(
+                tower_kills=teams[team_id]['towers'],
+                rift_herald_kills=teams[team_id]['heralds'],
+                first_blood=teams[team_id]['first_blood'],
+                inhibitor_kills=teams[team_id]['inhibitors'],
+                bans=[match.TeamBansDto(champion_id=champion_id, pick_turn=turn + 1)
+                      for turn, champion_id in enumerate(champions[10:15] if team_id == 100 else champions[15:20])],
+                first_baron=teams[team_id]['first_baron'],
+                first_dragon=teams[team_id]['first_dragon'],
+                dominion_victory_score=0,
+                dragon_kills=teams[team_id]['dragons'],
+                baron_kills=teams[team_id]['barons'],
+                first_inhibitor=teams[team_id]['first_inhibitor'],
+                first_tower=teams[team_id]['first_tower'],
+                vilemaw_kills=0,
+                first_rift_herald=teams[team_id]['first_herald'],
+                team_id=team_id,
+                win='Win' if team_id == winner else 'Fail',
+            )
+            for team_id in TEAMS
+        ]
+        match_dto = match.MatchDto(
+            game_id=self.game_id(game),
+            participant_identities=identities,
+            queue_id=QUEUE_ID,
+            game_type='MATCHED_GAME',
+            game_duration=duration,
+            teams=team_stats,
+            platform_id=self.platform_id,
+            game_creation=self._game_creation(game),
+            season_id=SEASON_ID,
+            game_version=GAME_VERSION,
+            map_id=MAP_ID,
+            game_mode='CLASSIC',
+            participants=participants,
+        )
+        return match_dto, timeline
+
+    def _player(self, rng: random.Random, index: int) -> match.PlayerDto:
+        account_id = self.account_id(index)
+        return match.PlayerDto(
+            profile_icon=rng.randint(0, 4500),
+            account_id=account_id,
+            match_history_uri=f'/v1/stats/player_history/{self.platform_id}/{account_id}',
+            current_account_id=account_id,
+            current_platform_id=self.platform_id,
+            summoner_name=self.summoner_name(index),
+            summoner_id=_token(self.seed, 'summoner', index),
+            platform_id=self.platform_id,
+        )
+
+    def _simulate(self,
+                  rng: random.Random,
+                  players: typing.List[_Player],
+                  duration: int,
+                  winner: int,
+                  ) -> typing.Tuple[typing.List[match_timeline.MatchFrameDto], dict]:
+        teams = {
+            team_id: {'towers': 0, 'inhibitors': 0, 'dragons': 0, 'barons': 0, 'heralds': 0, 'first_blood': False,
+                      'first_tower': False, 'first_inhibitor': False, 'first_dragon': False, 'first_baron': False,
+                      'first_herald': False}
+            for team_id in TEAMS
+        }
+        by_team = {team_id: [player for player in players if player.team_id == team_id] for team_id in TEAMS}
+        firsts = set()
+        frames = []
+        minutes = duration // 60 + 1
+
+        def first(team_id: int, key: str) -> bool:
+            if key in firsts:
+                return False
+            firsts.add(key)
+            teams[team_id][key] = True
+            return True
+
+        for minute in range(minutes + 1):
+            timestamp = min(minute * 60000, duration * 1000)
+            start = max(0, timestamp - 60000)
+            events = []
+
+            def event(event_type: str, **values) -> match_timeline.MatchEventDto:
+                values.setdefault('timestamp', rng.randint(start, max(start, timestamp - 1)))
+                values.setdefault('assisting_participant_ids', [])
+                return match_timeline.MatchEventDto(**dict(_EMPTY_EVENT, type=event_type, **values))
+
+            for player in players if minute else ():
+                self._farm(rng, player, minute)
+                if rng.random() < 0.35:
+                    item_id = rng.choice(ITEM_IDS)
+                    player.items.append(item_id)
+                    events.append(event('ITEM_PURCHASED', participant_id=player.participant_id, item_id=item_id))
+                level = min(18, 1 + int((player.xp / 280) ** 0.72))
+                while player.level < level:
+                    player.level += 1
+                    events.append(event('SKILL_LEVEL_UP', participant_id=player.participant_id,
+                                        skill_slot=rng.randint(1, 4), level_up_type='NORMAL'))
+                if rng.random() < (0.45 if player.role == 'DUO_SUPPORT' else 0.2):
+                    player.wards_placed += 1
+                    events.append(event('WARD_PLACED', creator_id=player.participant_id,
+                                        ward_type=rng.choice(('YELLOW_TRINKET', 'CONTROL_WARD', 'SIGHT_WARD'))))
+                if rng.random() < 0.05:
+                    player.wards_killed += 1
+                    events.append(event('WARD_KILL', killer_id=player.participant_id, ward_type='YELLOW_TRINKET'))
+
+            for _ in range(self._kills(rng, minute) if minute >= 2 else 0):
+                team_id = winner if rng.random() < 0.58 else TEAMS[winner == TEAMS[0]]
+                killer = rng.choice(by_team[team_id])
+                victim = rng.choice(by_team[TEAMS[team_id == TEAMS[0]]])
+                assistants = rng.sample([player for player in by_team[team_id] if player is not killer],
+                                        rng.randint(0, 3))
+                killer.kills += 1
+                killer.spree += 1
+                killer.largest_killing_spree = max(killer.largest_killing_spree, killer.spree)
+                killer.gold += 300
+                killer.total_gold += 300
+                victim.deaths += 1
+                victim.spree = 0
+                for assistant in assistants:
+                    assistant.assists += 1
+                    assistant.gold += 150
+                    assistant.total_gold += 150
+                if first(team_id, 'first_blood'):
+                    killer.first_blood_kill = True
+                    for assistant in assistants:
+                        assistant.first_blood_assist = True
+                events.append(event(
+                    'CHAMPION_KILL',
+                    killer_id=killer.participant_id,
+                    victim_id=victim.participant_id,
+                    assisting_participant_ids=[assistant.participant_id for assistant in assistants],
+                    position=_position(rng),
+                ))
+
+            if minute >= 10 and rng.random() < 0.5:
+                team_id = winner if rng.random() < 0.7 else TEAMS[winner == TEAMS[0]]
+                killer = rng.choice(by_team[team_id])
+                inhibitor = teams[team_id]['towers'] >= 6 and teams[team_id]['inhibitors'] < 3 and rng.random() < 0.3
+                tower = not inhibitor and teams[team_id]['towers'] < 11
+                if inhibitor:
+                    teams[team_id]['inhibitors'] += 1
+                    killer.inhibitor_kills += 1
+                    first(team_id, 'first_inhibitor')
+                elif tower:
+                    teams[team_id]['towers'] += 1
+                    killer.turret_kills += 1
+                    if first(team_id, 'first_tower'):
+                        killer.first_tower_kill = True
+                if inhibitor or tower:
+                    events.append(event(
+                        'BUILDING_KILL',
+                        killer_id=killer.participant_id,
+                        team_id=TEAMS[team_id == TEAMS[0]],
+                        building_type='INHIBITOR_BUILDING' if inhibitor else 'TOWER_BUILDING',
+                        lane_type=rng.choice(LANES),
+                        tower_type=None if inhibitor else TOWERS[min(2, teams[team_id]['towers'] // 4)],
+                        position=_position(rng),
+                    ))
+
+            monster = self._monster(rng, minute)
+            if monster is not None:
+                monster_type, sub_type, key, first_key = monster
+                team_id = winner if rng.random() < 0.6 else TEAMS[winner == TEAMS[0]]
+                jungler = by_team[team_id][1]
+                teams[team_id][key] += 1
+                first(team_id, first_key)
+                events.append(event(
+                    'ELITE_MONSTER_KILL',
+                    killer_id=jungler.participant_id,
+                    monster_type=monster_type,
+                    monster_sub_type=sub_type if sub_type is None else rng.choice(DRAGONS),
+                    position=_position(rng),
+                ))
+
+            events.sort(key=lambda e: e.timestamp)
+            participant_frames = {}
+            for player in players:
+                player.history['minions'].append(player.minions + player.jungle_minions)
+                player.history['xp'].append(player.xp)
+                player.history['gold'].append(player.total_gold)
+                participant_frames[str(player.participant_id)] = match_timeline.MatchParticipantFrameDto(
+                    participant_id=player.participant_id,
+                    minions_killed=player.minions,
+                    team_score=0,
+                    dominion_score=0,
+                    total_gold=player.total_gold,
+                    level=player.level,
+                    xp=player.xp,
+                    current_gold=player.gold,
+                    position=_position(rng) if minute else match_timeline.MatchPositionDto(
+                        x=560 if player.team_id == 100 else 14340,
+                        y=560 if player.team_id == 100 else 14390,
+                    ),
+                    jungle_minions_killed=player.jungle_minions,
+                )
+            frames.append(match_timeline.MatchFrameDto(
+                participant_frames=participant_frames,
+                events=events,
+                timestamp=timestamp,
+            ))
+            if timestamp >= duration * 1000:
+                break
+        return frames, teams
+
+    @staticmethod
+    def _farm(rng: random.Random, player: _Player, minute: int):
+        if player.role == 'NONE':
+            player.jungle_minions += rng.randint(3, 6)
+            player.minions += rng.randint(0, 2)
+        elif player.role == 'DUO_SUPPORT':
+            player.minions += rng.randint(0, 2)
+        elif minute > 1:
+            player.minions += rng.randint(5, 9)
+        income = rng.randint(280, 420)
+        player.gold += income
+        player.total_gold += income
+        player.xp += rng.randint(300, 520) if player.role != 'DUO_SUPPORT' else rng.randint(220, 380)
+        # purchases
+        player.gold = max(0, player.gold - rng.randint(0, player.gold))
+
+    @staticmethod
+    def _kills(rng: random.Random, minute: int) -> int:
+        # about one kill a minute, more late
+        rate = 0.7 if minute < 15 else 1.2
+        kills = 0
+        while rng.random() < rate / (kills + 1):
+            kills += 1
+        return kills
+
+    @staticmethod
+    def _monster(rng: random.Random, minute: int) -> typing.Optional[tuple]:
+        if minute >= 5 and minute % 5 == 0 and rng.random() < 0.8:
+            return 'DRAGON', 'DRAGON', 'dragons', 'first_dragon'
+        if 8 <= minute < 20 and minute % 6 == 2 and rng.random() < 0.7:
+            return 'RIFTHERALD', None, 'heralds', 'first_herald'
+        if minute >= 20 and minute % 7 == 6 and rng.random() < 0.5:
+            return 'BARON_NASHOR', None, 'barons', 'first_baron'
+        return None
+
+    def _participant(self,
+                     rng: random.Random,
+                     player: _Player,
+                     champion_id: int,
+                     winner: int,
+                     frames: int,
+                     duration: int,
+                     ) -> match.ParticipantDto:
+        minutes = duration / 60
+        items = (player.items[-6:] + [0] * 6)[:6]
+        damage = int((player.kills * 1800 + player.assists * 700 + minutes * 450) * rng.uniform(0.8, 1.2))
+        stats = {
+            'participant_id': player.participant_id,
+            'win': player.team_id == winner,
+            'kills': player.kills,
+            'deaths': player.deaths,
+            'assists': player.assists,
+            'largest_killing_spree': player.largest_killing_spree,
+            'largest_multi_kill': 1 + (player.kills >= 4) + (player.kills >= 9),
+            'killing_sprees': player.kills // 3,
+            'double_kills': player.kills // 4,
+            'triple_kills': player.kills // 9,
+            'quadra_kills': 0,
+            'penta_kills': 0,
+            'unreal_kills': 0,
+            'gold_earned': player.total_gold,
+            'gold_spent': player.total_gold - player.gold,
+            'total_minions_killed': player.minions,
+            'neutral_minions_killed': player.jungle_minions,
+            'neutral_minions_killed_team_jungle': int(player.jungle_minions * 0.8),
+            'neutral_minions_killed_enemy_jungle': player.jungle_minions - int(player.jungle_minions * 0.8),
+            'champ_level': player.level,
+            'wards_placed': player.wards_placed,
+            'wards_killed': player.wards_killed,
+            'vision_score': player.wards_placed * 2 + player.wards_killed,
+            'turret_kills': player.turret_kills,
+            'inhibitor_kills': player.inhibitor_kills,
+            'first_blood_kill': player.first_blood_kill,
+            'first_blood_assist': player.first_blood_assist,
+            'first_tower_kill': player.first_tower_kill,
+            'first_tower_assist': player.first_tower_assist,
+            'first_inhibitor_kill': False,
+            'first_inhibitor_assist': False,
+            'total_damage_dealt_to_champions': damage,
+            'physical_damage_dealt_to_champions': damage // 2,
+            'magic_damage_dealt_to_champions': damage // 3,
+            'true_damage_dealt_to_champions': damage - damage // 2 - damage // 3,
+            'total_damage_dealt': damage * 6,
+            'longest_time_spent_living': int(duration / (player.deaths + 1)),
+            'item0': items[0], 'item1': items[1], 'item2': items[2], 'item3': items[3], 'item4': items[4],
+            'item5': items[5], 'item6': 3340,
+        }
+        lane, role = player.lane, player.role
+        return match.ParticipantDto(
+            participant_id=player.participant_id,
+            champion_id=champion_id,
+            runes=[],
+            stats=_fill(match.ParticipantStatsDto, rng, stats),
+            team_id=player.team_id,
+            timeline=match.ParticipantTimelineDto(
+                participant_id=player.participant_id,
+                cs_diff_per_min_deltas=_deltas([rng.uniform(-5, 5) * index for index in range(frames)], frames),
+                damage_taken_per_min_deltas=_deltas([rng.uniform(300, 700) * index for index in range(frames)],
+                                                    frames),
+                role=role,
+                damage_taken_diff_per_min_deltas=_deltas([rng.uniform(-100, 100) * index
+                                                          for index in range(frames)], frames),
+                xp_per_min_deltas=_deltas(player.history['xp'], frames),
+                xp_diff_per_min_deltas=_deltas([rng.uniform(-60, 60) * index for index in range(frames)], frames),
+                lane=lane,
+                creeps_per_min_deltas=_deltas(player.history['minions'], frames),
+                gold_per_min_deltas=_deltas(player.history['gold'], frames),
+            ),
+            spell1_id=4,
+            spell2_id=rng.choice(SPELL_IDS[1:]),
+            highest_achieved_season_tier=rng.choice(('UNRANKED', 'SILVER', 'GOLD', 'PLATINUM', 'DIAMOND')),
+            masteries=[],
+        )
+
+
+# raw json
+#####################################################################################################
+
+
+def to_json(value):
+    """
+    Turns a dto (or list or mapping of dtos) into the parsed json riot's api would return for it,
+    the inverse of decoder.decode.
+    :param value:
+    :return:
+    """
+    if dataclasses.is_dataclass(value):
+        keys = _keys(type(value))
+        return {keys[name]: to_json(item) for name, item in value.__dict__.items()}
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    return value
+
+
+_field_maps = {}
+
+
+def _keys(cls) -> typing.Dict[str, str]:
+    keys = _field_maps.get(cls)
+    if keys is None:
+        keys = _field_maps[cls] = decoder.field_map(cls)
+    return keys
+
+
+def dumps(value) -> str:
+    """
+    Returns the riot api json of given dto as str.
+    :param value:
+    :return:
+    """
+    return json.dumps(to_json(value), separators=(',', ':'))
+
+
+def main(argv: typing.Sequence[str] = None):
+    parser = argparse.ArgumentParser(description='writes synthetic games as json lines of {"match", "timeline"}')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--start', type=int, default=0, help='index of the first game')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--summoners', type=int, default=10000, help='size of the summoner population')
+    parser.add_argument('--duo-pairs', type=int, default=100)
+    parser.add_argument('--output', default=None, help='file to write, stdout if not given')
+    args = parser.parse_args(argv)
+
+    generator = Generator(seed=args.seed, summoners=args.summoners, duo_pairs=args.duo_pairs)
+    outfh = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for match_dto, timeline_dto in generator.games(args.count, args.start):
+            outfh.write(json.dumps({'match': to_json(match_dto), 'timeline': to_json(timeline_dto)},
+                                   separators=(',', ':')))
+            outfh.write('\n')
+    finally:
+        if outfh is not sys.stdout:
+            outfh.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,89 +1,275 @@
+import atexit
 import datetime
-from string import Template
+import json
+import os
+import queue
 import sys
 import threading
+import time
+import typing
+
+
+class _Writer:
+    """
+    Background thread writing formatted log lines. Loggers hand lines over through a bounded queue
+    (blocking when it is full), the thread writes everything queued at once and flushes the touched
+    streams after each batch. Persistent log files are opened once in append mode and rotated by
+    size.
+    """
+
+    _BATCH_SIZE = 1000
+
+    def __init__(self, maxsize: int = 10000):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._files = {}  # path -> [file, size]
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self,
+            line: str,
+            outfh,
+            path: str = None,
+            max_bytes: int = 0,
+            backup_count: int = 0,
+            ):
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        self._queue.put((line, outfh, path, max_bytes, backup_count))
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='logger', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self._BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: list):
+        streams = {}
+        for line, outfh, path, max_bytes, backup_count in batch:
+            try:
+                if outfh is not None:
+                    outfh.write(line)
+                    streams[id(outfh)] = outfh
+                if path is not None:
+                    f = self._file(path, max_bytes, backup_count, len(line))
+                    f.write(line)
+                    streams[id(f)] = f
+            except (OSError, ValueError):
+                # closed or unwritable stream, logging must not take the thread down
+                pass
+        for stream in streams.values():
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def _file(self, path: str, max_bytes: int, backup_count: int, length: int):
+        entry = self._files.get(path)
+        if entry is None:
+            f = open(path, 'a')
+            entry = self._files[path] = [f, f.tell()]
+        elif max_bytes and entry[1] + length > max_bytes and entry[1] > 0:
+            entry[0].close()
+            _rotate(path, backup_count)
+            f = open(path, 'a')
+            entry[0], entry[1] = f, 0
+        entry[1] += length
+        return entry[0]
+
+    def flush(self):
+        """
+        Blocks until every queued line is written.
+        :return:
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        self.flush()
+        for f, _ in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+def _rotate(path: str, backup_count: int):
+    # path.1 is the newest backup, the oldest one is dropped
+    if backup_count <= 0:
+        os.remove(path)
+        return
+    for index in range(backup_count - 1, 0, -1):
+        if os.path.exists(f'{path}.{index}'):
+            os.replace(f'{path}.{index}', f'{path}.{index + 1}')
+    os.replace(path, f'{path}.1')
+
+
+_writer = _Writer()
+atexit.register(_writer.close)
+
+
+def flush():
+    """
+    Blocks until every message logged so far is written.
+    :return:
+    """
+    _writer.flush()
+
+
+LEVELS = {
+    'debug': 10,
+    'info': 20,
+    'warn': 30,
+    'error': 40,
+}
 
 
 class Logger:
 
     # [2020-03-06 11:08:42.24][__main__][4450495936] INFO: log string example displayed
+    # or with json_lines
+    # {"timestamp": "2020-03-06 11:08:42.24", "logger": "__main__", "thread": 4450495936, "level": "INFO", ...}
     _LOG_LEVEL = {
+        'debug': 'DEBUG',
         'error': 'ERROR',
         'info': 'INFO',
         'warn': 'WARNING'
     }
 
-    def __init__(self, name: str):
-        # init logger and set name
+    def __init__(self, name: str, level: str = None, json_lines: bool = None):
+        # init logger and set name, level and format default to the env variables LOG_LEVEL and
+        # LOG_FORMAT ("json" for json lines)
         self.name = name
-        self._reset_msg()
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(name=name))
         self.quiet = False
         self.persistent = False
         self.file = None
+        self.max_bytes = 0
+        self.backup_count = 0
+        self.json_lines = os.environ.get('LOG_FORMAT') == 'json' if json_lines is None else json_lines
+        self._call_sites = {}  # (file, line) -> [calls, last emitted, suppressed since], see _throttle
+        self.set_level(level or os.environ.get('LOG_LEVEL', 'info'))
+
+    def set_level(self, level: str):
+        # messages below level are dropped before anything is formatted
+        if level not in LEVELS:
+            raise ValueError(f'unknown log level {level}, expected one of {list(LEVELS)}')
+        self.level = level
+        self._threshold = LEVELS[level]
+        self._update()
 
-    def _reset_msg(self):
-        # reset log string but keep __name__
-        self.LOG_STRING = Template('[$timestamp][{}][$thread] $loglevel: $msg'.format(self.name))
+    def _update(self):
+        # checked by hot loops before building log arguments at all
+        self.debug_enabled = not self.quiet and self._threshold <= LEVELS['debug']
 
     def mute(self):
         # mute logger
         self.quiet = True
+        self._update()
 
     def unmute(self):
         # unmute logger
         self.quiet = False
+        self._update()
 
-    def enable_persistent_logging(self, file: str):
-        # each unmuted print while also be stored in given file
+    def enable_persistent_logging(self, file: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        # each unmuted print will also be appended to given file, rotated to file.1, file.2, ... once
+        # it exceeds max_bytes (0 never rotates)
         self.persistent = True
         self.file = file
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
 
     def disable_persistent_logging(self):
         # logging only to given outfh
         self.persistent = False
         self.file = None
 
-    def _add_timestamp(self):
-        # add timestamp to logstring
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(
-            timestamp=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]))
-
-    def _add_thread(self):
-        # add thread id to logstring
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(thread=threading.get_ident()))
-
-    def _add_message(self, msg: str):
-        # add custom message to logstring
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(msg=msg))
-
-    def error(self, msg: str, outfh=sys.stderr):
-        # add loglevel 'error'
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(loglevel=self._LOG_LEVEL['error']))
-        self._print(msg=msg, outfh=outfh)
-
-    def info(self, msg: str, outfh=sys.stdout):
-        # add loglevel 'info'
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(loglevel=self._LOG_LEVEL['info']))
-        self._print(msg=msg, outfh=outfh)
-
-    def warn(self, msg: str, outfh=sys.stderr):
-        # add loglevel 'warning'
-        self.LOG_STRING = Template(self.LOG_STRING.safe_substitute(loglevel=self._LOG_LEVEL['warn']))
-        self._print(msg=msg, outfh=outfh)
-
-    def _print(self, msg: str, outfh=sys.stdout):
-        # fill logstring template and print to given outfh, flushes after print
-        self._add_timestamp()
-        self._add_thread()
-        self._add_message(msg)
-        if not self.quiet:
-            outfh.write(self.LOG_STRING.template + '\n')
-            if self.persistent:
-                with open(self.file, 'w') as f:
-                    f.write(self.LOG_STRING.template + '\n')
-            outfh.flush()
-        self._reset_msg()
+    # msg is formatted with args (msg % args) only if the message is emitted. rate_limit emits at
+    # most one message per rate_limit seconds, sample only every sample-th message of the calling
+    # line, the number of dropped messages is appended to the next emitted one. A single file-like
+    # argument is taken as outfh, like before arguments were added: logger.info(msg, sys.stderr)
+
+    def debug(self, msg: str, *args, outfh=sys.stdout, rate_limit: float = None, sample: int = None):
+        if self.quiet or self._threshold > LEVELS['debug']:
+            return
+        self._print('debug', msg, args, outfh, rate_limit, sample)
+
+    def info(self, msg: str, *args, outfh=sys.stdout, rate_limit: float = None, sample: int = None):
+        if self.quiet or self._threshold > LEVELS['info']:
+            return
+        self._print('info', msg, args, outfh, rate_limit, sample)
+
+    def warn(self, msg: str, *args, outfh=sys.stderr, rate_limit: float = None, sample: int = None):
+        if self.quiet or self._threshold > LEVELS['warn']:
+            return
+        self._print('warn', msg, args, outfh, rate_limit, sample)
+
+    def error(self, msg: str, *args, outfh=sys.stderr, rate_limit: float = None, sample: int = None):
+        if self.quiet or self._threshold > LEVELS['error']:
+            return
+        self._print('error', msg, args, outfh, rate_limit, sample)
+
+    def flush(self):
+        # wait until everything logged so far is written
+        _writer.flush()
+
+    def _throttle(self, frame, rate_limit: typing.Optional[float], sample: typing.Optional[int]) -> typing.Optional[int]:
+        # returns None to drop the message of given call site, otherwise the number of dropped ones
+        # since the last emitted message (counts may be off by a few between threads)
+        key = (frame.f_code.co_filename, frame.f_lineno)
+        site = self._call_sites.get(key)
+        if site is None:
+            site = self._call_sites[key] = [0, float('-inf'), 0]
+        site[0] += 1
+        now = time.monotonic() if rate_limit is not None else 0.0
+        if (sample is not None and (site[0] - 1) % sample) or (rate_limit is not None and now - site[1] < rate_limit):
+            site[2] += 1
+            return None
+        suppressed, site[1], site[2] = site[2], now, 0
+        return suppressed
+
+    def _print(self, level: str, msg: str, args: tuple, outfh, rate_limit: float, sample: int):
+        # format the line once and hand it to the background writer, written and flushed shortly after
+        if len(args) == 1 and hasattr(args[0], 'write'):
+            args, outfh = (), args[0]
+        suppressed = 0
+        if rate_limit is not None or sample is not None:
+            suppressed = self._throttle(sys._getframe(2), rate_limit, sample)
+            if suppressed is None:
+                return
+        if args:
+            msg = msg % args
+        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        if self.json_lines:
+            record = {
+                'timestamp': timestamp,
+                'logger': self.name,
+                'thread': threading.get_ident(),
+                'level': self._LOG_LEVEL[level],
+                'message': msg,
+            }
+            if suppressed:
+                record['suppressed'] = suppressed
+            line = json.dumps(record, default=str) + '\n'
+        else:
+            if suppressed:
+                msg = f'{msg} ({suppressed} similar messages suppressed)'
+            line = f'[{timestamp}][{self.name}][{threading.get_ident()}] {self._LOG_LEVEL[level]}: {msg}\n'
+        if self.persistent:
+            _writer.put(line, outfh, self.file, self.max_bytes, self.backup_count)
+        else:
+            _writer.put(line, outfh)
 
 
 def urljoin(*parts):
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of common are imported flat, like the services using them do
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common'))
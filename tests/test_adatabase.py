@@ -0,0 +1,27 @@
+import asyncio
+
+import adatabase
+import database
+
+
+def test_iterator_takes_positional_itersize_rows_per_hop(monkeypatch):
+    def iter_all_games(conn, itersize: int = 2000, as_tuples: bool = False):
+        yield from range(10)
+
+    taken = []
+
+    def take(iterator, count):
+        taken.append(count)
+        return [item for _, item in zip(range(count), iterator)]
+
+    monkeypatch.setattr(database, 'iter_all_games', iter_all_games)
+    monkeypatch.setattr(adatabase, '_take', take)
+
+    async def collect(*args, **kwargs):
+        return [item async for item in adatabase.iter_all_games(object(), *args, **kwargs)]
+
+    assert asyncio.run(collect(4)) == list(range(10))
+    assert taken == [4, 4, 4, 4]
+    taken.clear()
+    assert asyncio.run(collect(itersize=5)) == list(range(10))
+    assert taken == [5, 5, 5]
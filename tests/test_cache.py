@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import cache
+import database
+import model
+import schema
+
+_GAME_ID = 9000000001
+
+
+@cache.cacheable
+def select_cached_game(conn, game_id: str):
+    return conn[int(game_id)]
+
+
+@pytest.fixture
+def cached_game():
+    cache.enable('select_cached_game')
+    yield
+    cache.disable('select_cached_game')
+
+
+def test_invalidate_with_int_id_drops_str_key(cached_game):
+    rows = {1: None}
+    assert select_cached_game(rows, '1') is None
+    rows[1] = ['game']
+    assert select_cached_game(rows, '1') is None
+
+    cache.invalidate('select_cached_game', 1)
+    assert select_cached_game(rows, '1') == ['game']
+
+
+def test_cached_values_are_copies(cached_game):
+    rows = {1: ['game']}
+    select_cached_game(rows, '1')[0] = 'changed'
+    assert select_cached_game(rows, '1') == ['game']
+
+
+def _match() -> model.Match:
+    return model.Match(
+        game_id=_GAME_ID,
+        platform_id='EUW1',
+        game_creation=1603641211342,
+        game_duration=1876,
+        queue_id=420,
+        map_id=11,
+        season_id=13,
+        game_version='10.21.339.2173',
+        game_mode='CLASSIC',
+        game_type='MATCHED_GAME',
+    )
+
+
+@pytest.mark.skipif(not os.getenv('DB'), reason='needs a postgres server configured by DB, DBUSER, ...')
+def test_miss_insert_hit():
+    conn = database.get_connection()
+    reader = database.get_connection()
+    schema.migrate(conn)
+    cache.enable('select_match_by_gameid')
+    try:
+        assert database.select_match_by_gameid(reader, str(_GAME_ID)) is None
+
+        database.insert_match(conn, _match(), commit=False)
+        # not committed yet, a reader caching the miss again must not hide the row afterwards
+        assert database.select_match_by_gameid(reader, str(_GAME_ID)) is None
+        reader.commit()
+        conn.commit()
+
+        row = database.select_match_by_gameid(reader, str(_GAME_ID))
+        assert row is not None and row['gameid'] == _GAME_ID
+    finally:
+        cache.disable('select_match_by_gameid')
+        conn.rollback()
+        conn.cursor().execute('DELETE FROM matches WHERE gameid = %s', (_GAME_ID,))
+        conn.commit()
+        database.kill_connection(reader)
+        database.kill_connection(conn)
@@ -0,0 +1,53 @@
+import dataclasses
+import json
+import os
+import typing
+
+import decoder
+from dtos import match
+
+# match-v4 payload with every key riot documents for it
+MATCH_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'match.json')
+
+
+def _load_match() -> dict:
+    with open(MATCH_JSON) as fh:
+        return json.load(fh)
+
+
+def _missing_keys(cls, data: typing.Mapping, path: str) -> typing.List[str]:
+    # json keys of field_map(cls) absent in data, recursing into nested dtos
+    hints = typing.get_type_hints(cls)
+    missing = []
+    for name, key in decoder.field_map(cls).items():
+        if key not in data:
+            missing.append(f'{path}.{key} ({cls.__name__}.{name})')
+            continue
+        tp = hints[name]
+        if typing.get_origin(tp) is list:
+            tp = typing.get_args(tp)[0]
+            values = {f'{path}.{key}[{index}]': value for index, value in enumerate(data[key])}
+        else:
+            values = {f'{path}.{key}': data[key]}
+        if dataclasses.is_dataclass(tp):
+            for value_path, value in values.items():
+                missing.extend(_missing_keys(tp, value, value_path))
+    return missing
+
+
+def test_field_map_matches_riot_keys():
+    assert _missing_keys(match.MatchDto, _load_match(), 'match') == []
+
+
+def test_decode_match():
+    data = _load_match()
+    match_dto = decoder.decode(match.MatchDto, data)
+
+    assert match_dto.game_id == data['gameId']
+    assert len(match_dto.participants) == 10
+    for participant_dto, participant in zip(match_dto.participants, data['participants']):
+        assert participant_dto.stats.time_ccing_others == participant['stats']['timeCCingOthers']
+        assert participant_dto.stats.perk0_var1 == participant['stats']['perk0Var1']
+        assert participant_dto.timeline.lane == participant['timeline']['lane']
+    assert match_dto.participant_identities[0].player.account_id == data['participantIdentities'][0]['player']['accountId']
+    assert match_dto.teams[0].bans[0].champion_id == data['teams'][0]['bans'][0]['championId']
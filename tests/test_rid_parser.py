@@ -0,0 +1,46 @@
+import dataclasses
+import json
+import os
+
+import decoder
+import model
+import rid_parser
+from dtos import match
+
+MATCH_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'match.json')
+
+
+def _parse_participants():
+    with open(MATCH_JSON) as fh:
+        match_dto = decoder.decode(match.MatchDto, json.load(fh))
+    return rid_parser.parse_match_participants(match_dto)
+
+
+def test_legacy_ids_reuse_stored_ids_for_every_row():
+    _, _, participants, _ = _parse_participants()
+    derived = participants[0]
+    legacy = dataclasses.replace(derived, participant_id='legacy-p', stat_id='legacy-s', timeline_id='legacy-t')
+
+    mapped = rid_parser.legacy_ids(participants, [legacy] + participants[1:])
+    assert mapped == {
+        derived.participant_id: 'legacy-p',
+        derived.stat_id: 'legacy-s',
+        derived.timeline_id: 'legacy-t',
+    }
+
+    assert rid_parser.replace_ids(derived, mapped) == legacy
+    frame = model.ParticipantFrame(derived.participant_id, 60000, 5, 0, 500, 2, 300, 100, None, 0)
+    assert rid_parser.replace_ids(frame, mapped).participant_id == 'legacy-p'
+    event = model.Event(
+        participants[1].participant_id, 60000, None, None, None, None, None, None, 'CHAMPION_KILL', None,
+        None, None, None, None, None, None, None, None, participants[1].participant_id,
+        [derived.participant_id], None, participants[2].participant_id,
+    )
+    replaced = rid_parser.replace_ids(event, mapped)
+    assert replaced.assisting_participant_ids == ['legacy-p']
+    assert replaced.participant_id == participants[1].participant_id
+
+
+def test_legacy_ids_empty_for_derived_ids():
+    _, _, participants, _ = _parse_participants()
+    assert rid_parser.legacy_ids(participants, participants) == {}